@@ -23,9 +23,104 @@
 #include "qSlicerApplication.h"
 #include "qSlicerApplicationHelper.h"
 
+// Qt includes
+#include <QFileInfo>
+#include <QJsonArray>
+#include <QJsonDocument>
+#include <QJsonObject>
+#include <QLocalSocket>
+#include <QSettings>
+
 namespace
 {
 
+//----------------------------------------------------------------------------
+// Must match QReadsLogic.viewerServer()
+QString viewerServerName(qSlicerApplication& app)
+{
+  QString serverName = app.userSettings()->value("QReads/ViewerServerName").toString();
+  if (!serverName.isEmpty())
+    {
+    return serverName;
+    }
+  QString user = qEnvironmentVariable("USERNAME", qEnvironmentVariable("USER"));
+  return user.isEmpty() ? QString("SlicerQReads") : QString("SlicerQReads-%1").arg(user);
+}
+
+//----------------------------------------------------------------------------
+// Return the command-line arguments with the directories and scripts made absolute,
+// since the viewer server resolves them in its own working directory.
+QStringList absoluteArguments(const QStringList& arguments)
+{
+  QStringList absolute;
+  for (int index = 0; index < arguments.size(); ++index)
+    {
+    const QString& argument = arguments.at(index);
+    absolute << argument;
+    if (argument == "--python-script" && index + 1 < arguments.size())
+      {
+      absolute << QFileInfo(arguments.at(++index)).absoluteFilePath();
+      }
+    else if (argument == "--python-code" && index + 1 < arguments.size())
+      {
+      absolute << arguments.at(++index);
+      }
+    else if (!argument.startsWith("-") && QFileInfo(argument).isDir())
+      {
+      absolute.last() = QFileInfo(argument).absoluteFilePath();
+      }
+    }
+  return absolute;
+}
+
+//----------------------------------------------------------------------------
+// Forward the command-line arguments to the running viewer server, if any.
+// Return true if the server accepted them, in which case this process should exit
+// without loading the modules.
+// Headless and testing launches are not forwarded, they expect to run in their own process.
+bool forwardArgumentsToViewerServer(qSlicerApplication& app)
+{
+  if (!app.userSettings()->value("QReads/ViewerServerEnabled", false).toBool())
+    {
+    return false;
+    }
+
+  QStringList launchArguments = app.arguments().mid(1);
+  foreach (const QString& option, QStringList() << "--no-main-window" << "--testing" << "--exit-after-startup")
+    {
+    if (launchArguments.contains(option))
+      {
+      return false;
+      }
+    }
+
+  QLocalSocket socket;
+  socket.connectToServer(viewerServerName(app));
+  if (!socket.waitForConnected(500))
+    {
+    return false;
+    }
+
+  QJsonObject arguments;
+  arguments["arguments"] = QJsonArray::fromStringList(absoluteArguments(launchArguments));
+  QJsonObject message;
+  message["command"] = "arguments";
+  message["arguments"] = arguments;
+  socket.write(QJsonDocument(message).toJson(QJsonDocument::Compact) + "\n");
+  if (!socket.waitForBytesWritten(5000))
+    {
+    return false;
+    }
+
+  QByteArray reply;
+  while (!reply.contains('\n') && socket.waitForReadyRead(5000))
+    {
+    reply += socket.readAll();
+    }
+  QJsonObject replyObject = QJsonDocument::fromJson(reply.left(reply.indexOf('\n'))).object();
+  return replyObject.value("status").toString() == "ok";
+}
+
 //----------------------------------------------------------------------------
 int SlicerAppMain(int argc, char* argv[])
 {
@@ -39,6 +134,11 @@ int SlicerAppMain(int argc, char* argv[])
     return app.returnCode();
     }
 
+  if (forwardArgumentsToViewerServer(app))
+    {
+    return EXIT_SUCCESS;
+    }
+
   QScopedPointer<SlicerMainWindowType> window;
   QScopedPointer<QSplashScreen> splashScreen;
 
@@ -1,3 +1,6 @@
+import concurrent.futures
+import contextlib
+import math
 import os
 import unittest
 import logging
@@ -6,6 +9,7 @@ from slicer.ScriptedLoadableModule import *
 from slicer.util import NodeModify, toBool, VTKObservationMixin
 
 from Resources import QReadsResources
+from QReadsLib import DICOMTagCache, LoadMetrics, VolumeGeometryCache
 #
 # QReads
 #
@@ -19,7 +23,8 @@ class QReads(ScriptedLoadableModule):
     ScriptedLoadableModule.__init__(self, parent)
     self.parent.title = "QReads"  # TODO: make this more human readable by adding spaces
     self.parent.categories = ["SlicerQReads"]  # TODO: set categories (folders where the module shows up in the module selector)
-    self.parent.dependencies = ["DICOM"]  # TODO: add here list of module names that this module requires
+    # DICOM is loaded on first use, see QReadsLogic.requireModule()
+    self.parent.dependencies = []
     self.parent.contributors = ["John Doe (AnyWare Corp.)"]  # TODO: replace with "Firstname Lastname (Organization)"
     # TODO: update with short description of the module and a link to online module documentation
     self.parent.helpText = """
@@ -48,6 +53,7 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
   BRIGHTNESS_STEP = 100.0
   CONTRAST_STEP = 100.0
   ZOOM_ACTIONS = ["100%", "200%", "400%", "1:1", "Fit to window"]
+  VIEWS_READY_TIMEOUT_IN_MS = 2000
 
   class CloseApplicationEventFilter(qt.QWidget):
     def eventFilter(self, object, event):
@@ -68,6 +74,14 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     self._updatingGUIFromParameterNode = False
     self.helpDialog = None
     self.slabModeButtonGroup = None
+    self._viewsReadyObservers = []
+    self._updateScheduler = None
+    self._appliedViewerParameters = {}
+    self._pendingWindowStep = 0.0
+    self._pendingLevelStep = 0.0
+    self._sliceSpacings = {}
+    self._setupViewNames = set()
+    self._threeDViewSetupDeferred = QReadsLogic.deferredStartupEnabled()
     self._closeApplicationEventFilter = QReadsWidget.CloseApplicationEventFilter()
 
   def setup(self):
@@ -76,6 +90,28 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     """
     ScriptedLoadableModuleWidget.setup(self)
 
+    # Duration of each startup phase is recorded along with the load metrics
+    metrics = QReadsLogic.loadMetrics()
+    metrics.startLoad(startup=True, deferred=QReadsLogic.deferredStartupEnabled())
+    QReadsLogic.configureDeferredStartup()
+    with metrics.stage("setupUI"):
+      self.setupUI()
+
+    # Layout
+    with metrics.stage("setupLayout"):
+      slicer.app.layoutManager().setLayout(self.logic.registerCustomLayout())
+
+      # Views are created by the layout manager when first shown
+      slicer.app.layoutManager().connect("layoutChanged(int)", self.onLayoutChanged)
+      self.onLayoutChanged()
+
+    if self._threeDViewSetupDeferred:
+      # Show the slice views first, 3D views are set up once the main window is displayed
+      qt.QTimer.singleShot(0, self.completeDeferredStartup)
+
+    self.startViewerServer()
+
+  def setupUI(self):
     # Load widget from .ui file (created by Qt Designer).
     # Additional widgets can be instantiated manually and added to self.layout.
     uiWidget = slicer.util.loadUI(self.resourcePath('UI/QReads.ui'))
@@ -100,20 +136,25 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     # in batch mode, without a graphical user interface.
     self.logic = QReadsLogic()
 
+    # Coalesce updates triggered by rapid clicks or slider changes
+    from QReadsLib import UpdateScheduler
+    self._updateScheduler = UpdateScheduler()
+
     # Connections
 
     # These connections ensure that we update parameter node when scene is closed
     self.addObserver(slicer.mrmlScene, slicer.mrmlScene.StartCloseEvent, self.onSceneStartClose)
     self.addObserver(slicer.mrmlScene, slicer.mrmlScene.EndCloseEvent, self.onSceneEndClose)
     self.addObserver(slicer.mrmlScene, slicer.mrmlScene.NodeAddedEvent, self.onNodeAdded)
+    self.addObserver(slicer.mrmlScene, slicer.mrmlScene.NodeRemovedEvent, self.onNodeRemoved)
 
     # These connections ensure that whenever user changes some settings on the GUI, that is saved in the MRML scene
     # (in the selected parameter node).
     self.ui.ShowReferenceMarkersButton.connect("clicked()", self.updateParameterNodeFromGUI)
-    self.ui.ResetReferenceMarkersButton.connect("clicked()", QReadsLogic.resetReferenceMarkers)
+    self.ui.ResetReferenceMarkersButton.connect("clicked()", self.resetReferenceMarkers)
     self.ui.SlabButton.connect("clicked()", self.updateParameterNodeFromGUI)
     self.slabModeButtonGroup.connect("buttonClicked(int)", self.updateParameterNodeFromGUI)
-    self.ui.SlabThicknessSliderWidget.connect("valueChanged(double)", self.updateParameterNodeFromGUI)
+    self.ui.SlabThicknessSliderWidget.connect("valueChanged(double)", self.scheduleParameterNodeUpdateFromGUI)
     self.ui.InverseGrayButton.connect("clicked(bool)", self.updateParameterNodeFromGUI)
     self.ui.EnableWLButton.connect("clicked(bool)", self.updateParameterNodeFromGUI)
     self.ui.ResetWLButton.connect("clicked()", QReadsLogic.resetWindowLevel)
@@ -122,12 +163,12 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     slicer.util.mainWindow().installEventFilter(self._closeApplicationEventFilter)
 
     # Increasing the level will make the image darker, whereas decreasing the level value will make the image brighter
-    self.ui.BrightnessUpButton.connect("clicked()", lambda step=-self.BRIGHTNESS_STEP: QReadsLogic.updateWindowLevel(levelStep=step))
-    self.ui.BrightnessDownButton.connect("clicked()", lambda step=self.BRIGHTNESS_STEP: QReadsLogic.updateWindowLevel(levelStep=step))
+    self.ui.BrightnessUpButton.connect("clicked()", lambda step=-self.BRIGHTNESS_STEP: self.scheduleWindowLevelUpdate(levelStep=step))
+    self.ui.BrightnessDownButton.connect("clicked()", lambda step=self.BRIGHTNESS_STEP: self.scheduleWindowLevelUpdate(levelStep=step))
 
     # Increasing window will reduce display contrast, whereas decreasing the window increases the brightness
-    self.ui.ContrastUpButton.connect("clicked()", lambda step=-self.CONTRAST_STEP: QReadsLogic.updateWindowLevel(windowStep=step))
-    self.ui.ContrastDownButton.connect("clicked()", lambda step=self.CONTRAST_STEP: QReadsLogic.updateWindowLevel(windowStep=step))
+    self.ui.ContrastUpButton.connect("clicked()", lambda step=-self.CONTRAST_STEP: self.scheduleWindowLevelUpdate(windowStep=step))
+    self.ui.ContrastDownButton.connect("clicked()", lambda step=self.CONTRAST_STEP: self.scheduleWindowLevelUpdate(windowStep=step))
 
     self.ui.CTBodySoftTissueWLPresetButton.connect("clicked()", lambda presetName="CT-BodySoftTissue": self.logic.setWindowLevelPreset(presetName))
     self.ui.CTBoneWLPresetButton.connect("clicked()", lambda presetName="CT-Bone": self.logic.setWindowLevelPreset(presetName))
@@ -155,51 +196,136 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     slicer.util.setModulePanelTitleVisible(False)
     slicer.util.setToolbarsVisible(False)
 
-    # Layout
-    slicer.app.layoutManager().setLayout(self.logic.registerCustomLayout())
-
-    for viewName, viewColor in QReadsLogic.SLICEVIEW_BACKGROUND_COLORS.items():
-      sliceWidget = slicer.app.layoutManager().sliceWidget(viewName)
-      sliceWidget.sliceController().pinButton().visible = False
-      slicer.util.findChild(sliceWidget, "frame").styleSheet = "border: 4px solid %s" % viewColor
-      sliceWidget.sliceView().setBackgroundColor(qt.QColor(qt.Qt.black))
-      sliceNode = sliceWidget.mrmlSliceNode()
-      sliceNode.SetSliceVisible(True);
-
-      # Set text color of SliceOffsetSlider spinbox by updating palette
-      # because the background color is already customized by updating
-      # the palette in "qMRMLSliceControllerWidgetPrivate::setColor()"
-      sliceBarWidget = slicer.util.findChild(sliceWidget, "BarWidget")
-      sliceOffsetSpinBox = slicer.util.findChild(sliceBarWidget, "SpinBox")
-      palette = sliceOffsetSpinBox.palette
-      palette.setColor(qt.QPalette.Text, qt.QColor("White"))
-      sliceOffsetSpinBox.palette = palette
-
-      # Move slice view controller bar to the bottom
-      sliceWidget.layout().addWidget(sliceWidget.sliceController())
-
-    for viewName, viewColor in QReadsLogic.THREEDVIEW_BACKGROUND_COLORS.items():
-      with NodeModify(slicer.util.getNode("vtkMRMLViewNode%s" % viewName)) as viewNode:
-        viewNode.SetBackgroundColor(0., 0., 0.)
-        viewNode.SetBackgroundColor2(0., 0., 0.)
-        viewNode.SetBoxVisible(False)
-        viewNode.SetAxisLabelsVisible(False)
-        viewNode.SetOrientationMarkerType(slicer.vtkMRMLAbstractViewNode.OrientationMarkerTypeAxes)
-
-        # Move 3D view controller bar to the bottom
-        threeDWidget = slicer.app.layoutManager().viewWidget(viewNode)
-        threeDWidget.layout().addWidget(threeDWidget.threeDController())
-        # ... and reconfigure behavior of the popup to appear above the controller bar
-        popupWidget = threeDWidget.findChild(ctk.ctkPopupWidget)
-        popupWidget.alignment = qt.Qt.AlignLeft | qt.Qt.AlignTop
-        popupWidget.horizontalDirection = qt.Qt.LeftToRight
-        popupWidget.verticalDirection = ctk.ctkBasePopupWidget.BottomToTop
+  def completeDeferredStartup(self):
+    """Set up the 3D views left out by the deferred startup. See QReadsLogic.deferredStartupEnabled()"""
+    with QReadsLogic.LOAD_METRICS.stage("deferredSetup"):
+      self._threeDViewSetupDeferred = False
+      self.onLayoutChanged()
+
+  def startViewerServer(self):
+    """Accept commands from other processes if the viewer server is enabled. See QReadsLogic.viewerServer()"""
+    server = QReadsLogic.viewerServer()
+    if server is None:
+      return
+    server.commands.update({
+      "load": lambda directory: QReadsLogic.replaceStudy(directory),
+      "close": QReadsLogic.unloadStudy,
+      "windowLevelPreset": self.onViewerServerWindowLevelPreset,
+      "slab": self.onViewerServerSlab,
+      "arguments": self.onViewerServerArguments,
+    })
+    server.start()
+
+  def onViewerServerWindowLevelPreset(self, name):
+    if name not in QReadsLogic.WINDOW_LEVEL_PRESETS:
+      raise ValueError("Unknown window level preset %s" % name)
+    self.logic.setWindowLevelPreset(name)
+
+  def onViewerServerSlab(self, enabled=True, mode=None, thicknessInMm=None):
+    if mode is not None and mode not in QReadsLogic.SLAB_MODES.values():
+      raise ValueError("Unknown slab mode %s" % mode)
+    with NodeModify(self._parameterNode):
+      self._parameterNode.SetParameter("SlabEnabled", "true" if enabled else "false")
+      if mode is not None:
+        self._parameterNode.SetParameter("SlabMode", mode)
+      if thicknessInMm is not None:
+        self._parameterNode.SetParameter("SlabThicknessInMm", str(float(thicknessInMm)))
+
+  def onViewerServerArguments(self, arguments):
+    """Handle the command-line arguments forwarded by another launch of the application.
+
+    The reply is sent right away so that the other process exits, the study is loaded afterwards.
+    """
+    def _run():
+      mainWindow = slicer.util.mainWindow()
+      if mainWindow.isMinimized():
+        mainWindow.showNormal()
+      mainWindow.raise_()
+      mainWindow.activateWindow()
+      QReadsLogic.runLaunchArguments(arguments)
+    qt.QTimer.singleShot(0, _run)
+
+  def onLayoutChanged(self, layoutId=None):
+    """Set up the views created for the new layout and apply the viewer settings to them."""
+    for viewName in QReadsLogic.SLICEVIEW_BACKGROUND_COLORS:
+      if viewName not in self._setupViewNames and slicer.app.layoutManager().sliceWidget(viewName) is not None:
+        self.setupSliceView(viewName)
+        self._setupViewNames.add(viewName)
+    for viewName in QReadsLogic.THREEDVIEW_BACKGROUND_COLORS:
+      if self._threeDViewSetupDeferred:
+        break
+      if viewName not in self._setupViewNames and slicer.mrmlScene.GetSingletonNode(viewName, "vtkMRMLViewNode") is not None:
+        self.setupThreeDView(viewName)
+        self._setupViewNames.add(viewName)
+    QReadsLogic.updateViewsRenderEnabled()
+    renderThrottle = QReadsLogic.threeDViewRenderThrottle()
+    if renderThrottle is not None:
+      renderThrottle.updateRates()
+    self.invalidateViewers()
+
+  def setupSliceView(self, viewName):
+    viewColor = QReadsLogic.SLICEVIEW_BACKGROUND_COLORS[viewName]
+    sliceWidget = slicer.app.layoutManager().sliceWidget(viewName)
+    sliceWidget.sliceController().pinButton().visible = False
+    slicer.util.findChild(sliceWidget, "frame").styleSheet = "border: 4px solid %s" % viewColor
+    sliceWidget.sliceView().setBackgroundColor(qt.QColor(qt.Qt.black))
+    sliceNode = sliceWidget.mrmlSliceNode()
+    sliceNode.SetSliceVisible(True);
+
+    # Number of slices of the slab depends on the spacing along the slice normal
+    self.addObserver(sliceNode, vtk.vtkCommand.ModifiedEvent, self.onSliceNodeModified)
+
+    # Set text color of SliceOffsetSlider spinbox by updating palette
+    # because the background color is already customized by updating
+    # the palette in "qMRMLSliceControllerWidgetPrivate::setColor()"
+    sliceBarWidget = slicer.util.findChild(sliceWidget, "BarWidget")
+    sliceOffsetSpinBox = slicer.util.findChild(sliceBarWidget, "SpinBox")
+    palette = sliceOffsetSpinBox.palette
+    palette.setColor(qt.QPalette.Text, qt.QColor("White"))
+    sliceOffsetSpinBox.palette = palette
+
+    # Move slice view controller bar to the bottom
+    sliceWidget.layout().addWidget(sliceWidget.sliceController())
+
+  def setupThreeDView(self, viewName):
+    with NodeModify(slicer.mrmlScene.GetSingletonNode(viewName, "vtkMRMLViewNode")) as viewNode:
+      viewNode.SetBackgroundColor(0., 0., 0.)
+      viewNode.SetBackgroundColor2(0., 0., 0.)
+      viewNode.SetBoxVisible(False)
+      viewNode.SetAxisLabelsVisible(False)
+      viewNode.SetOrientationMarkerType(slicer.vtkMRMLAbstractViewNode.OrientationMarkerTypeAxes)
+
+      # Move 3D view controller bar to the bottom
+      threeDWidget = slicer.app.layoutManager().viewWidget(viewNode)
+      threeDWidget.layout().addWidget(threeDWidget.threeDController())
+      # ... and reconfigure behavior of the popup to appear above the controller bar
+      popupWidget = threeDWidget.findChild(ctk.ctkPopupWidget)
+      popupWidget.alignment = qt.Qt.AlignLeft | qt.Qt.AlignTop
+      popupWidget.horizontalDirection = qt.Qt.LeftToRight
+      popupWidget.verticalDirection = ctk.ctkBasePopupWidget.BottomToTop
+
+    renderThrottle = QReadsLogic.threeDViewRenderThrottle()
+    if renderThrottle is not None:
+      renderThrottle.attach(threeDWidget)
 
   def cleanup(self):
     """
     Called when the application closes and the module widget is destroyed.
     """
     self.removeObservers()
+    slicer.app.layoutManager().disconnect("layoutChanged(int)", self.onLayoutChanged)
+    if self._updateScheduler is not None:
+      self._updateScheduler.cancel()
+    if QReadsLogic.SLAB_PREVIEW is not None:
+      QReadsLogic.SLAB_PREVIEW.stop()
+    if QReadsLogic.THREED_VIEW_RENDER_THROTTLE is not None:
+      QReadsLogic.THREED_VIEW_RENDER_THROTTLE.detach()
+    if QReadsLogic.STUDY_PREFETCHER is not None:
+      QReadsLogic.STUDY_PREFETCHER.shutdown()
+      QReadsLogic.STUDY_PREFETCHER = None
+    if QReadsLogic.VIEWER_SERVER is not None:
+      QReadsLogic.VIEWER_SERVER.stop()
+      QReadsLogic.VIEWER_SERVER = None
 
   def enter(self):
     """
@@ -221,11 +347,19 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     """
     # Parameter node will be reset, do not use it anymore
     self.setParameterNode(None)
+    self._appliedViewerParameters = {}
 
   def onSceneEndClose(self, caller, event):
     """
     Called just after the scene is closed.
     """
+    # Volumes are all removed
+    QReadsLogic.DICOM_TAG_VALUES.clear()
+    QReadsLogic.VOLUME_GEOMETRY.clear()
+    QReadsLogic.FIT_SLICE_GEOMETRY.clear()
+    if QReadsLogic.SLAB_ENGINE is not None:
+      QReadsLogic.SLAB_ENGINE.reset()
+
     # If this module is shown while the scene is closed then recreate a new parameter node immediately
     if self.parent.isEntered:
       self.initializeParameterNode()
@@ -235,14 +369,33 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     if slicer.mrmlScene.IsBatchProcessing():
       return
     node = calldata
-    if not isinstance(node, slicer.vtkMRMLScalarVolumeNode):
+    if not isinstance(node, slicer.vtkMRMLScalarVolumeNode) or QReadsLogic.isSlabVolume(node):
       return
 
-    def _update():
-      slicer.app.processEvents()
-      slicer.app.layoutManager().resetThreeDViews()
+    metrics = QReadsLogic.LOAD_METRICS
+    metrics.mark("nodeAdded", series=node.GetName())
+
+    # Settings have to be applied to the new volume
+    self.invalidateViewers()
+
+    def _update(elapsedTime, timedOut):
+      self._viewsReadyObservers.remove(observer)
+      if slicer.mrmlScene.GetNodeByID(node.GetID()) is None:
+        return
+      # Volumes loaded but never shown do not update the viewers
+      if timedOut and not observer.isShown():
+        return
+      logging.info("Views ready %.3fs after %s was added%s" % (elapsedTime, node.GetName(), " (timeout)" if timedOut else ""))
+      metrics.mark("viewsReady", duration=elapsedTime, series=node.GetName(), timedOut=timedOut)
+
+      with metrics.stage("viewerUpdate", series=node.GetName()):
+        _updateViewers()
+
+    def _updateViewers():
+      if QReadsLogic.threeDViewsShown():
+        slicer.app.layoutManager().resetThreeDViews()
       self.updateParameterNodeFromVolumeNode(node)
-      QReadsLogic.setZoom(self._parameterNode.GetParameter("Zoom"))
+      self.invalidateViewers(["Zoom"])
 
       # Dictionary of name and values
       values = {QReadsLogic.DICOM_TAGS[tag]: value for tag, value in QReadsLogic.dicomTagValues(node).items()}
@@ -251,8 +404,34 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
       slicer.util.mainWindow().windowTitle = \
         "CMRN: {PatientID}    Patient Name: {PatientName}     Exam: {StudyDescription}     Series: {SeriesDescription}".format(**values)
 
-    # Delay update to ensure images are rendered
-    qt.QTimer.singleShot(750, _update)
+    # Update once images are rendered
+    from QReadsLib import ViewsReadyObserver
+    observer = ViewsReadyObserver(node, _update, timeoutInMs=self.VIEWS_READY_TIMEOUT_IN_MS)
+    self._viewsReadyObservers.append(observer)
+    observer.start()
+
+  def onSliceNodeModified(self, caller, event):
+    """Update the slab when the spacing between slices of a view changes (e.g. after rotating the view)."""
+    sliceLogic = slicer.app.applicationLogic().GetSliceLogic(caller)
+    if sliceLogic is None:
+      return
+    sliceSpacing = QReadsLogic.sliceSpacing(sliceLogic)
+    if self._sliceSpacings.get(caller.GetName()) == sliceSpacing:
+      return
+    self._sliceSpacings[caller.GetName()] = sliceSpacing
+    self._updateScheduler.schedule("Viewers", self.updateViewersFromParameterNode)
+
+  @vtk.calldata_type(vtk.VTK_OBJECT)
+  def onNodeRemoved(self, caller, event, calldata):
+    if slicer.mrmlScene.IsClosing():
+      return
+    node = calldata
+    if not isinstance(node, slicer.vtkMRMLScalarVolumeNode):
+      return
+    QReadsLogic.releaseDICOMTagValues(node)
+    QReadsLogic.VOLUME_GEOMETRY.pop(node.GetID())
+    if QReadsLogic.SLAB_ENGINE is not None and not QReadsLogic.isSlabVolume(node):
+      QReadsLogic.SLAB_ENGINE.releaseSourceVolume(node)
 
   def initializeParameterNode(self):
     """
@@ -305,16 +484,22 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     self.helpDialog.show()
 
   def createDistanceMeasurement(self):
+    markupsLogic = QReadsLogic.requireModule("Markups").logic()
     lineNode = slicer.mrmlScene.CreateNodeByClass("vtkMRMLMarkupsLineNode")
     lineNode.SetName("Line")
     slicer.mrmlScene.AddNode(lineNode)
     lineNode.UnRegister(slicer.mrmlScene)
-    slicer.modules.markups.logic().AddNewDisplayNodeForMarkupsNode(lineNode)
+    markupsLogic.AddNewDisplayNodeForMarkupsNode(lineNode)
 
     # Setup placement
-    slicer.modules.markups.logic().SetActiveListID(lineNode)
+    markupsLogic.SetActiveListID(lineNode)
     slicer.app.applicationLogic().GetInteractionNode().SwitchToSinglePlaceMode()
 
+  def resetReferenceMarkers(self):
+    QReadsLogic.resetReferenceMarkers()
+    # Resetting the reference markers fits slices to the window, apply the zoom again
+    self.invalidateViewers(["Zoom"])
+
   def switchViewOrientationMarkerType(self):
     """Switch orientation marker type the next one based on the order defined in
     vtkMRMLAbstractViewNode::OrientationMarkerTypeType enum.
@@ -350,10 +535,8 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     slabModeStr = self._parameterNode.GetParameter("SlabMode") if slabEnabled else QReadsLogic.DEFAULT_SLAB_MODE
     getattr(self.ui, "SlabMode%sRadioButton" % slabModeStr).checked = True
 
-    volumeNode = slicer.mrmlScene.GetFirstNodeByClass("vtkMRMLScalarVolumeNode")
-
-    # Update slab slider
-    spacingInMm = max(volumeNode.GetSpacing()) if volumeNode is not None else 0.0
+    # Update slab slider. The thinnest slab is one slice of the coarsest volume shown.
+    spacingInMm = max([max(QReadsLogic.volumeGeometry(volumeNode).spacing) for volumeNode in QReadsLogic.displayedVolumes()] or [0.0])
     if slabEnabled:
       slabThicknessInMm = float(self._parameterNode.GetParameter("SlabThicknessInMm"))
     else:
@@ -375,26 +558,91 @@ class QReadsWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
     zoom = self._parameterNode.GetParameter("Zoom")
     self.ui.ZoomComboBox.currentText = zoom
 
-    # Update OrientationMarkerType button
-    orientationMarkerType = int(self._parameterNode.GetParameter("OrientationMarkerType"))
-
     # Update RulerVisible button
     rulerVisible = toBool(self._parameterNode.GetParameter("RulerVisible"))
     self.ui.RulerVisibleButton.checked = rulerVisible
 
-    # Update viewers
-    QReadsLogic.setReferenceMarkersVisible(referenceMarkersVisible)
-    QReadsLogic.setSlab(
-      QReadsLogic.slabModeFromString(slabModeStr),
-      QReadsLogic.slabThicknessInMmToNumberOfSlices(volumeNode, slabThicknessInMm))
-    QReadsLogic.setInverseGrayEnabled(inverseGray)
-    QReadsLogic.setZoom(zoom)
-    QReadsLogic.setOrientationMarkerType(orientationMarkerType)
-    QReadsLogic.setRulerVisible(rulerVisible)
+    # Update viewers once per frame
+    self._updateScheduler.schedule("Viewers", self.updateViewersFromParameterNode)
 
     # All the GUI updates are done
     self._updatingGUIFromParameterNode = False
 
+  def invalidateViewers(self, parameterNames=None):
+    """
+    Forget the values applied to the viewers for the given parameters (all if None is given)
+    and schedule a viewers update to apply them again.
+    """
+    if parameterNames is None:
+      self._appliedViewerParameters = {}
+    else:
+      for parameterName in parameterNames:
+        self._appliedViewerParameters.pop(parameterName, None)
+    if self._updateScheduler is not None:
+      self._updateScheduler.schedule("Viewers", self.updateViewersFromParameterNode)
+
+  def _applyViewerParameter(self, parameterName, value, setter):
+    """Call ``setter(value)`` only if ``value`` differs from the one previously applied."""
+    if parameterName in self._appliedViewerParameters and self._appliedViewerParameters[parameterName] == value:
+      return
+    setter(value)
+    self._appliedViewerParameters[parameterName] = value
+
+  def updateViewersFromParameterNode(self):
+    """
+    Apply the state of the parameter node to the viewers.
+    This method is scheduled by updateGUIFromParameterNode() so that it runs at most once per frame.
+    Only the settings that changed since they were last applied are updated, see invalidateViewers().
+    """
+    if self._parameterNode is None:
+      return
+
+    slabEnabled = toBool(self._parameterNode.GetParameter("SlabEnabled"))
+    slabModeStr = self._parameterNode.GetParameter("SlabMode") if slabEnabled else QReadsLogic.DEFAULT_SLAB_MODE
+    if slabEnabled:
+      slabThicknessInMm = float(self._parameterNode.GetParameter("SlabThicknessInMm"))
+    else:
+      slabThicknessInMm = None
+
+    self._applyViewerParameter(
+      "ReferenceMarkersVisible", toBool(self._parameterNode.GetParameter("ReferenceMarkersVisible")),
+      QReadsLogic.setReferenceMarkersVisible)
+    self._applyViewerParameter(
+      "Slab", (QReadsLogic.slabModeFromString(slabModeStr), QReadsLogic.slabNumberOfSlicesPerView(slabThicknessInMm)),
+      lambda slab: QReadsLogic.setSlab(*slab))
+    self._applyViewerParameter(
+      "SlabPreviewEnabled", toBool(self._parameterNode.GetParameter("SlabPreviewEnabled")),
+      QReadsLogic.setSlabPreviewEnabled)
+    self._applyViewerParameter(
+      "InverseGray", toBool(self._parameterNode.GetParameter("InverseGray")),
+      QReadsLogic.setInverseGrayEnabled)
+    self._applyViewerParameter(
+      "Zoom", self._parameterNode.GetParameter("Zoom"),
+      QReadsLogic.setZoom)
+    self._applyViewerParameter(
+      "OrientationMarkerType", int(self._parameterNode.GetParameter("OrientationMarkerType")),
+      QReadsLogic.setOrientationMarkerType)
+    self._applyViewerParameter(
+      "RulerVisible", toBool(self._parameterNode.GetParameter("RulerVisible")),
+      QReadsLogic.setRulerVisible)
+
+  def scheduleParameterNodeUpdateFromGUI(self):
+    """Call updateParameterNodeFromGUI() at most once per frame. Used for continuously changing widgets."""
+    if self._updatingGUIFromParameterNode:
+      return
+    self._updateScheduler.schedule("ParameterNodeFromGUI", self.updateParameterNodeFromGUI)
+
+  def scheduleWindowLevelUpdate(self, windowStep=0.0, levelStep=0.0):
+    """Accumulate window and level steps and apply them at most once per frame."""
+    self._pendingWindowStep += windowStep
+    self._pendingLevelStep += levelStep
+    self._updateScheduler.schedule("WindowLevel", self._applyPendingWindowLevelUpdate)
+
+  def _applyPendingWindowLevelUpdate(self):
+    windowStep, levelStep = self._pendingWindowStep, self._pendingLevelStep
+    self._pendingWindowStep = self._pendingLevelStep = 0.0
+    QReadsLogic.updateWindowLevel(windowStep=windowStep, levelStep=levelStep)
+
   def updateParameterNodeFromGUI(self, caller=None, event=None):
     """
     This method is called when the user makes any change in the GUI.
@@ -447,13 +695,17 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
   SLICEVIEW_BACKGROUND_COLORS = {
     "Red": "#000099",
     "Yellow": "#990000",
-    "Green": "#009900"
+    "Green": "#009900",
+    "QReadsCompare": "#990099"
   }
 
   THREEDVIEW_BACKGROUND_COLORS = {
     "QReads1": "#000000",
   }
 
+  HANGING_PROTOCOL_LAYOUT_ID = 503
+  """Layout id of the first hanging protocol, the following protocols use the next ids. See QReadsLogic.registerCustomLayout()"""
+
   WINDOW_LEVEL_PRESETS = {
     'CT-BodySoftTissue': (400, 40),
     'CT-Bone': (2500, 300),
@@ -480,8 +732,75 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
     }
   """Tags cached when loading data using QReadsLogic.loadDICOMDataDirectory()"""
 
-  DICOM_TAG_VALUES = {}
-  """Map of the first instance UID of each loaded volume to tag values specified in QReadsLogic.DICOM_TAGS"""
+  DICOM_TAG_VALUES = DICOMTagCache(maximumNumberOfEntries=256, inUseInstanceUIDs=lambda: QReadsLogic.loadedInstanceUIDs())
+  """Map of the first instance UID of each loaded volume to tag values specified in QReadsLogic.DICOM_TAGS.
+
+  Entries are removed by the module widget when the associated volume is removed from the scene, see
+  QReadsLogic.releaseDICOMTagValues(). When the cache is full, entries of volumes that are not in the scene anymore
+  are evicted, which bounds the cache when there is no module widget, e.g. when rendering studies in batch.
+  See QReadsLogic.dicomTagValuesCacheStatistics()
+  """
+
+  PROGRESSIVE_LOADERS = []
+  """Loaders of the volumes being loaded by QReadsLogic.loadDICOMDataDirectoryProgressively()"""
+
+  DECODER_EXECUTOR = None
+  """Thread pool decoding the slices of all the progressive loaders. See QReadsLogic.decoderExecutor()"""
+
+  DECODER_NUMBER_OF_WORKERS = None
+  """Number of threads of QReadsLogic.DECODER_EXECUTOR"""
+
+  TAG_VALUES_EXECUTOR = None
+  """Thread pool reading headers in QReadsLogic.readDICOMTagValues(), kept between calls"""
+
+  LOAD_METRICS = LoadMetrics()
+  """Load pipeline timings. See QReadsLogic.loadMetrics()"""
+
+  DICOM_INDEX = None
+  """Persistent DICOM index used by QReadsLogic.loadDICOMDataDirectory(). See QReadsLogic.dicomIndex()"""
+
+  VIEWER_SERVER = None
+  """Server accepting commands from other processes. See QReadsLogic.viewerServer()"""
+
+  MAPPED_VOLUME_STORE = None
+  """Scratch files backing volumes loaded by QReadsLogic.loadDICOMDataDirectoryMapped(). See QReadsLogic.mappedVolumeStore()"""
+
+  STUDY_NODE_CLASSES = ["vtkMRMLVolumeNode", "vtkMRMLMarkupsNode"]
+  """Classes of the nodes removed by QReadsLogic.unloadStudy()"""
+
+  WORK_LIST = []
+  """Ordered list of study directories. See QReadsLogic.setWorkList()"""
+
+  WORK_LIST_INDEX = -1
+  """Index of the work-list study currently loaded"""
+
+  STUDY_PREFETCHER = None
+  """Prefetcher of the next studies of the work-list. See QReadsLogic.studyPrefetcher()"""
+
+  SLAB_ENGINE = None
+  """Engine computing slabs of axis-aligned views. See QReadsLogic.slabEngine()"""
+
+  SLAB = None
+  """Mode and number of slices last set using QReadsLogic.setSlab()"""
+
+  HEADER_SCAN_NUMBER_OF_THREADS = None
+  """Number of threads reading headers and decoding slices overriding the application setting.
+  See QReadsLogic.headerScanNumberOfThreads()"""
+
+  VOLUME_GEOMETRY = VolumeGeometryCache()
+  """Spacing, RAS box and IJK directions of the volumes shown in the views. See QReadsLogic.volumeGeometry()"""
+
+  FIT_SLICE_GEOMETRY = {}
+  """Map of view name to field of view and center computed by FitSliceToAll(). See QReadsLogic.fitSlice()"""
+
+  DEFERRED_MODULES = ["DICOM", "Markups"]
+  """Modules loaded on first use instead of at startup when deferred startup is enabled. See QReadsLogic.configureDeferredStartup()"""
+
+  THREED_VIEW_RENDER_THROTTLE = None
+  """Throttle rendering of the 3D views. See QReadsLogic.threeDViewRenderThrottle()"""
+
+  SLAB_PREVIEW = None
+  """Reduce the slab quality while interacting with the views. See QReadsLogic.setSlabPreviewEnabled()"""
 
   def __init__(self):
     """
@@ -501,6 +820,8 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
       parameterNode.SetParameter("SlabMode", QReadsLogic.DEFAULT_SLAB_MODE)
     if not parameterNode.GetParameter("SlabThicknessInMm"):
       parameterNode.SetParameter("SlabThicknessInMm", "1.0")
+    if not parameterNode.GetParameter("SlabPreviewEnabled"):
+      parameterNode.SetParameter("SlabPreviewEnabled", qt.QSettings().value("QReads/SlabPreviewEnabled", "false"))
     if not parameterNode.GetParameter("InverseGray"):
       parameterNode.SetParameter("InverseGray", "false")
     if not parameterNode.GetParameter("WindowLevelEnabled"):
@@ -513,73 +834,203 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
       parameterNode.SetParameter("RulerVisible", "false")
 
   @staticmethod
-  def registerCustomLayout():
-    customLayout = (
-      "<layout type=\"vertical\">"
-      " <item>"
-      "  <layout type=\"horizontal\">"
-      "   <item>"
-      "    <view class=\"vtkMRMLSliceNode\" singletontag=\"Red\">"
-      "     <property name=\"orientation\" action=\"default\">Axial</property>"
-      "     <property name=\"viewlabel\" action=\"relayout\">B</property>"
-      "     <property name=\"viewcolor\" action=\"relayout\">{Red}</property>"
-      "    </view>"
-      "   </item>"
-      "   <item>"
-      "    <view class=\"vtkMRMLSliceNode\" singletontag=\"Yellow\">"
-      "     <property name=\"orientation\" action=\"default\">Sagittal</property>"
-      "     <property name=\"viewlabel\" action=\"relayout\">R</property>"
-      "     <property name=\"viewcolor\" action=\"relayout\">{Yellow}</property>"
-      "    </view>"
-      "   </item>"
-      "  </layout>"
-      " </item>"
-      " <item>"
-      "  <layout type=\"horizontal\">"
-      "   <item>"
-      "    <view class=\"vtkMRMLSliceNode\" singletontag=\"Green\">"
-      "     <property name=\"orientation\" action=\"default\">Coronal</property>"
-      "     <property name=\"viewlabel\" action=\"relayout\">G</property>"
-      "     <property name=\"viewcolor\" action=\"relayout\">{Green}</property>"
-      "    </view>"
-      "   </item>"
-      "   <item>"
-      "    <view class=\"vtkMRMLViewNode\" singletontag=\"QReads1\">"
-      "     <property name=\"viewlabel\" action=\"default\">1</property>"
-      "     <property name=\"viewcolor\" action=\"default\">{QReads1}</property>"
-      "    </view>"
-      "   </item>"
-      "  </layout>"
-      " </item>"
-      "</layout>").format(**QReadsLogic.SLICEVIEW_BACKGROUND_COLORS, **QReadsLogic.THREEDVIEW_BACKGROUND_COLORS)
-    customLayoutId = 503
-    layoutLogic = slicer.app.layoutManager().layoutLogic()
-    layoutLogic.GetLayoutNode().AddLayoutDescription(customLayoutId, customLayout)
-    return customLayoutId
+  def deferredStartupEnabled():
+    """Return True if the ``QReads/DeferredStartupEnabled`` application setting is true.
+
+    In that case, the slice views are shown first and the 3D views are set up once the main window
+    is displayed. QReadsLogic.DEFERRED_MODULES are not loaded at startup, see QReadsLogic.configureDeferredStartup().
+    """
+    return toBool(qt.QSettings().value("QReads/DeferredStartupEnabled", "false"))
 
   @staticmethod
-  def setInverseGrayEnabled(enabled):
-    for volumeNode in slicer.util.getNodesByClass("vtkMRMLScalarVolumeNode"):
-      if volumeNode.GetDisplayNode() is None:
-        continue
-      if enabled:
-        colorNodeID = "vtkMRMLColorTableNodeInvertedGrey"
+  def configureDeferredStartup():
+    """Ignore QReadsLogic.DEFERRED_MODULES at startup if deferred startup is enabled, load them at startup otherwise.
+
+    Modules are ignored using the ``Modules/IgnoreModules`` application setting, which is read when
+    the application starts: the configuration applies from the next launch. Ignored modules are
+    loaded on first use by QReadsLogic.requireModule().
+    """
+    settings = qt.QSettings()
+    ignoredModules = settings.value("Modules/IgnoreModules") or []
+    if isinstance(ignoredModules, str):
+      ignoredModules = [ignoredModules]
+    configuredModules = [name for name in ignoredModules if name not in QReadsLogic.DEFERRED_MODULES]
+    if QReadsLogic.deferredStartupEnabled():
+      configuredModules += QReadsLogic.DEFERRED_MODULES
+    if list(ignoredModules) != configuredModules:
+      settings.setValue("Modules/IgnoreModules", configuredModules)
+
+  @staticmethod
+  def requireModule(moduleName):
+    """Return the module ``moduleName``, loading it if it was ignored at startup.
+
+    Modules depending on it and ignored along with it are loaded as well. Raise a RuntimeError
+    if the module cannot be loaded.
+    """
+    module = getattr(slicer.modules, moduleName.lower(), None)
+    if module is not None:
+      return module
+    with QReadsLogic.LOAD_METRICS.stage("requireModule", module=moduleName):
+      factoryManager = slicer.app.moduleManager().factoryManager()
+      factoryManager.modulesToIgnore = [name for name in factoryManager.modulesToIgnore if name != moduleName]
+      # Ignored modules were neither registered nor instantiated at startup
+      factoryManager.registerModules()
+      factoryManager.instantiateModules()
+      factoryManager.loadModules(factoryManager.instantiatedModuleNames())
+      module = getattr(slicer.modules, moduleName.lower(), None)
+      if module is None:
+        raise RuntimeError("Failed to load module %s" % moduleName)
+      if moduleName == "DICOM":
+        # Database and plugins are set up by the DICOM module once the application has started,
+        # which happened before the module was loaded
+        slicer.modules.DICOMInstance.performPostModuleDiscoveryTasks()
+    return module
+
+  @staticmethod
+  def hangingProtocolName():
+    """Return the name of the hanging protocol set using the ``QReads/HangingProtocol`` application setting.
+
+    Default is the first protocol of ``QReadsLib.HangingProtocol.HANGING_PROTOCOLS``.
+    """
+    from QReadsLib.HangingProtocol import HANGING_PROTOCOLS
+    name = qt.QSettings().value("QReads/HangingProtocol", "")
+    if name not in HANGING_PROTOCOLS:
+      if name:
+        logging.warning("Unknown hanging protocol %s" % name)
+      name = next(iter(HANGING_PROTOCOLS))
+    return name
+
+  @staticmethod
+  def registerCustomLayout(protocolName=None):
+    """Register the layouts of all hanging protocols and return the layout id of ``protocolName``.
+
+    The hanging protocol set in the application settings is used if no name is given.
+    """
+    from QReadsLib.HangingProtocol import HANGING_PROTOCOLS
+    colors = dict(QReadsLogic.SLICEVIEW_BACKGROUND_COLORS, **QReadsLogic.THREEDVIEW_BACKGROUND_COLORS)
+    layoutNode = slicer.app.layoutManager().layoutLogic().GetLayoutNode()
+    for index, protocol in enumerate(HANGING_PROTOCOLS.values()):
+      layoutId = QReadsLogic.HANGING_PROTOCOL_LAYOUT_ID + index
+      if layoutNode.IsLayoutDescription(layoutId):
+        layoutNode.SetLayoutDescription(layoutId, protocol.layoutDescription(colors))
       else:
-        colorNodeID = "vtkMRMLColorTableNodeGrey"
-      volumeNode.GetDisplayNode().SetAndObserveColorNodeID(slicer.util.getNode(colorNodeID).GetID())
+        layoutNode.AddLayoutDescription(layoutId, protocol.layoutDescription(colors))
+    protocolName = protocolName or QReadsLogic.hangingProtocolName()
+    return QReadsLogic.HANGING_PROTOCOL_LAYOUT_ID + list(HANGING_PROTOCOLS.keys()).index(protocolName)
 
-  def setWindowLevelPreset(self, presetName):
+  @staticmethod
+  def setHangingProtocol(protocolName):
+    """Arrange the views using the hanging protocol named ``protocolName``.
+
+    Only the views of the protocol are created, views hidden by a previous protocol stop rendering.
+    """
+    slicer.app.layoutManager().setLayout(QReadsLogic.registerCustomLayout(protocolName))
+
+  @staticmethod
+  def threeDViewRenderThrottle():
+    """Return the object throttling the rendering of the 3D views or None if it is disabled.
+
+    Throttling is configured using the following application settings:
+
+    * ``QReads/LazyThreeDViewRenderingEnabled``: Render 3D views at full rate only while they are hovered
+      or maximized. Default is false.
+    * ``QReads/ThreeDViewIdleUpdateRate``: Maximum number of renders per second otherwise. Default is 1.
+    """
+    settings = qt.QSettings()
+    if not toBool(settings.value("QReads/LazyThreeDViewRenderingEnabled", "false")):
+      return None
+    if QReadsLogic.THREED_VIEW_RENDER_THROTTLE is None:
+      from QReadsLib import ThreeDViewRenderThrottle
+      QReadsLogic.THREED_VIEW_RENDER_THROTTLE = ThreeDViewRenderThrottle()
+    QReadsLogic.THREED_VIEW_RENDER_THROTTLE.idleUpdateRate = float(settings.value("QReads/ThreeDViewIdleUpdateRate", 1.0))
+    return QReadsLogic.THREED_VIEW_RENDER_THROTTLE
+
+  @staticmethod
+  def threeDViewsShown():
+    """Return True if a 3D view is shown in the current layout."""
+    layoutManager = slicer.app.layoutManager()
+    return any(layoutManager.threeDWidget(index).mrmlViewNode().IsMappedInLayout()
+               for index in range(layoutManager.threeDViewCount))
+
+  @staticmethod
+  def refreshThreeDViews():
+    """Render the 3D views now, even if their rendering is throttled."""
+    layoutManager = slicer.app.layoutManager()
+    for index in range(layoutManager.threeDViewCount):
+      threeDWidget = layoutManager.threeDWidget(index)
+      if threeDWidget.mrmlViewNode().IsMappedInLayout():
+        threeDWidget.threeDView().forceRender()
+
+  @staticmethod
+  def sliceLogics():
+    """Return the slice logics of the slice views shown in the current layout."""
+    return [sliceLogic for sliceLogic in slicer.app.applicationLogic().GetSliceLogics()
+            if sliceLogic.GetSliceNode().IsMappedInLayout()]
+
+  @staticmethod
+  def updateViewsRenderEnabled():
+    """Disable rendering of the views that are not shown in the current layout."""
+    layoutManager = slicer.app.layoutManager()
+    for viewName in layoutManager.sliceViewNames():
+      sliceWidget = layoutManager.sliceWidget(viewName)
+      sliceWidget.sliceView().renderEnabled = bool(sliceWidget.mrmlSliceNode().IsMappedInLayout())
+    for index in range(layoutManager.threeDViewCount):
+      threeDWidget = layoutManager.threeDWidget(index)
+      threeDWidget.threeDView().renderEnabled = bool(threeDWidget.mrmlViewNode().IsMappedInLayout())
+
+  @staticmethod
+  def volumeDisplayNodes():
+    """Return the display nodes of all scalar volumes."""
+    displayNodes = []
     for volumeNode in slicer.util.getNodesByClass("vtkMRMLScalarVolumeNode"):
-      volumeDisplayNode = volumeNode.GetDisplayNode()
-      with NodeModify(volumeDisplayNode):
+      # Display nodes of slab volumes are kept in sync with their source volume
+      if volumeNode.GetDisplayNode() is not None and not QReadsLogic.isSlabVolume(volumeNode):
+        displayNodes.append(volumeNode.GetDisplayNode())
+    return displayNodes
+
+  @staticmethod
+  @contextlib.contextmanager
+  def batchDisplayUpdates(displayNodes):
+    """Modify all ``displayNodes`` in a single batch.
+
+    Rendering is paused and modified events of each display node are deferred until the
+    context is exited, so that updating any number of volumes results in a single render.
+    """
+    slicer.app.pauseRender()
+    wasModified = [displayNode.StartModify() for displayNode in displayNodes]
+    try:
+      yield
+    finally:
+      for displayNode, modified in zip(displayNodes, wasModified):
+        displayNode.EndModify(modified)
+      slicer.app.resumeRender()
+
+  @staticmethod
+  def setInverseGrayEnabled(enabled):
+    if enabled:
+      colorNodeID = "vtkMRMLColorTableNodeInvertedGrey"
+    else:
+      colorNodeID = "vtkMRMLColorTableNodeGrey"
+    displayNodes = [displayNode for displayNode in QReadsLogic.volumeDisplayNodes()
+                    if displayNode.GetColorNodeID() != colorNodeID]
+    if not displayNodes:
+      return
+    with QReadsLogic.batchDisplayUpdates(displayNodes):
+      for displayNode in displayNodes:
+        displayNode.SetAndObserveColorNodeID(colorNodeID)
+
+  def setWindowLevelPreset(self, presetName):
+    displayNodes = QReadsLogic.volumeDisplayNodes()
+    with QReadsLogic.batchDisplayUpdates(displayNodes):
+      for volumeDisplayNode in displayNodes:
         volumeDisplayNode.SetAutoWindowLevel(0)
         volumeDisplayNode.SetWindowLevel(*self.WINDOW_LEVEL_PRESETS[presetName])
 
   @staticmethod
   def updateWindowLevel(windowStep=None, levelStep=None):
-    for volumeNode in slicer.util.getNodesByClass("vtkMRMLScalarVolumeNode"):
-      volumeDisplayNode = volumeNode.GetDisplayNode()
-      with NodeModify(volumeDisplayNode):
+    displayNodes = QReadsLogic.volumeDisplayNodes()
+    with QReadsLogic.batchDisplayUpdates(displayNodes):
+      for volumeDisplayNode in displayNodes:
 
         window = volumeDisplayNode.GetWindow()
         if windowStep is not None:
@@ -594,8 +1045,10 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
 
   @staticmethod
   def resetWindowLevel():
-    for volumeNode in slicer.util.getNodesByClass("vtkMRMLScalarVolumeNode"):
-      volumeNode.GetDisplayNode().AutoWindowLevelOn()
+    displayNodes = QReadsLogic.volumeDisplayNodes()
+    with QReadsLogic.batchDisplayUpdates(displayNodes):
+      for volumeDisplayNode in displayNodes:
+        volumeDisplayNode.AutoWindowLevelOn()
 
   @staticmethod
   def slabModeToString(slabMode):
@@ -606,22 +1059,173 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
     return {v: k for k, v in QReadsLogic.SLAB_MODES.items()}[slabModeStr]
 
   @staticmethod
-  def slabThicknessInMmToNumberOfSlices(volumeNode, tichknessInMm):
+  def sliceSpacing(sliceLogic):
+    """Return the distance in mm between the slices resliced along the normal of the view.
+
+    Slicer derives it from the spacing of the background volume along the slice normal, oblique
+    orientations included. It is the distance between two slices of a slab.
+    """
+    xyToRAS = sliceLogic.GetSliceNode().GetXYToRAS()
+    return math.sqrt(sum(xyToRAS.GetElement(row, 2) ** 2 for row in range(3)))
+
+  @staticmethod
+  def slabThicknessInMmToNumberOfSlices(volumeNode, thicknessInMm):
+    """Return the number of slices of a slab of ``thicknessInMm`` along the largest spacing of ``volumeNode``.
+
+    See QReadsLogic.sliceSlabThicknessInMmToNumberOfSlices() to take the orientation of a view into account.
+    """
     if volumeNode is None:
       return 1
-    assert tichknessInMm > 0
-    return int(tichknessInMm / max(volumeNode.GetSpacing()))
+    assert thicknessInMm > 0
+    return int(thicknessInMm / max(volumeNode.GetSpacing()))
+
+  @staticmethod
+  def sliceSlabThicknessInMmToNumberOfSlices(sliceLogic, thicknessInMm):
+    """Return the number of slices of a slab of ``thicknessInMm`` in the view of ``sliceLogic``."""
+    assert thicknessInMm > 0
+    sliceSpacing = QReadsLogic.sliceSpacing(sliceLogic)
+    if sliceSpacing <= 0:
+      return 1
+    return max(1, int(round(thicknessInMm / sliceSpacing)))
+
+  @staticmethod
+  def slabNumberOfSlicesPerView(thicknessInMm=None):
+    """Return a dictionary of view names and number of slices of a slab of ``thicknessInMm``.
+
+    Each view gets one slice if no thickness is given.
+    """
+    numberOfSlicesPerView = {}
+    for sliceLogic in QReadsLogic.sliceLogics():
+      if thicknessInMm is None:
+        numberOfSlicesPerView[sliceLogic.GetName()] = 1
+      else:
+        numberOfSlicesPerView[sliceLogic.GetName()] = QReadsLogic.sliceSlabThicknessInMmToNumberOfSlices(sliceLogic, thicknessInMm)
+    return numberOfSlicesPerView
+
+  @staticmethod
+  def headerScanNumberOfThreads():
+    """Return the number of threads reading DICOM headers and decoding slices or None for the number of CPUs.
+
+    It is QReadsLogic.HEADER_SCAN_NUMBER_OF_THREADS if set, e.g. by batch rendering workers sharing the
+    CPUs, and the ``QReads/HeaderScanNumberOfThreads`` application setting otherwise.
+    """
+    if QReadsLogic.HEADER_SCAN_NUMBER_OF_THREADS:
+      return QReadsLogic.HEADER_SCAN_NUMBER_OF_THREADS
+    return int(qt.QSettings().value("QReads/HeaderScanNumberOfThreads", 0)) or None
+
+  @staticmethod
+  def decoderExecutor():
+    """Return the thread pool shared by the loaders of QReadsLogic.loadDICOMDataDirectoryProgressively().
+
+    All the series of a study are decoded by the same QReadsLogic.headerScanNumberOfThreads() threads
+    instead of a pool per series. The pool is replaced if the number of threads changes, slices already
+    submitted to the previous pool are still decoded.
+    """
+    maximumNumberOfWorkers = QReadsLogic.headerScanNumberOfThreads() or os.cpu_count() or 1
+    if QReadsLogic.DECODER_EXECUTOR is None or QReadsLogic.DECODER_NUMBER_OF_WORKERS != maximumNumberOfWorkers:
+      if QReadsLogic.DECODER_EXECUTOR is not None:
+        QReadsLogic.DECODER_EXECUTOR.shutdown(wait=False)
+      QReadsLogic.DECODER_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+        max_workers=maximumNumberOfWorkers, thread_name_prefix="QReadsDecoder")
+      QReadsLogic.DECODER_NUMBER_OF_WORKERS = maximumNumberOfWorkers
+    return QReadsLogic.DECODER_EXECUTOR
+
+  @staticmethod
+  def slabEngine():
+    """Return the NumPy slab engine or None if it is disabled.
+
+    The engine is enabled using the ``QReads/NumPySlabEngineEnabled`` application setting.
+    Default is false, slabs are then computed by the vtkImageReslice of each view.
+    """
+    if not toBool(qt.QSettings().value("QReads/NumPySlabEngineEnabled", "false")):
+      return None
+    if QReadsLogic.SLAB_ENGINE is None:
+      from QReadsLib.SlabEngine import NumPySlabEngine
+      QReadsLogic.SLAB_ENGINE = NumPySlabEngine(projectionReadyCallback=QReadsLogic.onSlabProjectionReady)
+    return QReadsLogic.SLAB_ENGINE
+
+  @staticmethod
+  def onSlabProjectionReady():
+    """Show the slab projections computed in the background by the NumPy slab engine."""
+    if QReadsLogic.SLAB is not None:
+      QReadsLogic.setSlab(*QReadsLogic.SLAB)
+
+  @staticmethod
+  def slabNumberOfThreads():
+    """Return the number of threads computing the slab of each view or None if multi-threading is disabled.
+
+    Multi-threading is configured using the following application settings:
+
+    * ``QReads/MultiThreadedSlabEnabled``: Split the reslice of each view between threads and reslice all
+      the views in one pass before rendering them (see QReadsLogic.setSlab()). Projections of the NumPy
+      slab engine are reduced by the same number of threads. Default is false.
+    * ``QReads/SlabNumberOfThreads``: Default is 0, meaning the number of CPUs.
+    """
+    settings = qt.QSettings()
+    if not toBool(settings.value("QReads/MultiThreadedSlabEnabled", "false")):
+      return None
+    return int(settings.value("QReads/SlabNumberOfThreads", 0)) or os.cpu_count() or 1
+
+  @staticmethod
+  def isSlabVolume(volumeNode):
+    """Return True if volumeNode was created by the NumPy slab engine to display slabs."""
+    from QReadsLib.SlabEngine import NumPySlabEngine
+    return NumPySlabEngine.isSlabVolume(volumeNode)
 
   @staticmethod
   def setSlab(mode, numberOfSlices):
-    assert numberOfSlices > 0
+    """Set the slab of all the slice views.
+
+    ``numberOfSlices`` is either the number of slices of every view or a dictionary of view names
+    and number of slices, see QReadsLogic.slabNumberOfSlicesPerView().
+    """
     assert mode in QReadsLogic.SLAB_MODES.keys()
-    for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
+    slabs = []
+    for sliceLogic in QReadsLogic.sliceLogics():
+      if isinstance(numberOfSlices, dict):
+        slabs.append((sliceLogic, numberOfSlices.get(sliceLogic.GetName(), 1)))
+      else:
+        slabs.append((sliceLogic, numberOfSlices))
+    assert all(viewNumberOfSlices > 0 for _, viewNumberOfSlices in slabs)
+    QReadsLogic.SLAB = (mode, numberOfSlices)
+    numberOfThreads = QReadsLogic.slabNumberOfThreads()
+    slabEngine = QReadsLogic.slabEngine()
+    if slabEngine is not None:
+      slabEngine.numberOfThreads = numberOfThreads or 1
+      slabEngine.prepare(mode, slabs)
+    for sliceLogic, numberOfSlices in slabs:
       reslice = sliceLogic.GetBackgroundLayer().GetReslice()
-      reslice.SetSlabMode(mode)
-      reslice.SetSlabNumberOfSlices(numberOfSlices)
+      # Output extent of the reslice is split in one piece per thread
+      reslice.SetNumberOfThreads(numberOfThreads or vtk.vtkMultiThreader.GetGlobalDefaultNumberOfThreads())
+      if slabEngine is not None and slabEngine.apply(sliceLogic, mode, numberOfSlices):
+        # Background is the precomputed slab, only the current slice has to be resliced
+        reslice.SetSlabNumberOfSlices(1)
+      else:
+        if QReadsLogic.SLAB_ENGINE is not None:
+          QReadsLogic.SLAB_ENGINE.restore(sliceLogic)
+        reslice.SetSlabMode(mode)
+        reslice.SetSlabNumberOfSlices(numberOfSlices)
+    if numberOfThreads is not None:
+      # Reslice all the views in one pass, so that none of them is rendered before the others are
+      # computed. Views are resliced one after the other since they share the pipeline of the volume.
+      for sliceLogic, _ in slabs:
+        sliceLogic.GetBackgroundLayer().GetReslice().Update()
+    for sliceLogic, _ in slabs:
       sliceLogic.GetBackgroundLayer().Modified()
 
+  @staticmethod
+  def setSlabPreviewEnabled(enabled):
+    """Compute slabs with fewer slices while interacting with the views and at full quality once idle."""
+    if QReadsLogic.SLAB_PREVIEW is None:
+      if not enabled:
+        return
+      from QReadsLib import SlabPreview
+      QReadsLogic.SLAB_PREVIEW = SlabPreview()
+    if enabled:
+      QReadsLogic.SLAB_PREVIEW.start()
+    else:
+      QReadsLogic.SLAB_PREVIEW.stop()
+
   @staticmethod
   def setReferenceMarkersVisible(visible):
     for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
@@ -648,39 +1252,114 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
       viewNode.SetRulerType(rulerType)
       viewNode.SetRulerColor(slicer.vtkMRMLAbstractViewNode.RulerColorYellow)
 
+  @staticmethod
+  def backgroundVolume(sliceLogic):
+    """Return the volume shown as background of the view of ``sliceLogic`` or None.
+
+    For views showing a slab computed by the NumPy slab engine, the volume the slab was
+    computed from is returned.
+    """
+    volumeNode = slicer.mrmlScene.GetNodeByID(sliceLogic.GetSliceCompositeNode().GetBackgroundVolumeID() or "")
+    if volumeNode is not None and QReadsLogic.isSlabVolume(volumeNode):
+      from QReadsLib.SlabEngine import NumPySlabEngine
+      volumeNode = NumPySlabEngine.sourceVolume(volumeNode)
+    return volumeNode
+
+  @staticmethod
+  def displayedVolumes():
+    """Return the volumes shown as background of the slice views, without duplicates."""
+    volumeNodes = []
+    for sliceLogic in QReadsLogic.sliceLogics():
+      volumeNode = QReadsLogic.backgroundVolume(sliceLogic)
+      if volumeNode is not None and volumeNode not in volumeNodes:
+        volumeNodes.append(volumeNode)
+    return volumeNodes
+
+  @staticmethod
+  def volumeGeometry(volumeNode):
+    """Return the cached spacing, RAS box and IJK directions of ``volumeNode``. See VolumeGeometryCache."""
+    return QReadsLogic.VOLUME_GEOMETRY.get(volumeNode)
+
+  @staticmethod
+  def fitSliceKey(sliceLogic):
+    """Return the volume, view size and orientation the fit-to-window geometry of a view depends on."""
+    sliceNode = sliceLogic.GetSliceNode()
+    volumeNode = QReadsLogic.backgroundVolume(sliceLogic)
+    sliceToRAS = sliceNode.GetSliceToRAS()
+    orientation = tuple(round(sliceToRAS.GetElement(row, column), 6) for row in range(3) for column in range(3))
+    return (
+      volumeNode.GetID() if volumeNode is not None else None,
+      QReadsLogic.volumeGeometry(volumeNode),
+      tuple(sliceNode.GetDimensions()),
+      orientation)
+
+  @staticmethod
+  def fitSlice(sliceLogic):
+    """Fit the view of ``sliceLogic`` to its volume.
+
+    The field of view and center computed by FitSliceToAll() are cached per view and reused as long as
+    the background volume, the size of the view and its orientation do not change.
+    """
+    sliceNode = sliceLogic.GetSliceNode()
+    key = QReadsLogic.fitSliceKey(sliceLogic)
+    cached = QReadsLogic.FIT_SLICE_GEOMETRY.get(sliceLogic.GetName())
+    if cached is not None and cached[0] == key:
+      _, fieldOfView, center, xyzOrigin = cached
+      with NodeModify(sliceNode):
+        sliceToRAS = vtk.vtkMatrix4x4()
+        sliceToRAS.DeepCopy(sliceNode.GetSliceToRAS())
+        for row in range(3):
+          sliceToRAS.SetElement(row, 3, center[row])
+        sliceNode.GetSliceToRAS().DeepCopy(sliceToRAS)
+        sliceNode.SetXYZOrigin(*xyzOrigin)
+        sliceNode.SetFieldOfView(*fieldOfView)
+        sliceNode.UpdateMatrices()
+      return
+
+    sliceLogic.FitSliceToAll()
+    sliceToRAS = sliceNode.GetSliceToRAS()
+    QReadsLogic.FIT_SLICE_GEOMETRY[sliceLogic.GetName()] = (
+      key,
+      tuple(sliceNode.GetFieldOfView()),
+      tuple(sliceToRAS.GetElement(row, 3) for row in range(3)),
+      tuple(sliceNode.GetXYZOrigin()))
+
   @staticmethod
   def setZoom(zoom):
-    volumeNode = slicer.mrmlScene.GetFirstNodeByClass("vtkMRMLScalarVolumeNode")
     if zoom == "Fit to window" or zoom == "100%":
-      for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
-        sliceLogic.FitSliceToAll()
+      for sliceLogic in QReadsLogic.sliceLogics():
+        QReadsLogic.fitSlice(sliceLogic)
     elif zoom == "200%":
       QReadsLogic.setSlicesZoom(0.5)
     elif zoom == "400%":
       QReadsLogic.setSlicesZoom(0.25)
     elif zoom == "1:1":
-      QReadsLogic.setSlicesZoomOneToOne(volumeNode)
+      QReadsLogic.setSlicesZoomOneToOne()
 
   @staticmethod
   def setSlicesZoom(factor):
-    for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
+    for sliceLogic in QReadsLogic.sliceLogics():
       sliceNode = sliceLogic.GetSliceNode()
       with NodeModify(sliceNode):
-        sliceLogic.FitSliceToAll()
+        QReadsLogic.fitSlice(sliceLogic)
         fov = sliceNode.GetFieldOfView()
         sliceNode.SetFieldOfView(fov[0] * factor, fov[1] * factor, fov[2])
 
   @staticmethod
-  def setSlicesZoomOneToOne(volumeNode):
+  def setSlicesZoomOneToOne(volumeNode=None):
     """1:1 means image 1 image pixel to 1 screen pixel.
 
     This means 512 by 512 image occupies 512 by 512 screen pixels.
+    Each view is zoomed based on its background volume unless volumeNode is given.
     """
-    for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
+    for sliceLogic in QReadsLogic.sliceLogics():
+      viewVolumeNode = volumeNode if volumeNode is not None else QReadsLogic.backgroundVolume(sliceLogic)
+      if viewVolumeNode is None:
+        continue
       sliceNode = sliceLogic.GetSliceNode()
       with NodeModify(sliceNode):
-        QReadsLogic.setSliceZoomOneToOne(sliceLogic, volumeNode)
-        QReadsLogic.centerSlice(sliceLogic, volumeNode)
+        QReadsLogic.setSliceZoomOneToOne(sliceLogic, viewVolumeNode)
+        QReadsLogic.centerSlice(sliceLogic, viewVolumeNode)
         sliceLogic.SnapSliceOffsetToIJK()
 
   @staticmethod
@@ -692,7 +1371,7 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
     sliceNode = sliceLogic.GetSliceNode()
 
     dimensions = sliceNode.GetDimensions()
-    spacing = volumeNode.GetSpacing()
+    spacing = QReadsLogic.volumeGeometry(volumeNode).spacing
 
     fovX = dimensions[0] * spacing[0]
     fovY = dimensions[1] * spacing[1]
@@ -705,9 +1384,7 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
 
     Copied from vtkMRMLSliceLogic::FitSliceToVolume
     """
-    rasDimensions = [0.0, 0.0, 0.0]
-    rasCenter = [0.0, 0.0, 0.0]
-    slicerLogic = sliceLogic.GetVolumeRASBox(volumeNode, rasDimensions, rasCenter)
+    rasCenter = QReadsLogic.volumeGeometry(volumeNode).rasCenter
 
     sliceNode = sliceLogic.GetSliceNode()
 
@@ -719,35 +1396,631 @@ class QReadsLogic(ScriptedLoadableModuleLogic):
     sliceNode.GetSliceToRAS().DeepCopy(sliceToRAS)
     sliceNode.SetSliceOrigin(0, 0, 0)
 
+  @staticmethod
+  def dicomIndex():
+    """Return the persistent DICOM index or None if it is disabled.
+
+    The index is configured using the following application settings:
+
+    * ``QReads/DICOMIndexEnabled``: Enable the index. Default is false.
+    * ``QReads/DICOMIndexDirectory``: Location of the index. Default is ``<cachePath>/QReadsDICOMIndex``.
+    * ``QReads/DICOMIndexMaximumNumberOfEntries``: Default is 50.
+    * ``QReads/DICOMIndexMaximumSizeInMB``: Default is 512.
+    """
+    settings = qt.QSettings()
+    if not toBool(settings.value("QReads/DICOMIndexEnabled", "false")):
+      return None
+    directory = settings.value("QReads/DICOMIndexDirectory", os.path.join(slicer.app.cachePath, "QReadsDICOMIndex"))
+    maximumNumberOfEntries = int(settings.value("QReads/DICOMIndexMaximumNumberOfEntries", 50))
+    maximumSizeInBytes = int(settings.value("QReads/DICOMIndexMaximumSizeInMB", 512)) * 1024 * 1024
+    if QReadsLogic.DICOM_INDEX is None or QReadsLogic.DICOM_INDEX.directory != os.path.abspath(directory):
+      from QReadsLib import DICOMIndex
+      QReadsLogic.DICOM_INDEX = DICOMIndex(directory)
+    QReadsLogic.DICOM_INDEX.maximumNumberOfEntries = maximumNumberOfEntries
+    QReadsLogic.DICOM_INDEX.maximumSizeInBytes = maximumSizeInBytes
+    return QReadsLogic.DICOM_INDEX
+
+  @staticmethod
+  def loadMetrics():
+    """Return the LoadMetrics object recording the duration of each stage of study loading.
+
+    Records are appended as JSON lines to the file set using the ``QReads/LoadMetricsFile``
+    application setting. Nothing is written if the setting is empty.
+    """
+    QReadsLogic.LOAD_METRICS.filePath = qt.QSettings().value("QReads/LoadMetricsFile", "")
+    return QReadsLogic.LOAD_METRICS
+
+  @staticmethod
+  @contextlib.contextmanager
+  def openDICOMDatabase(dicomDataDir):
+    """Import ``dicomDataDir`` into a DICOM database and make it the application database.
+
+    If the persistent DICOM index is enabled and already has an up-to-date entry for
+    ``dicomDataDir``, the import is skipped. Otherwise, a temporary database is used.
+    """
+    QReadsLogic.requireModule("DICOM")
+    from DICOMLib import DICOMUtils
+
+    dicomIndex = QReadsLogic.dicomIndex()
+    if dicomIndex is not None:
+      with dicomIndex.openDatabase(dicomDataDir, QReadsLogic.importDICOMDirectory) as db:
+        yield db
+    else:
+      with DICOMUtils.TemporaryDICOMDatabase() as db:
+        QReadsLogic.importDICOMDirectory(dicomDataDir, db)
+        yield db
+
+  @staticmethod
+  def importDICOMDirectory(dicomDataDir, db):
+    """Import all DICOM files found in ``dicomDataDir`` into ``db``.
+
+    If ``QReads/ParallelHeaderScanEnabled`` application setting is true, headers are first read
+    concurrently using ``QReads/HeaderScanNumberOfThreads`` threads (default is the number of CPUs)
+    and the scanned tags are stored in the database cache. Otherwise, ``DICOMUtils.importDicom()``
+    is used.
+    """
+    from DICOMLib import DICOMUtils
+
+    metrics = QReadsLogic.LOAD_METRICS
+    settings = qt.QSettings()
+    if not toBool(settings.value("QReads/ParallelHeaderScanEnabled", "false")):
+      with metrics.stage("import"):
+        DICOMUtils.importDicom(dicomDataDir, db)
+      return
+
+    from QReadsLib import DICOMHeaderScanner
+    scanner = DICOMHeaderScanner(
+      tags=list(db.tagsToPrecache) + list(QReadsLogic.DICOM_TAGS),
+      maximumNumberOfWorkers=QReadsLogic.headerScanNumberOfThreads())
+    with metrics.stage("headerScan"):
+      headers = scanner.scanDirectory(dicomDataDir)
+    with metrics.stage("import", numberOfFiles=len(headers)):
+      scanner.importIntoDatabase(db, headers)
+
   @staticmethod
   def loadDICOMDataDirectory(dicomDataDir):
+    """Load all series found in ``dicomDataDir`` and return the list of loaded node IDs.
+
+    If ``QReads/MemoryMappedVolumesEnabled`` application setting is true, the directory is loaded
+    using QReadsLogic.loadDICOMDataDirectoryMapped(). Otherwise, if ``QReads/ProgressiveLoadEnabled``
+    application setting is true, it is loaded using QReadsLogic.loadDICOMDataDirectoryProgressively().
+
+    Duration of each stage is recorded using QReadsLogic.loadMetrics() and volumes whose values
+    are stored as floating point or may be clipped are reported using QReadsLogic.reportScalarTypePromotions().
+    """
+    metrics = QReadsLogic.loadMetrics()
+    metrics.startLoad(directory=dicomDataDir)
+    QReadsLogic.requireModule("DICOM")
+
+    with metrics.stage("loadDICOMDataDirectory"):
+      if QReadsLogic.mappedVolumeStore() is not None:
+        loadedNodeIDs = QReadsLogic.loadDICOMDataDirectoryMapped(dicomDataDir)
+      elif toBool(qt.QSettings().value("QReads/ProgressiveLoadEnabled", "false")):
+        loadedNodeIDs = QReadsLogic.loadDICOMDataDirectoryProgressively(dicomDataDir)
+      else:
+        with QReadsLogic.openDICOMDatabase(dicomDataDir) as db:
+          loadedNodeIDs = QReadsLogic.loadDICOMDatabasePatients(db)
+
+    QReadsLogic.reportScalarTypePromotions(loadedNodeIDs)
+    return loadedNodeIDs
+
+  @staticmethod
+  def loadDICOMDatabasePatients(db):
+    """Load all patients of ``db`` using DICOM plugins and return the list of loaded node IDs."""
     from DICOMLib import DICOMUtils
 
+    metrics = QReadsLogic.LOAD_METRICS
     loadedNodeIDs = []  # this list will contain the list of all loaded node IDs
 
+    patientUIDs = db.patients()
+    for patientUID in patientUIDs:
+      with metrics.stage("loadPatientByUID"):
+        loadedNodeIDs.extend(DICOMUtils.loadPatientByUID(patientUID))
+
+    # Retrieve tag values associated with first instance UID of each loaded volume
+    instanceUIDs = []
+    for nodeID in loadedNodeIDs:
+      node = slicer.mrmlScene.GetNodeByID(nodeID)
+      instanceUIDs.append(node.GetAttribute('DICOM.instanceUIDs').split()[0])
+    with metrics.stage("tagExtraction", numberOfInstances=len(instanceUIDs)):
+      QReadsLogic.DICOM_TAG_VALUES.update(QReadsLogic.readDICOMTagValues(db, instanceUIDs))
+
+    return loadedNodeIDs
+
+  @staticmethod
+  def loadDICOMDataDirectoryProgressively(dicomDataDir):
+    """Load all series found in ``dicomDataDir`` and return the list of loaded node IDs.
+
+    Series of uniformly spaced single-frame images are loaded using a ProgressiveVolumeLoader:
+    the volume nodes are returned before all slices are read and the first volume is shown as soon
+    as its middle slice is decoded. Other series, and series whose slices fail to decode, are loaded
+    using QReadsLogic.loadDICOMHeadersUsingPlugins().
+
+    The number of threads used to read headers and decode slices is set using the
+    ``QReads/HeaderScanNumberOfThreads`` application setting.
+    """
+    from QReadsLib.ProgressiveVolumeLoader import ProgressiveVolumeLoader, TAGS, headerScanner, seriesFilesByUID, seriesGeometry
+
+    metrics = QReadsLogic.LOAD_METRICS
+    maximumNumberOfWorkers = QReadsLogic.headerScanNumberOfThreads()
+    tagsToPrecache = list(slicer.dicomDatabase.tagsToPrecache) if slicer.dicomDatabase else []
+    scanner = headerScanner(
+      additionalTags=tagsToPrecache + list(QReadsLogic.DICOM_TAGS), maximumNumberOfWorkers=maximumNumberOfWorkers)
+    with metrics.stage("headerScan"):
+      headers = scanner.scanDirectory(dicomDataDir)
+
+    # Forget about loaders of previous studies
+    QReadsLogic.PROGRESSIVE_LOADERS = [loader for loader in QReadsLogic.PROGRESSIVE_LOADERS if loader.active]
+
+    loadedNodeIDs = []
+    unsupportedHeaders = {}
+    for seriesHeaders in seriesFilesByUID(headers).values():
+      geometry = seriesGeometry(seriesHeaders)
+      if geometry is None:
+        unsupportedHeaders.update(seriesHeaders)
+        continue
+
+      firstHeader = seriesHeaders[geometry["files"][0]]
+      instanceUIDs = [seriesHeaders[filename][TAGS["sopInstanceUID"]] for filename in geometry["files"]]
+      QReadsLogic.DICOM_TAG_VALUES[instanceUIDs[0]] = {tag: firstHeader[tag] for tag in QReadsLogic.DICOM_TAGS}
+
+      name = "%s: %s" % (firstHeader[TAGS["seriesNumber"]], firstHeader[TAGS["seriesDescription"]])
+      loader = ProgressiveVolumeLoader(
+        geometry,
+        name=name,
+        attributes={"DICOM.instanceUIDs": " ".join(instanceUIDs)},
+        showWhenReady=not loadedNodeIDs,
+        executor=QReadsLogic.decoderExecutor(),
+        firstSliceCallback=lambda volumeNode, name=name: metrics.mark("firstSliceDecoded", series=name),
+        finishedCallback=lambda volumeNode, name=name: metrics.mark("allSlicesDecoded", series=name),
+        failedCallback=lambda volumeNode, seriesHeaders=seriesHeaders: QReadsLogic.loadDICOMHeadersUsingPlugins(seriesHeaders))
+      QReadsLogic.PROGRESSIVE_LOADERS.append(loader)
+      loadedNodeIDs.append(loader.start().GetID())
+
+    loadedNodeIDs.extend(QReadsLogic.loadDICOMHeadersUsingPlugins(unsupportedHeaders))
+    return loadedNodeIDs
+
+  @staticmethod
+  def loadDICOMHeadersUsingPlugins(headers):
+    """Load the files of ``headers`` scanned by a DICOMHeaderScanner using DICOM plugins.
+
+    Return the list of loaded node IDs.
+    """
+    if not headers:
+      return []
+    QReadsLogic.requireModule("DICOM")
+    from DICOMLib import DICOMUtils
+    from QReadsLib import DICOMHeaderScanner
     with DICOMUtils.TemporaryDICOMDatabase() as db:
-      DICOMUtils.importDicom(dicomDataDir, db)
-      patientUIDs = db.patients()
-      for patientUID in patientUIDs:
-        for nodeID in DICOMUtils.loadPatientByUID(patientUID):
+      DICOMHeaderScanner.importIntoDatabase(db, headers)
+      return QReadsLogic.loadDICOMDatabasePatients(db)
+
+  @staticmethod
+  def mappedVolumeStore():
+    """Return the store of scratch files backing memory-mapped volumes or None if it is disabled.
+
+    The store is configured using the following application settings:
+
+    * ``QReads/MemoryMappedVolumesEnabled``: Load volumes using QReadsLogic.loadDICOMDataDirectoryMapped().
+      Default is false.
+    * ``QReads/MemoryMappedVolumesDirectory``: Location of the scratch files. Default is
+      ``<cachePath>/QReadsMappedVolumes``. It should be on a local disk.
+    * ``QReads/MemoryMappedVolumesMaximumSizeInMB``: Default is 20480.
+    """
+    settings = qt.QSettings()
+    if not toBool(settings.value("QReads/MemoryMappedVolumesEnabled", "false")):
+      return None
+    directory = settings.value("QReads/MemoryMappedVolumesDirectory", os.path.join(slicer.app.cachePath, "QReadsMappedVolumes"))
+    if QReadsLogic.MAPPED_VOLUME_STORE is None or QReadsLogic.MAPPED_VOLUME_STORE.directory != os.path.abspath(directory):
+      from QReadsLib.MappedVolumeStore import MappedVolumeStore
+      QReadsLogic.MAPPED_VOLUME_STORE = MappedVolumeStore(directory)
+    QReadsLogic.MAPPED_VOLUME_STORE.maximumSizeInBytes = int(settings.value("QReads/MemoryMappedVolumesMaximumSizeInMB", 20480)) * 1024 * 1024
+    QReadsLogic.MAPPED_VOLUME_STORE.maximumNumberOfWorkers = QReadsLogic.headerScanNumberOfThreads() or os.cpu_count() or 1
+    return QReadsLogic.MAPPED_VOLUME_STORE
+
+  @staticmethod
+  def loadDICOMDataDirectoryMapped(dicomDataDir):
+    """Load all series found in ``dicomDataDir`` and return the list of loaded node IDs.
+
+    Series of uniformly spaced single-frame images are decoded once into scratch files of the
+    QReadsLogic.mappedVolumeStore() and their volumes are backed by memory mappings of these files,
+    so that studies larger than the available memory can be read. Reopening an unchanged series
+    does not decode it again. Other series, and series whose slices fail to decode, are loaded using
+    QReadsLogic.loadDICOMHeadersUsingPlugins().
+
+    The number of threads used to read headers and decode slices is set using the
+    ``QReads/HeaderScanNumberOfThreads`` application setting.
+    """
+    from QReadsLib.ProgressiveVolumeLoader import (
+      TAGS, createDefaultDisplayNodes, createVolumeNode, headerScanner, seriesFilesByUID, seriesGeometry)
+
+    metrics = QReadsLogic.LOAD_METRICS
+    store = QReadsLogic.mappedVolumeStore()
+    tagsToPrecache = list(slicer.dicomDatabase.tagsToPrecache) if slicer.dicomDatabase else []
+    scanner = headerScanner(
+      additionalTags=tagsToPrecache + list(QReadsLogic.DICOM_TAGS),
+      maximumNumberOfWorkers=QReadsLogic.headerScanNumberOfThreads())
+    with metrics.stage("headerScan"):
+      headers = scanner.scanDirectory(dicomDataDir)
+
+    loadedNodeIDs = []
+    unsupportedHeaders = {}
+    for seriesHeaders in seriesFilesByUID(headers).values():
+      geometry = seriesGeometry(seriesHeaders)
+      if geometry is None:
+        unsupportedHeaders.update(seriesHeaders)
+        continue
+
+      firstHeader = seriesHeaders[geometry["files"][0]]
+      name = "%s: %s" % (firstHeader[TAGS["seriesNumber"]], firstHeader[TAGS["seriesDescription"]])
+      try:
+        with metrics.stage("mapSeries", series=name, decoded=not store.contains(geometry)):
+          imageData = store.imageData(geometry)
+      except Exception as exception:
+        logging.error("Failed to decode %s, loading it using DICOM plugins: %s" % (name, exception))
+        unsupportedHeaders.update(seriesHeaders)
+        continue
+
+      instanceUIDs = [seriesHeaders[filename][TAGS["sopInstanceUID"]] for filename in geometry["files"]]
+      QReadsLogic.DICOM_TAG_VALUES[instanceUIDs[0]] = {tag: firstHeader[tag] for tag in QReadsLogic.DICOM_TAGS}
+      volumeNode = createVolumeNode(geometry, name, imageData, {"DICOM.instanceUIDs": " ".join(instanceUIDs)})
+      slicer.mrmlScene.AddNode(volumeNode)
+      volumeNode.UnRegister(slicer.mrmlScene)
+      createDefaultDisplayNodes(volumeNode, geometry)
+      if not loadedNodeIDs:
+        slicer.util.setSliceViewerLayers(background=volumeNode, fit=True)
+      loadedNodeIDs.append(volumeNode.GetID())
+
+    loadedNodeIDs.extend(QReadsLogic.loadDICOMHeadersUsingPlugins(unsupportedHeaders))
+    return loadedNodeIDs
+
+  @staticmethod
+  def viewerServer():
+    """Return the server accepting commands from other processes or None if it is disabled.
+
+    The server is configured using the following application settings:
+
+    * ``QReads/ViewerServerEnabled``: Keep the application running as a viewer server. A new launch of
+      the application forwards its arguments to the running one and exits. Default is false.
+    * ``QReads/ViewerServerName``: Name of the local socket. Default is ``SlicerQReads-<user>``.
+    """
+    settings = qt.QSettings()
+    if not toBool(settings.value("QReads/ViewerServerEnabled", "false")):
+      return None
+    if QReadsLogic.VIEWER_SERVER is None:
+      from QReadsLib import ViewerServer
+      QReadsLogic.VIEWER_SERVER = ViewerServer(settings.value("QReads/ViewerServerName", "") or ViewerServer.defaultServerName())
+    return QReadsLogic.VIEWER_SERVER
+
+  @staticmethod
+  def runLaunchArguments(arguments):
+    """Replace the loaded study as if the application was launched with ``arguments``.
+
+    Positional arguments that are directories are loaded using QReadsLogic.loadDICOMDataDirectory(),
+    then the ``--python-script`` and ``--python-code`` arguments are run. Other arguments are ignored.
+    """
+    import __main__
+    directories, scripts, codes = [], [], []
+    arguments = list(arguments)
+    while arguments:
+      argument = arguments.pop(0)
+      if argument in ("--python-script", "--python-code") and arguments:
+        (scripts if argument == "--python-script" else codes).append(arguments.pop(0))
+      elif not argument.startswith("-") and os.path.isdir(argument):
+        directories.append(argument)
+
+    QReadsLogic.unloadStudy()
+    for directory in directories:
+      QReadsLogic.loadDICOMDataDirectory(directory)
+    for script in scripts:
+      with open(script) as scriptFile:
+        exec(compile(scriptFile.read(), script, "exec"), dict(__main__.__dict__, __file__=script))
+    for code in codes:
+      exec(code, __main__.__dict__)
+
+  @staticmethod
+  def unloadStudy():
+    """Remove the volumes and markups of the loaded study from the scene.
+
+    Unlike closing the scene, the layout, view nodes, slice logics, color nodes and the parameter
+    node are kept, so that the next study is shown without setting up the application again.
+    """
+    for loader in QReadsLogic.PROGRESSIVE_LOADERS:
+      loader.cancel()
+    QReadsLogic.PROGRESSIVE_LOADERS = []
+
+    slicer.mrmlScene.StartState(slicer.mrmlScene.BatchProcessState)
+    try:
+      # Patient items of the subject hierarchy are removed along with their studies and series
+      shNode = slicer.mrmlScene.GetSubjectHierarchyNode()
+      childItemIDs = vtk.vtkIdList()
+      shNode.GetItemChildren(shNode.GetSceneItemID(), childItemIDs)
+      for index in range(childItemIDs.GetNumberOfIds()):
+        itemID = childItemIDs.GetId(index)
+        if shNode.GetItemLevel(itemID) == slicer.vtkMRMLSubjectHierarchyConstants.GetDICOMLevelPatient():
+          shNode.RemoveItem(itemID)
+
+      nodes = []
+      for className in QReadsLogic.STUDY_NODE_CLASSES:
+        for node in slicer.util.getNodesByClass(className):
+          nodes.append(node)
+          nodes.extend(node.GetNthDisplayNode(index) for index in range(node.GetNumberOfDisplayNodes()))
+          if node.GetStorageNode() is not None:
+            nodes.append(node.GetStorageNode())
+      for node in nodes:
+        # Nodes may have been removed along with another one
+        if node is not None and node.GetScene() is not None:
+          slicer.mrmlScene.RemoveNode(node)
+    finally:
+      slicer.mrmlScene.EndState(slicer.mrmlScene.BatchProcessState)
+
+  @staticmethod
+  def replaceStudy(dicomDataDir):
+    """Replace the loaded study with ``dicomDataDir`` and return the list of loaded node IDs.
+
+    See QReadsLogic.unloadStudy() and QReadsLogic.loadDICOMDataDirectory().
+    """
+    QReadsLogic.unloadStudy()
+    return QReadsLogic.loadDICOMDataDirectory(dicomDataDir)
+
+  @staticmethod
+  def renderStudy(dicomDataDir, outputDirectory, spec):
+    """Load ``dicomDataDir`` and write the images described by the RenderSpec ``spec`` of each series.
+
+    Images are computed from the volumes without rendering views, so that studies may be rendered
+    without display. Images of each series are written into a sub-directory of ``outputDirectory``
+    named after the series. Window level is set from ``spec.windowLevelPreset`` or, if it is None,
+    from the volume display node. Return the list of written files.
+    """
+    from QReadsLib.BatchRenderer import renderVolume
+    from QReadsLib.HangingProtocol import VIEWS
+
+    orientations = {}
+    for viewName in spec.views:
+      if viewName not in VIEWS or VIEWS[viewName][0] != "vtkMRMLSliceNode":
+        raise ValueError("Unknown slice view %s" % viewName)
+      orientations[viewName] = VIEWS[viewName][1]
+
+    loadedNodeIDs = QReadsLogic.replaceStudy(dicomDataDir)
+    # Wait for the volumes being loaded progressively
+    while any(loader.active for loader in QReadsLogic.PROGRESSIVE_LOADERS):
+      slicer.app.processEvents()
+
+    filenames = []
+    with QReadsLogic.loadMetrics().stage("renderStudy", numberOfSeries=len(loadedNodeIDs)):
+      for nodeID in loadedNodeIDs:
+        volumeNode = slicer.mrmlScene.GetNodeByID(nodeID)
+        if not volumeNode or not volumeNode.IsA("vtkMRMLScalarVolumeNode") or QReadsLogic.isSlabVolume(volumeNode):
+          continue
+        if spec.windowLevelPreset is not None:
+          window, level = QReadsLogic.WINDOW_LEVEL_PRESETS[spec.windowLevelPreset]
+        else:
+          displayNode = volumeNode.GetDisplayNode()
+          window, level = displayNode.GetWindow(), displayNode.GetLevel()
+        seriesDirectory = "".join(
+          character if character.isalnum() or character in "-_." else "_" for character in volumeNode.GetName())
+        filenames.extend(renderVolume(
+          volumeNode, spec, os.path.join(outputDirectory, seriesDirectory), orientations, window, level))
+    return filenames
+
+  @staticmethod
+  def studyPrefetcher():
+    """Return the prefetcher of work-list studies or None if prefetching is disabled.
+
+    Prefetching is configured using the following application settings:
+
+    * ``QReads/PrefetchNumberOfStudies``: Number of studies following the current one that are
+      prefetched. Default is 2, 0 disables prefetching.
+    * ``QReads/PrefetchMemoryBudgetInMB``: Maximum memory used by the voxels of prefetched studies.
+      Default is 2048.
+    """
+    settings = qt.QSettings()
+    if int(settings.value("QReads/PrefetchNumberOfStudies", 2)) <= 0:
+      return None
+    if QReadsLogic.STUDY_PREFETCHER is None:
+      from QReadsLib.StudyPrefetcher import StudyPrefetcher
+      tagsToPrecache = list(slicer.dicomDatabase.tagsToPrecache) if slicer.dicomDatabase else []
+      QReadsLogic.STUDY_PREFETCHER = StudyPrefetcher(
+        additionalTags=tagsToPrecache + list(QReadsLogic.DICOM_TAGS),
+        maximumNumberOfWorkers=QReadsLogic.headerScanNumberOfThreads())
+    QReadsLogic.STUDY_PREFETCHER.memoryBudgetInBytes = int(settings.value("QReads/PrefetchMemoryBudgetInMB", 2048)) * 1024 * 1024
+    return QReadsLogic.STUDY_PREFETCHER
+
+  @staticmethod
+  def setWorkList(directories):
+    """Set the ordered list of study directories to read and start prefetching the first studies.
+
+    Studies are then loaded using QReadsLogic.loadNextStudy() or QReadsLogic.loadWorkListStudy().
+    """
+    QReadsLogic.WORK_LIST = list(directories)
+    QReadsLogic.WORK_LIST_INDEX = -1
+    QReadsLogic.prefetchWorkList()
+
+  @staticmethod
+  def prefetchWorkList():
+    """Prefetch the studies following the current one in the background and cancel other prefetches."""
+    prefetcher = QReadsLogic.studyPrefetcher()
+    if prefetcher is None:
+      return
+    start = QReadsLogic.WORK_LIST_INDEX + 1
+    numberOfStudies = int(qt.QSettings().value("QReads/PrefetchNumberOfStudies", 2))
+    prefetcher.prefetch(QReadsLogic.WORK_LIST[start:start + numberOfStudies])
+
+  @staticmethod
+  def loadNextStudy():
+    """Load the study following the current one in the work-list and return the list of loaded node IDs."""
+    if QReadsLogic.WORK_LIST_INDEX + 1 >= len(QReadsLogic.WORK_LIST):
+      return []
+    return QReadsLogic.loadWorkListStudy(QReadsLogic.WORK_LIST_INDEX + 1)
 
-          # Retrieve tag values associated with first instance UID
-          node = slicer.mrmlScene.GetNodeByID(nodeID)
-          instanceUID = node.GetAttribute('DICOM.instanceUIDs').split()[0]
-          filename = db.fileForInstance(instanceUID)
-          QReadsLogic.DICOM_TAG_VALUES[instanceUID] = {
-            tag: db.fileValue(filename, tag) for tag in QReadsLogic.DICOM_TAGS
-          }
+  @staticmethod
+  def loadWorkListStudy(index):
+    """Replace the scene content with the study at ``index`` in the work-list.
 
-          loadedNodeIDs.append(nodeID)
+    If the study was prefetched, its decoded series are added to the scene without reading the files
+    again. Otherwise, it is loaded using QReadsLogic.loadDICOMDataDirectory().
+    """
+    directory = QReadsLogic.WORK_LIST[index]
+    QReadsLogic.WORK_LIST_INDEX = index
+    prefetcher = QReadsLogic.STUDY_PREFETCHER
+    study = prefetcher.take(directory) if prefetcher is not None else None
+    QReadsLogic.unloadStudy()
+    if study is not None:
+      loadedNodeIDs = QReadsLogic.loadPrefetchedStudy(study)
+    else:
+      loadedNodeIDs = QReadsLogic.loadDICOMDataDirectory(directory)
+    QReadsLogic.prefetchWorkList()
+    return loadedNodeIDs
 
+  @staticmethod
+  def loadPrefetchedStudy(study):
+    """Add the series decoded by the StudyPrefetcher to the scene and return the list of loaded node IDs."""
+    from QReadsLib.ProgressiveVolumeLoader import createDefaultDisplayNodes, createVolumeNode
+
+    metrics = QReadsLogic.loadMetrics()
+    metrics.startLoad(directory=study.directory, prefetched=True)
+
+    loadedNodeIDs = []
+    with metrics.stage("loadPrefetchedStudy"):
+      for series in study.series:
+        instanceUIDs = series["instanceUIDs"]
+        QReadsLogic.DICOM_TAG_VALUES[instanceUIDs[0]] = {tag: series["headers"][tag] for tag in QReadsLogic.DICOM_TAGS}
+        volumeNode = createVolumeNode(
+          series["geometry"], series["name"], series["imageData"], {"DICOM.instanceUIDs": " ".join(instanceUIDs)})
+        slicer.mrmlScene.AddNode(volumeNode)
+        volumeNode.UnRegister(slicer.mrmlScene)
+        createDefaultDisplayNodes(volumeNode, series["geometry"])
+        if not loadedNodeIDs:
+          slicer.util.setSliceViewerLayers(background=volumeNode, fit=True)
+        loadedNodeIDs.append(volumeNode.GetID())
+
+      loadedNodeIDs.extend(QReadsLogic.loadDICOMHeadersUsingPlugins(study.unsupportedHeaders))
+
+    QReadsLogic.reportScalarTypePromotions(loadedNodeIDs)
     return loadedNodeIDs
 
   @staticmethod
-  def dicomTagValues(volumeNode):
+  def scalarTypePromotion(volumeNode):
+    """Return why the values of ``volumeNode`` are stored using a wider type or None if they are not.
+
+    Floating point volumes take twice (float) or four times (double) the memory of 16-bit volumes
+    in the scene and in each copy made by the reslice pipeline. Sum slabs computed by the NumPy slab
+    engine are stored as 32-bit integers if the sum of their slices does not fit in 16 bits.
+    """
+    from QReadsLib.ProgressiveVolumeLoader import SCALAR_TYPE_PROMOTION_ATTRIBUTE
+    imageData = volumeNode.GetImageData() if volumeNode is not None else None
+    if imageData is None:
+      return None
+    reason = volumeNode.GetAttribute(SCALAR_TYPE_PROMOTION_ATTRIBUTE)
+    if not reason and imageData.GetScalarType() in (vtk.VTK_FLOAT, vtk.VTK_DOUBLE):
+      # Scalar volume plugin uses floating point if rescale slope or intercept are not integers
+      reason = "loaded as %s by DICOM plugins" % imageData.GetScalarTypeAsString()
+    return reason or None
+
+  @staticmethod
+  def scalarTypeClipping(volumeNode):
+    """Return why some values of ``volumeNode`` may be clipped to its scalar type or None if they are not."""
+    from QReadsLib.ProgressiveVolumeLoader import SCALAR_TYPE_CLIPPING_ATTRIBUTE
+    if volumeNode is None or volumeNode.GetImageData() is None:
+      return None
+    return volumeNode.GetAttribute(SCALAR_TYPE_CLIPPING_ATTRIBUTE) or None
+
+  @staticmethod
+  def reportScalarTypePromotions(nodeIDs):
+    """Log a warning and record a load metrics mark for each volume of ``nodeIDs`` stored using a wider type
+    or whose values may be clipped.
+
+    Return a dictionary mapping volume names to the reason of the promotion or clipping.
+    """
+    promotions = {}
+    for nodeID in nodeIDs:
+      volumeNode = slicer.mrmlScene.GetNodeByID(nodeID)
+      if not volumeNode or not volumeNode.IsA("vtkMRMLScalarVolumeNode"):
+        continue
+      scalarType = volumeNode.GetImageData().GetScalarTypeAsString() if volumeNode.GetImageData() else None
+      reason = QReadsLogic.scalarTypePromotion(volumeNode)
+      if reason is not None:
+        logging.warning("Values of %s are stored as %s: %s" % (volumeNode.GetName(), scalarType, reason))
+        QReadsLogic.LOAD_METRICS.mark("scalarTypePromotion", series=volumeNode.GetName(), scalarType=scalarType, reason=reason)
+        promotions[volumeNode.GetName()] = reason
+      reason = QReadsLogic.scalarTypeClipping(volumeNode)
+      if reason is not None:
+        logging.warning("Values of %s may be clipped to %s: %s" % (volumeNode.GetName(), scalarType, reason))
+        QReadsLogic.LOAD_METRICS.mark("scalarTypeClipping", series=volumeNode.GetName(), scalarType=scalarType, reason=reason)
+        promotions[volumeNode.GetName()] = reason
+    return promotions
+
+  @staticmethod
+  def readDICOMTagValues(db, instanceUIDs, tags=None):
+    """Return a dictionary mapping each instance UID to a dictionary of tags and values.
+
+    The header of each instance is read once for all the tags, headers of the different
+    instances being read concurrently. If no tags are specified, QReadsLogic.DICOM_TAGS are read.
+
+    Since tag values are read whenever a volume is shown, the same thread pool, QReadsLogic.TAG_VALUES_EXECUTOR,
+    is used by all calls.
+    """
+    from QReadsLib import DICOMHeaderScanner
+
+    if QReadsLogic.TAG_VALUES_EXECUTOR is None:
+      QReadsLogic.TAG_VALUES_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+        max_workers=QReadsLogic.headerScanNumberOfThreads() or os.cpu_count() or 1, thread_name_prefix="QReadsTagValues")
+    tags = list(tags if tags is not None else QReadsLogic.DICOM_TAGS)
+    instanceUIDsByFilename = {db.fileForInstance(instanceUID): instanceUID for instanceUID in instanceUIDs}
+    headers = DICOMHeaderScanner(tags, executor=QReadsLogic.TAG_VALUES_EXECUTOR).scanFiles(list(instanceUIDsByFilename))
+
+    tagValues = {}
+    for filename, instanceUID in instanceUIDsByFilename.items():
+      if filename in headers:
+        tagValues[instanceUID] = {tag: headers[filename][tag] for tag in tags}
+      else:
+        # Fallback to the database for files that could not be read
+        tagValues[instanceUID] = {tag: db.fileValue(filename, tag) for tag in tags}
+    return tagValues
+
+  @staticmethod
+  def dicomTagValues(volumeNode, tags=None):
     """Return a dictionary of DICOM tags and values associated with first instance UID associated with volumeNode.
 
-    See QReadsLogic.DICOM_TAGS
+    If tags are specified, only the corresponding subset of cached values is returned.
+
+    See QReadsLogic.DICOM_TAGS and QReadsLogic.readDICOMTagValues()
     """
     instanceUIDs = volumeNode.GetAttribute('DICOM.instanceUIDs').split()
-    return QReadsLogic.DICOM_TAG_VALUES[instanceUIDs[0]]
+    values = QReadsLogic.DICOM_TAG_VALUES[instanceUIDs[0]]
+    if tags is None:
+      return values
+    return {tag: values[tag] for tag in tags}
+
+  @staticmethod
+  def loadedInstanceUIDs():
+    """Return the set of first instance UIDs of the volumes in the scene."""
+    instanceUIDs = set()
+    for volumeNode in slicer.util.getNodesByClass("vtkMRMLScalarVolumeNode"):
+      volumeInstanceUIDs = volumeNode.GetAttribute('DICOM.instanceUIDs')
+      if volumeInstanceUIDs:
+        instanceUIDs.add(volumeInstanceUIDs.split()[0])
+    return instanceUIDs
+
+  @staticmethod
+  def releaseDICOMTagValues(volumeNode):
+    """Remove tag values associated with volumeNode from the cache.
+
+    Values are kept if another volume in the scene is associated with the same instance UID.
+    """
+    instanceUIDs = volumeNode.GetAttribute('DICOM.instanceUIDs')
+    if not instanceUIDs:
+      return
+    instanceUID = instanceUIDs.split()[0]
+    for otherVolumeNode in slicer.util.getNodesByClass("vtkMRMLScalarVolumeNode"):
+      if otherVolumeNode is volumeNode:
+        continue
+      otherInstanceUIDs = otherVolumeNode.GetAttribute('DICOM.instanceUIDs')
+      if otherInstanceUIDs and otherInstanceUIDs.split()[0] == instanceUID:
+        return
+    QReadsLogic.DICOM_TAG_VALUES.pop(instanceUID)
+
+  @staticmethod
+  def dicomTagValuesCacheStatistics():
+    """Return hits, misses, evictions and size of QReadsLogic.DICOM_TAG_VALUES."""
+    return QReadsLogic.DICOM_TAG_VALUES.statistics()
@@ -0,0 +1,224 @@
+import collections
+import concurrent.futures
+import logging
+import os
+import subprocess
+import time
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+RenderSpec = collections.namedtuple("RenderSpec", [
+  "views", "slabMode", "slabThicknessInMm", "windowLevelPreset", "inverseGray", "sliceRange", "step", "format"],
+  defaults=[("Red",), None, 0.0, None, False, None, 1, "png"])
+"""Description of the images written by renderVolume().
+
+* ``views``: names of slice views of ``QReadsLib.HangingProtocol.VIEWS`` giving the orientation of each stack
+* ``slabMode``: one of ``vtk.VTK_IMAGE_SLAB_MAX``, ``VTK_IMAGE_SLAB_MEAN``, ``VTK_IMAGE_SLAB_MIN`` or
+  ``VTK_IMAGE_SLAB_SUM``, or None
+* ``slabThicknessInMm``: slabs are computed if larger than the spacing along the view normal
+* ``windowLevelPreset``: name of a preset or None to use the window level of the volume display node
+* ``inverseGray``: invert the gray levels of PNG images
+* ``sliceRange``: (first, last) indices of the slices along the view normal, or None for all slices
+* ``step``: write one slice every ``step`` slices
+* ``format``: ``png`` for one 8-bit PNG image per slice, ``nrrd`` for a stack of the volume values
+"""
+
+SLICE_AXES = {
+  # orientation: RAS directions of the X, Y and normal axes of the slices, as set by vtkMRMLSliceNode
+  "Axial": ((-1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0)),
+  "Sagittal": ((0.0, -1.0, 0.0), (0.0, 0.0, 1.0), (1.0, 0.0, 0.0)),
+  "Coronal": ((-1.0, 0.0, 0.0), (0.0, 0.0, 1.0), (0.0, 1.0, 0.0)),
+}
+
+
+def _matrixToArray(matrix):
+  return np.array([[matrix.GetElement(row, column) for column in range(4)] for row in range(4)])
+
+
+def resliceStack(volumeNode, orientation, slabMode=None, slabThicknessInMm=0.0, sliceRange=None, step=1):
+  """Return the slices of ``volumeNode`` in ``orientation`` as a KJI numpy array and their geometry.
+
+  The returned geometry is a dictionary with the ``spacing``, ``origin`` and ``directions`` of the
+  stack in RAS. In-plane spacing is the smallest spacing of the volume and slices are sampled at the
+  spacing of the volume along the view normal. If ``slabMode`` is set, each slice is the slab of
+  ``slabThicknessInMm`` centered on it, sampled at the same spacing, as computed by the slice views.
+  Sum slabs are returned as floating point values so that they are not clipped to the volume scalar type.
+  """
+  xAxis, yAxis, normal = [np.array(axis) for axis in SLICE_AXES[orientation]]
+  rasToIJK = vtk.vtkMatrix4x4()
+  volumeNode.GetRASToIJKMatrix(rasToIJK)
+  ijkToRAS = np.linalg.inv(_matrixToArray(rasToIJK))
+
+  # Spacing of the volume along each slice axis
+  ijkDirections = [ijkToRAS[:3, axis] for axis in range(3)]
+  spacing = min(np.linalg.norm(direction) for direction in ijkDirections)
+  sliceSpacing = max(abs(np.dot(direction, normal)) for direction in ijkDirections)
+
+  # Bounds of the volume along each slice axis
+  dimensions = volumeNode.GetImageData().GetDimensions()
+  corners = np.array([
+    ijkToRAS.dot([i - 0.5, j - 0.5, k - 0.5, 1.0])[:3]
+    for i in (0, dimensions[0]) for j in (0, dimensions[1]) for k in (0, dimensions[2])])
+  axes = np.array([xAxis, yAxis, normal])
+  projected = corners.dot(axes.T)
+  minimum, maximum = projected.min(axis=0), projected.max(axis=0)
+  numberOfColumns = max(1, int(np.ceil((maximum[0] - minimum[0]) / spacing)))
+  numberOfRows = max(1, int(np.ceil((maximum[1] - minimum[1]) / spacing)))
+  numberOfSlices = max(1, int(np.round((maximum[2] - minimum[2]) / sliceSpacing)))
+
+  first, last = sliceRange if sliceRange is not None else (0, numberOfSlices - 1)
+  first, last = max(0, first), min(numberOfSlices - 1, last)
+  if first > last:
+    raise ValueError("Empty slice range %s for %d slices" % (sliceRange, numberOfSlices))
+  indices = range(first, last + 1, step)
+
+  # Coordinates of the first sample, at the center of the voxels
+  origin = minimum + 0.5 * np.array([spacing, spacing, sliceSpacing])
+  origin[2] += first * sliceSpacing
+  sliceToRAS = np.identity(4)
+  sliceToRAS[:3, :3] = axes.T
+  sliceToRAS[:3, 3] = axes.T.dot(origin)
+
+  resliceAxes = vtk.vtkMatrix4x4()
+  resliceToIJK = _matrixToArray(rasToIJK).dot(sliceToRAS)
+  for row in range(4):
+    for column in range(4):
+      resliceAxes.SetElement(row, column, resliceToIJK[row, column])
+
+  reslice = vtk.vtkImageReslice()
+  reslice.SetInputData(volumeNode.GetImageData())
+  reslice.SetResliceAxes(resliceAxes)
+  reslice.SetInterpolationModeToLinear()
+  reslice.SetOutputOrigin(0.0, 0.0, 0.0)
+  reslice.SetOutputSpacing(spacing, spacing, sliceSpacing * step)
+  reslice.SetOutputExtent(0, numberOfColumns - 1, 0, numberOfRows - 1, 0, len(indices) - 1)
+  numberOfSlabSlices = int(round(slabThicknessInMm / sliceSpacing)) if slabMode is not None else 1
+  if numberOfSlabSlices > 1:
+    reslice.SetSlabMode(slabMode)
+    reslice.SetSlabNumberOfSlices(numberOfSlabSlices)
+    if slabMode == vtk.VTK_IMAGE_SLAB_SUM:
+      reslice.SetOutputScalarType(vtk.VTK_FLOAT)
+    # Sample the slab at the spacing of the volume whatever the step between slices
+    reslice.SetSlabSliceSpacingFraction(1.0 / step)
+  reslice.Update()
+
+  array = numpy_support.vtk_to_numpy(reslice.GetOutput().GetPointData().GetScalars()).reshape(
+    len(indices), numberOfRows, numberOfColumns)
+  geometry = {
+    "spacing": (spacing, spacing, sliceSpacing * step),
+    "origin": tuple(sliceToRAS[:3, 3]),
+    "directions": [tuple(xAxis), tuple(yAxis), tuple(normal)],
+  }
+  return array, geometry
+
+
+def toGray(array, window, level, inverseGray=False):
+  """Map ``array`` values to 8-bit gray levels using ``window`` and ``level``."""
+  lower = level - 0.5 * window
+  gray = np.clip((array.astype(np.float32) - lower) * (255.0 / max(window, 1e-6)), 0, 255).astype(np.uint8)
+  return 255 - gray if inverseGray else gray
+
+
+def writePNGStack(grayArray, directory):
+  """Write each slice of ``grayArray`` into ``directory`` and return the list of filenames."""
+  os.makedirs(directory, exist_ok=True)
+  numberOfSlices, numberOfRows, numberOfColumns = grayArray.shape
+  filenames = []
+  writer = vtk.vtkPNGWriter()
+  for index in range(numberOfSlices):
+    imageData = vtk.vtkImageData()
+    imageData.SetDimensions(numberOfColumns, numberOfRows, 1)
+    imageData.GetPointData().SetScalars(numpy_support.numpy_to_vtk(grayArray[index].reshape(-1), deep=True))
+    filename = os.path.join(directory, "%04d.png" % index)
+    writer.SetInputData(imageData)
+    writer.SetFileName(filename)
+    writer.Write()
+    filenames.append(filename)
+  return filenames
+
+
+NRRD_TYPES = {
+  np.dtype(np.uint8): "uint8",
+  np.dtype(np.int16): "int16",
+  np.dtype(np.uint16): "uint16",
+  np.dtype(np.int32): "int32",
+  np.dtype(np.float32): "float",
+  np.dtype(np.float64): "double",
+}
+
+
+def writeNRRD(array, geometry, filename):
+  """Write the KJI ``array`` with its RAS ``geometry`` as a raw NRRD file and return ``filename``."""
+  os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+  numberOfSlices, numberOfRows, numberOfColumns = array.shape
+  directions = [np.array(direction) * spacing for direction, spacing in zip(geometry["directions"], geometry["spacing"])]
+  header = [
+    "NRRD0004",
+    "type: %s" % NRRD_TYPES[array.dtype],
+    "dimension: 3",
+    "space: right-anterior-superior",
+    "sizes: %d %d %d" % (numberOfColumns, numberOfRows, numberOfSlices),
+    "space directions: %s" % " ".join("(%r,%r,%r)" % tuple(float(value) for value in direction) for direction in directions),
+    "kinds: domain domain domain",
+    "endian: little",
+    "encoding: raw",
+    "space origin: (%r,%r,%r)" % tuple(float(value) for value in geometry["origin"]),
+  ]
+  with open(filename, "wb") as nrrdFile:
+    nrrdFile.write(("\n".join(header) + "\n\n").encode("ascii"))
+    nrrdFile.write(np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")).tobytes())
+  return filename
+
+
+def renderVolume(volumeNode, spec, outputDirectory, orientations, window, level):
+  """Write the images described by the RenderSpec ``spec`` into ``outputDirectory``.
+
+  ``orientations`` maps view names to orientations. Return the list of written files.
+  """
+  filenames = []
+  for viewName in spec.views:
+    array, geometry = resliceStack(
+      volumeNode, orientations[viewName], spec.slabMode, spec.slabThicknessInMm, spec.sliceRange, spec.step)
+    if spec.format == "nrrd":
+      filenames.append(writeNRRD(array, geometry, os.path.join(outputDirectory, "%s.nrrd" % viewName)))
+    elif spec.format == "png":
+      gray = toGray(array, window, level, spec.inverseGray)
+      filenames.extend(writePNGStack(gray, os.path.join(outputDirectory, viewName)))
+    else:
+      raise ValueError("Unsupported format %s" % spec.format)
+  return filenames
+
+
+class BatchRenderer(object):
+  """Run one application process per study, ``maximumNumberOfWorkers`` at a time.
+
+  Each study is rendered by its own process so that studies are loaded and rendered in parallel,
+  memory is released when a study is done and a failing study does not stop the others.
+  ``commandForStudy(studyDirectory)`` returns the command line of the process rendering a study.
+
+  Usage::
+
+    renderer = BatchRenderer(lambda study: [launcher, "--no-main-window", "--python-script", script, study])
+    results = renderer.render(["/path/to/study1", "/path/to/study2"])
+  """
+
+  def __init__(self, commandForStudy, maximumNumberOfWorkers=None, environment=None):
+    self.commandForStudy = commandForStudy
+    self.maximumNumberOfWorkers = maximumNumberOfWorkers or os.cpu_count() or 1
+    self.environment = environment
+
+  def _renderStudy(self, studyDirectory):
+    startTime = time.perf_counter()
+    completed = subprocess.run(
+      self.commandForStudy(studyDirectory), env=self.environment,
+      stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    if completed.returncode != 0:
+      logging.error("Failed to render %s:\n%s" % (studyDirectory, completed.stdout))
+    return completed.returncode, time.perf_counter() - startTime
+
+  def render(self, studyDirectories):
+    """Render ``studyDirectories`` and return a dictionary mapping each one to (return code, duration)."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=self.maximumNumberOfWorkers) as executor:
+      return dict(zip(studyDirectories, executor.map(self._renderStudy, studyDirectories)))
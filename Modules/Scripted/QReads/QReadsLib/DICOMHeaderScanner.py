@@ -0,0 +1,137 @@
+import concurrent.futures
+import contextlib
+import logging
+import os
+
+
+SOP_INSTANCE_UID_TAG = "0008,0018"
+
+def tagFromString(tagStr):
+  """Convert a ``gggg,eeee`` string into a pydicom tag."""
+  import pydicom
+  group, element = tagStr.split(",")
+  return pydicom.tag.Tag(int(group, 16), int(element, 16))
+
+
+def valueToString(value):
+  """Convert a pydicom element value into the string representation returned by ctkDICOMDatabase.
+
+  Multi-valued elements are joined using a backslash, sequences are returned as an empty string.
+  """
+  import pydicom
+  if value is None or isinstance(value, pydicom.sequence.Sequence):
+    return ""
+  if isinstance(value, bytes):
+    return value.decode("ascii", errors="replace").rstrip("\x00 ")
+  if isinstance(value, (list, tuple, pydicom.multival.MultiValue)):
+    return "\\".join(valueToString(item) for item in value)
+  return str(value)
+
+
+def readHeader(filename, tags):
+  """Return a dictionary of tag values read from the header of ``filename``.
+
+  Reading stops before the pixel data and only the requested elements are parsed.
+  None is returned if the file is not a DICOM file or has no SOP instance UID.
+  """
+  import pydicom
+  try:
+    dataset = pydicom.dcmread(
+      filename, stop_before_pixels=True, specific_tags=[tagFromString(tag) for tag in tags])
+  except (pydicom.errors.InvalidDicomError, OSError, EOFError, ValueError):
+    return None
+  values = {}
+  fileMeta = getattr(dataset, "file_meta", None)
+  for tag in tags:
+    # File meta information elements (group 0002) are not part of the dataset
+    source = fileMeta if tag.startswith("0002,") and fileMeta is not None else dataset
+    element = source.get(tagFromString(tag))
+    values[tag] = valueToString(element.value) if element is not None else ""
+  if not values.get(SOP_INSTANCE_UID_TAG):
+    return None
+  return values
+
+
+class DICOMHeaderScanner(object):
+  """Read the header of many DICOM files concurrently.
+
+  Reading headers is dominated by file I/O, which releases the GIL, so a thread pool
+  is used to overlap reads of many files.
+
+  Usage::
+
+    scanner = DICOMHeaderScanner(tags=["0010,0010", "0020,000e"])
+    headers = scanner.scanDirectory(dicomDataDir)
+    scanner.importIntoDatabase(slicer.dicomDatabase, headers)
+  """
+
+  def __init__(self, tags=None, maximumNumberOfWorkers=None, executor=None):
+    """
+    :param tags: List of ``gggg,eeee`` tags to read. SOP instance UID is always read.
+    :param maximumNumberOfWorkers: Number of threads. Default is the number of CPUs.
+    :param executor: Thread pool reading the headers, e.g. shared by scanners created often.
+      Default is a pool of ``maximumNumberOfWorkers`` threads created for each scan.
+    """
+    self.tags = list(tags or [])
+    if SOP_INSTANCE_UID_TAG not in self.tags:
+      self.tags.append(SOP_INSTANCE_UID_TAG)
+    self.maximumNumberOfWorkers = maximumNumberOfWorkers or os.cpu_count() or 1
+    self.executor = executor
+
+  @staticmethod
+  def listFiles(directory):
+    filenames = []
+    for root, dirs, files in os.walk(directory):
+      dirs.sort()
+      filenames.extend(os.path.join(root, filename) for filename in sorted(files))
+    return filenames
+
+  def scanFiles(self, filenames):
+    """Return a dictionary of filename to tag values for every DICOM file in ``filenames``.
+
+    Files that are not DICOM are ignored.
+    """
+    headers = {}
+    if self.executor is not None:
+      pool = contextlib.nullcontext(self.executor)
+    else:
+      pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.maximumNumberOfWorkers)
+    with pool as executor:
+      for filename, values in zip(filenames, executor.map(lambda filename: readHeader(filename, self.tags), filenames)):
+        if values is not None:
+          headers[filename] = values
+    logging.info("Scanned %d DICOM headers out of %d files" % (len(headers), len(filenames)))
+    return headers
+
+  def scanDirectory(self, directory):
+    return self.scanFiles(self.listFiles(directory))
+
+  @staticmethod
+  def importIntoDatabase(db, headers):
+    """Insert scanned files into ``db`` and populate its tag cache with the scanned values.
+
+    Files are referenced, not copied, and inserted using ``db.insert()`` so that the database
+    updates its patients, studies and series as for any other import. Caching the tags ensures
+    that DICOM plugins examining the files using ``db.fileValue()`` do not have to read the
+    headers again.
+    """
+    # Tags are cached below in a single call, there is no need for the database
+    # to look them up while inserting each file.
+    tagsToPrecache = db.tagsToPrecache
+    db.tagsToPrecache = []
+    try:
+      for filename in headers:
+        db.insert(filename, False, False)
+    finally:
+      db.tagsToPrecache = tagsToPrecache
+
+    sopInstanceUIDs = []
+    tags = []
+    values = []
+    for tagValues in headers.values():
+      sopInstanceUID = tagValues[SOP_INSTANCE_UID_TAG]
+      for tag, value in tagValues.items():
+        sopInstanceUIDs.append(sopInstanceUID)
+        tags.append(tag)
+        values.append(value)
+    db.cacheTags(sopInstanceUIDs, tags, values)
@@ -0,0 +1,176 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import qt, slicer
+
+
+class DICOMIndex(object):
+  """Persistent on-disk collection of DICOM databases, one per imported directory.
+
+  Each entry is a regular ctkDICOMDatabase created by importing a DICOM directory. Entries are
+  keyed by the absolute path of the directory and validated using a fingerprint computed from
+  the relative path, size and modification time of every file it contains. If any file is added,
+  removed or modified, the entry is discarded and the directory is imported again.
+
+  Entries are evicted in least recently used order when either the number of entries or the
+  total size of the index exceeds the configured limits.
+
+  Since the DICOM files are not copied into the index, each entry only holds the database
+  itself and is small compared to the data it references.
+  """
+
+  MANIFEST_FILENAME = "QReadsDICOMIndex.json"
+
+  def __init__(self, directory, maximumNumberOfEntries=50, maximumSizeInBytes=512 * 1024 * 1024):
+    self.directory = os.path.abspath(directory)
+    self.maximumNumberOfEntries = maximumNumberOfEntries
+    self.maximumSizeInBytes = maximumSizeInBytes
+    self._manifest = None
+
+  @staticmethod
+  def entryKey(dicomDataDir):
+    """Return the key identifying the entry associated with ``dicomDataDir``."""
+    normalizedPath = os.path.normcase(os.path.abspath(dicomDataDir))
+    return hashlib.sha1(normalizedPath.encode("utf-8")).hexdigest()
+
+  @staticmethod
+  def fingerprint(dicomDataDir):
+    """Return a digest of the relative path, size and modification time of every file in ``dicomDataDir``.
+
+    Only file system metadata is read, file content is not accessed.
+    """
+    entries = []
+    for root, dirs, files in os.walk(dicomDataDir):
+      dirs.sort()
+      for filename in sorted(files):
+        filePath = os.path.join(root, filename)
+        try:
+          stat = os.stat(filePath)
+        except OSError:
+          continue
+        entries.append("%s|%d|%d" % (os.path.relpath(filePath, dicomDataDir), stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha1("\n".join(entries).encode("utf-8")).hexdigest()
+
+  def entryDirectory(self, key):
+    return os.path.join(self.directory, key)
+
+  @property
+  def manifest(self):
+    """Dictionary of entry key to entry properties (directory, fingerprint, lastAccess and size)."""
+    if self._manifest is None:
+      manifestPath = os.path.join(self.directory, self.MANIFEST_FILENAME)
+      try:
+        with open(manifestPath, "r") as manifestFile:
+          self._manifest = json.load(manifestFile)
+      except (OSError, ValueError):
+        self._manifest = {}
+    return self._manifest
+
+  def saveManifest(self):
+    os.makedirs(self.directory, exist_ok=True)
+    manifestPath = os.path.join(self.directory, self.MANIFEST_FILENAME)
+    temporaryManifestPath = manifestPath + ".tmp"
+    with open(temporaryManifestPath, "w") as manifestFile:
+      json.dump(self.manifest, manifestFile, indent=2)
+    os.replace(temporaryManifestPath, manifestPath)
+
+  def removeEntry(self, key):
+    self.manifest.pop(key, None)
+    shutil.rmtree(self.entryDirectory(key), ignore_errors=True)
+
+  def clear(self):
+    for key in list(self.manifest.keys()):
+      self.removeEntry(key)
+    self.saveManifest()
+
+  def totalSizeInBytes(self):
+    return sum(entry["size"] for entry in self.manifest.values())
+
+  def evict(self, keep=None):
+    """Remove least recently used entries until the index fits within the configured limits.
+
+    The entry identified by ``keep`` is never evicted.
+    """
+    keys = sorted(self.manifest.keys(), key=lambda key: self.manifest[key]["lastAccess"])
+    for key in keys:
+      if (len(self.manifest) <= self.maximumNumberOfEntries
+          and self.totalSizeInBytes() <= self.maximumSizeInBytes):
+        break
+      if key == keep:
+        continue
+      logging.info("Evicting DICOM index entry for %s" % self.manifest[key]["directory"])
+      self.removeEntry(key)
+
+  @staticmethod
+  def _directorySizeInBytes(directory):
+    size = 0
+    for root, dirs, files in os.walk(directory):
+      for filename in files:
+        try:
+          size += os.path.getsize(os.path.join(root, filename))
+        except OSError:
+          pass
+    return size
+
+  @contextlib.contextmanager
+  def openDatabase(self, dicomDataDir, importDirectory=None):
+    """Open the database associated with ``dicomDataDir`` as the application DICOM database.
+
+    The directory is imported only if it has no valid entry, using ``importDirectory(dicomDataDir, db)``
+    if specified or ``DICOMUtils.importDicom()`` otherwise. The original application database is
+    restored when the context is exited.
+
+    Usage::
+
+      with index.openDatabase(dicomDataDir) as db:
+        patientUIDs = db.patients()
+    """
+    from DICOMLib import DICOMUtils
+
+    if importDirectory is None:
+      importDirectory = DICOMUtils.importDicom
+
+    key = self.entryKey(dicomDataDir)
+    fingerprint = self.fingerprint(dicomDataDir)
+    entry = self.manifest.get(key)
+    entryDirectory = self.entryDirectory(key)
+
+    if entry is not None and (entry["fingerprint"] != fingerprint or not os.path.isdir(entryDirectory)):
+      logging.info("Invalidating DICOM index entry for %s" % dicomDataDir)
+      self.removeEntry(key)
+      entry = None
+
+    settings = qt.QSettings()
+    originalDatabaseDir = settings.value(slicer.dicomDatabaseDirectorySettingsKey)
+    settings.setValue(slicer.dicomDatabaseDirectorySettingsKey, entryDirectory)
+    os.makedirs(entryDirectory, exist_ok=True)
+    DICOMUtils.openDatabase(entryDirectory)
+
+    imported = False
+    try:
+      if entry is None:
+        importDirectory(dicomDataDir, slicer.dicomDatabase)
+      else:
+        logging.info("Using DICOM index entry for %s" % dicomDataDir)
+      imported = True
+      yield slicer.dicomDatabase
+    finally:
+      DICOMUtils.closeTemporaryDatabase(originalDatabaseDir, cleanup=False)
+
+      if imported:
+        self.manifest[key] = {
+          "directory": os.path.abspath(dicomDataDir),
+          "fingerprint": fingerprint,
+          "lastAccess": time.time(),
+          "size": self._directorySizeInBytes(entryDirectory)
+        }
+        self.evict(keep=key)
+      else:
+        # Do not keep partially imported entries
+        self.removeEntry(key)
+      self.saveManifest()
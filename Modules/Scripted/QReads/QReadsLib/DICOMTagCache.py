@@ -0,0 +1,95 @@
+import collections
+import sys
+
+
+class DICOMTagCache(object):
+  """Bounded map of instance UID to dictionary of DICOM tag values.
+
+  When the cache is full, least recently used entries are evicted, except entries whose instance UID
+  is returned by ``inUseInstanceUIDs``, a function returning the set of instance UIDs of the volumes
+  still loaded. The cache grows beyond ``maximumNumberOfEntries`` if all its entries are in use.
+  Hits, misses and evictions are counted to allow monitoring the cache using statistics().
+  """
+
+  def __init__(self, maximumNumberOfEntries=256, inUseInstanceUIDs=None):
+    self.maximumNumberOfEntries = maximumNumberOfEntries
+    self.inUseInstanceUIDs = inUseInstanceUIDs
+    self._entries = collections.OrderedDict()
+    self.resetStatistics()
+
+  def resetStatistics(self):
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def __len__(self):
+    return len(self._entries)
+
+  def __contains__(self, instanceUID):
+    return instanceUID in self._entries
+
+  def __getitem__(self, instanceUID):
+    try:
+      values = self._entries[instanceUID]
+    except KeyError:
+      self.misses += 1
+      raise
+    self.hits += 1
+    self._entries.move_to_end(instanceUID)
+    return values
+
+  def __setitem__(self, instanceUID, values):
+    self._entries[instanceUID] = values
+    self._entries.move_to_end(instanceUID)
+    self._evict([instanceUID])
+
+  def get(self, instanceUID, default=None):
+    try:
+      return self[instanceUID]
+    except KeyError:
+      return default
+
+  def update(self, values):
+    for instanceUID, tagValues in values.items():
+      self._entries[instanceUID] = tagValues
+      self._entries.move_to_end(instanceUID)
+    self._evict(values)
+
+  def _evict(self, insertedInstanceUIDs):
+    """Evict least recently used entries that are neither in use nor just inserted."""
+    if len(self._entries) <= self.maximumNumberOfEntries:
+      return
+    # Volumes of inserted entries are usually not in the scene yet
+    keptInstanceUIDs = set(insertedInstanceUIDs)
+    if self.inUseInstanceUIDs is not None:
+      keptInstanceUIDs.update(self.inUseInstanceUIDs())
+    for instanceUID in list(self._entries):
+      if len(self._entries) <= self.maximumNumberOfEntries:
+        break
+      if instanceUID not in keptInstanceUIDs:
+        del self._entries[instanceUID]
+        self.evictions += 1
+
+  def pop(self, instanceUID, default=None):
+    return self._entries.pop(instanceUID, default)
+
+  def clear(self):
+    self._entries.clear()
+
+  def approximateSizeInBytes(self):
+    size = sys.getsizeof(self._entries)
+    for instanceUID, tagValues in self._entries.items():
+      size += sys.getsizeof(instanceUID) + sys.getsizeof(tagValues)
+      size += sum(sys.getsizeof(tag) + sys.getsizeof(value) for tag, value in tagValues.items())
+    return size
+
+  def statistics(self):
+    """Return a dictionary with the number of hits, misses and evictions along with the current size."""
+    return {
+      "hits": self.hits,
+      "misses": self.misses,
+      "evictions": self.evictions,
+      "numberOfEntries": len(self._entries),
+      "maximumNumberOfEntries": self.maximumNumberOfEntries,
+      "approximateSizeInBytes": self.approximateSizeInBytes()
+    }
@@ -0,0 +1,70 @@
+import collections
+
+VIEWS = collections.OrderedDict([
+  # name: (view node class, orientation, label)
+  ("Red", ("vtkMRMLSliceNode", "Axial", "B")),
+  ("Yellow", ("vtkMRMLSliceNode", "Sagittal", "R")),
+  ("Green", ("vtkMRMLSliceNode", "Coronal", "G")),
+  ("QReadsCompare", ("vtkMRMLSliceNode", "Axial", "C")),
+  ("QReads1", ("vtkMRMLViewNode", None, "1")),
+])
+"""Views that may be arranged by hanging protocols"""
+
+
+class HangingProtocol(object):
+  """Declarative description of a layout of views.
+
+  ``rows`` is a list of rows, each row being the list of the names of the views it shows from left
+  to right. Views are defined in ``VIEWS``. Only the views listed in the protocol are created by the
+  layout manager when the protocol is applied.
+
+  Usage::
+
+    protocol = HangingProtocol("1x3", [["Red", "Yellow", "Green"]])
+    layoutNode.AddLayoutDescription(layoutId, protocol.layoutDescription(colors))
+  """
+
+  def __init__(self, name, rows):
+    for viewName in [viewName for row in rows for viewName in row]:
+      if viewName not in VIEWS:
+        raise ValueError("Unknown view %s in hanging protocol %s" % (viewName, name))
+    self.name = name
+    self.rows = rows
+
+  def viewNames(self):
+    return [viewName for row in self.rows for viewName in row]
+
+  def hasThreeDView(self):
+    return any(VIEWS[viewName][0] == "vtkMRMLViewNode" for viewName in self.viewNames())
+
+  @staticmethod
+  def viewDescription(viewName, colors):
+    viewClass, orientation, label = VIEWS[viewName]
+    properties = []
+    if orientation is not None:
+      properties.append("<property name=\"orientation\" action=\"default\">%s</property>" % orientation)
+    action = "relayout" if viewClass == "vtkMRMLSliceNode" else "default"
+    properties.append("<property name=\"viewlabel\" action=\"%s\">%s</property>" % (action, label))
+    properties.append("<property name=\"viewcolor\" action=\"%s\">%s</property>" % (action, colors[viewName]))
+    return "<view class=\"%s\" singletontag=\"%s\">%s</view>" % (viewClass, viewName, "".join(properties))
+
+  def layoutDescription(self, colors):
+    """Return the layout XML description. ``colors`` maps view names to view colors."""
+    rows = []
+    for row in self.rows:
+      items = "".join("<item>%s</item>" % self.viewDescription(viewName, colors) for viewName in row)
+      rows.append("<item><layout type=\"horizontal\">%s</layout></item>" % items)
+    return "<layout type=\"vertical\">%s</layout>" % "".join(rows)
+
+
+HANGING_PROTOCOLS = collections.OrderedDict((protocol.name, protocol) for protocol in [
+  HangingProtocol("2x2", [["Red", "Yellow"], ["Green", "QReads1"]]),
+  HangingProtocol("2x2 without 3D", [["Red", "Yellow"], ["Green"]]),
+  HangingProtocol("1x1", [["Red"]]),
+  HangingProtocol("1x1 with 3D", [["Red", "QReads1"]]),
+  HangingProtocol("1x3", [["Red", "Yellow", "Green"]]),
+  HangingProtocol("1x3 with 3D", [["Red", "Yellow", "Green"], ["QReads1"]]),
+  HangingProtocol("Side by side", [["Red", "QReadsCompare"]]),
+  HangingProtocol("Side by side with 3D", [["Red", "QReadsCompare", "QReads1"]]),
+])
+"""Hanging protocols by name. The first one is the default."""
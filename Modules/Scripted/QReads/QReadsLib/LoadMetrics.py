@@ -0,0 +1,84 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+
+class LoadMetrics(object):
+  """Record the duration of each stage of study loading as JSON lines.
+
+  Each call to ``startLoad()`` starts a new load identified by a unique ``loadId``. Subsequent stages
+  are recorded relative to the start of the current load, with one record per line::
+
+    {"loadId": "...", "stage": "import", "start": 0.012, "duration": 1.53, "time": 1626274400.1, ...}
+
+  ``start`` is the number of seconds since the load started. Additional keyword arguments
+  (e.g. ``series``) are written along with each record. Records are appended to ``filePath``
+  and nothing is written if it is empty, in which case recording only costs a few clock reads.
+
+  Usage::
+
+    metrics = LoadMetrics("/path/to/metrics.jsonl")
+    metrics.startLoad(directory=dicomDataDir)
+    with metrics.stage("import"):
+      importDirectory()
+    metrics.mark("firstRender", series="1: Axial")
+  """
+
+  def __init__(self, filePath=""):
+    self.filePath = filePath
+    self.loadId = None
+    self.loadStartTime = None
+    self._lock = threading.Lock()
+
+  @property
+  def enabled(self):
+    return bool(self.filePath)
+
+  def startLoad(self, **attributes):
+    self.loadId = uuid.uuid4().hex
+    self.loadStartTime = time.perf_counter()
+    self.record("start", self.loadStartTime, 0.0, **attributes)
+    return self.loadId
+
+  def elapsedTime(self):
+    """Return the number of seconds since the current load started."""
+    if self.loadStartTime is None:
+      return 0.0
+    return time.perf_counter() - self.loadStartTime
+
+  @contextlib.contextmanager
+  def stage(self, name, **attributes):
+    startTime = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.record(name, startTime, time.perf_counter() - startTime, **attributes)
+
+  def mark(self, name, duration=0.0, **attributes):
+    """Record a stage ending now and lasting ``duration`` seconds."""
+    self.record(name, time.perf_counter() - duration, duration, **attributes)
+
+  def record(self, name, startTime, duration, **attributes):
+    if not self.enabled:
+      return
+    entry = {
+      "loadId": self.loadId,
+      "stage": name,
+      "start": round(startTime - self.loadStartTime, 6) if self.loadStartTime is not None else None,
+      "duration": round(duration, 6),
+      "time": time.time(),
+    }
+    entry.update(attributes)
+    try:
+      with self._lock:
+        directory = os.path.dirname(self.filePath)
+        if directory:
+          os.makedirs(directory, exist_ok=True)
+        with open(self.filePath, "a") as metricsFile:
+          metricsFile.write(json.dumps(entry) + "\n")
+    except OSError as exception:
+      logging.warning("Failed to write load metrics to %s: %s" % (self.filePath, exception))
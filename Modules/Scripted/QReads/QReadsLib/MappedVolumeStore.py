@@ -0,0 +1,157 @@
+import concurrent.futures
+import hashlib
+import logging
+import os
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+from .ProgressiveVolumeLoader import readSlice
+
+
+class MappedVolumeStore(object):
+  """Scratch directory of decoded series backing image data with memory-mapped files.
+
+  The voxels of a series are decoded once into a ``.npy`` file of the scratch directory. Image
+  data returned by imageData() share the memory of a copy-on-write mapping of that file, so that
+  the operating system reads slices from the file when views need them and may drop them again
+  under memory pressure, instead of keeping every series resident or in swap.
+
+  Files are keyed by the path, size and modification time of the DICOM files of the series and by
+  the rescaling of their values: reopening an unchanged series maps the existing file without
+  decoding it again. Least recently used files are removed when the directory exceeds
+  ``maximumSizeInBytes``.
+
+  Usage::
+
+    store = MappedVolumeStore("/path/to/scratch")
+    imageData = store.imageData(seriesGeometry(seriesHeaders))
+  """
+
+  FILE_EXTENSION = ".npy"
+
+  def __init__(self, directory, maximumSizeInBytes=20 * 1024 * 1024 * 1024, maximumNumberOfWorkers=None):
+    self.directory = os.path.abspath(directory)
+    self.maximumSizeInBytes = maximumSizeInBytes
+    self.maximumNumberOfWorkers = maximumNumberOfWorkers or os.cpu_count() or 1
+
+  @staticmethod
+  def seriesKey(geometry):
+    """Return the key identifying the scratch file of the series described by ``geometry``."""
+    entries = ["%s|%s|%s" % (np.dtype(geometry["scalarType"]).str, geometry["dimensions"], geometry["rescale"])]
+    for filename in geometry["files"]:
+      stat = os.stat(filename)
+      entries.append("%s|%d|%d" % (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha1("\n".join(entries).encode("utf-8")).hexdigest()
+
+  def scratchPath(self, key):
+    return os.path.join(self.directory, key + self.FILE_EXTENSION)
+
+  def contains(self, geometry):
+    return os.path.exists(self.scratchPath(self.seriesKey(geometry)))
+
+  def scratchFiles(self):
+    """Return the list of (path, size, last access) of the scratch files."""
+    files = []
+    try:
+      names = os.listdir(self.directory)
+    except OSError:
+      return files
+    for name in names:
+      if not name.endswith(self.FILE_EXTENSION):
+        continue
+      path = os.path.join(self.directory, name)
+      try:
+        stat = os.stat(path)
+      except OSError:
+        continue
+      files.append((path, stat.st_size, stat.st_mtime))
+    return files
+
+  def totalSizeInBytes(self):
+    return sum(size for _, size, _ in self.scratchFiles())
+
+  def evict(self, keep=None):
+    """Remove least recently used scratch files until the directory fits within ``maximumSizeInBytes``.
+
+    The file at path ``keep`` is never removed.
+    """
+    files = sorted(self.scratchFiles(), key=lambda item: item[2])
+    totalSizeInBytes = sum(size for _, size, _ in files)
+    for path, size, _ in files:
+      if totalSizeInBytes <= self.maximumSizeInBytes:
+        break
+      if path == keep:
+        continue
+      try:
+        os.remove(path)
+      except OSError:
+        # File may still be mapped on platforms not allowing to remove it
+        continue
+      logging.info("Evicting scratch file %s" % path)
+      totalSizeInBytes -= size
+
+  def clear(self):
+    for path, _, _ in self.scratchFiles():
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+
+  def decode(self, geometry, path):
+    """Decode the slices of the series described by ``geometry`` into the scratch file ``path``.
+
+    Slices are written to a temporary file renamed once complete, so that an interrupted decoding
+    is never mistaken for a valid scratch file.
+    """
+    os.makedirs(self.directory, exist_ok=True)
+    numberOfColumns, numberOfRows, numberOfSlices = geometry["dimensions"]
+    scalarType = geometry["scalarType"]
+    temporaryPath = path + ".tmp"
+    array = np.lib.format.open_memmap(
+      temporaryPath, mode="w+", dtype=scalarType, shape=(numberOfSlices, numberOfRows, numberOfColumns))
+
+    def _decodeSlice(index):
+      slope, intercept = geometry["rescale"][index]
+      array[index] = readSlice(geometry["files"][index], slope, intercept, scalarType)
+
+    try:
+      with concurrent.futures.ThreadPoolExecutor(max_workers=self.maximumNumberOfWorkers) as decoder:
+        # Consume the results to raise exceptions of the workers
+        list(decoder.map(_decodeSlice, range(numberOfSlices)))
+      array.flush()
+    except Exception:
+      del array
+      os.remove(temporaryPath)
+      raise
+    del array
+    os.replace(temporaryPath, path)
+
+  def imageData(self, geometry):
+    """Return image data of the series described by ``geometry`` backed by its scratch file.
+
+    The series is decoded first if it has no scratch file yet. Voxels modified in the image data are
+    not written back to the file.
+    """
+    path = self.scratchPath(self.seriesKey(geometry))
+    if os.path.exists(path):
+      logging.info("Using scratch file %s" % path)
+      # Mark the file as recently used
+      os.utime(path)
+    else:
+      self.decode(geometry, path)
+      self.evict(keep=path)
+
+    array = np.load(path, mmap_mode="c")
+    numberOfColumns, numberOfRows, numberOfSlices = geometry["dimensions"]
+    if array.shape != (numberOfSlices, numberOfRows, numberOfColumns):
+      raise ValueError("Scratch file %s does not match the series dimensions" % path)
+
+    imageData = vtk.vtkImageData()
+    imageData.SetDimensions(numberOfColumns, numberOfRows, numberOfSlices)
+    # The VTK array keeps a reference to the mapped array, the mapping is released with the image data
+    scalars = numpy_support.numpy_to_vtk(array.reshape(-1), deep=False)
+    scalars.SetName("ImageScalars")
+    imageData.GetPointData().SetScalars(scalars)
+    return imageData
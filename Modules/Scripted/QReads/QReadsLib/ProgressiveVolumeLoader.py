@@ -0,0 +1,426 @@
+import concurrent.futures
+import logging
+import os
+
+import numpy as np
+import qt, vtk, slicer
+from vtk.util import numpy_support
+
+from .DICOMHeaderScanner import DICOMHeaderScanner
+
+
+TAGS = {
+  "transferSyntaxUID": "0002,0010",
+  "sopInstanceUID": "0008,0018",
+  "modality": "0008,0060",
+  "seriesDescription": "0008,103e",
+  "seriesInstanceUID": "0020,000e",
+  "seriesNumber": "0020,0011",
+  "imagePositionPatient": "0020,0032",
+  "imageOrientationPatient": "0020,0037",
+  "numberOfFrames": "0028,0008",
+  "rows": "0028,0010",
+  "columns": "0028,0011",
+  "pixelSpacing": "0028,0030",
+  "bitsStored": "0028,0101",
+  "pixelRepresentation": "0028,0103",
+  "smallestImagePixelValue": "0028,0106",
+  "largestImagePixelValue": "0028,0107",
+  "windowCenter": "0028,1050",
+  "windowWidth": "0028,1051",
+  "rescaleIntercept": "0028,1052",
+  "rescaleSlope": "0028,1053",
+}
+"""Tags required to compute the geometry and scalar type of a series"""
+
+NATIVE_TRANSFER_SYNTAXES = {
+  "",  # Files without meta information are read as implicit VR little endian
+  "1.2.840.10008.1.2",  # Implicit VR Little Endian
+  "1.2.840.10008.1.2.1",  # Explicit VR Little Endian
+  "1.2.840.10008.1.2.1.99",  # Deflated Explicit VR Little Endian
+  "1.2.840.10008.1.2.2",  # Explicit VR Big Endian
+}
+"""Transfer syntaxes of the pixel data decoded by readSlice() without compression plugins"""
+
+SCALAR_TYPE_PROMOTION_ATTRIBUTE = "QReads.ScalarTypePromotion"
+"""Attribute of volume nodes storing why their values are stored using a wider type"""
+
+SCALAR_TYPE_CLIPPING_ATTRIBUTE = "QReads.ScalarTypeClipping"
+"""Attribute of volume nodes storing why some of their values may be clipped"""
+
+
+def _floats(value):
+  return [float(item) for item in value.split("\\")] if value else []
+
+
+def _firstFloat(value, default):
+  try:
+    values = _floats(value)
+  except ValueError:
+    # Value of an ambiguous VR read as bytes
+    return default
+  return values[0] if values else default
+
+
+def seriesFilesByUID(headers):
+  """Group scanned headers by series instance UID."""
+  series = {}
+  for filename, values in headers.items():
+    series.setdefault(values[TAGS["seriesInstanceUID"]], {})[filename] = values
+  return series
+
+
+def seriesGeometry(seriesHeaders, spacingTolerance=0.01):
+  """Return geometry and scalar type of a series of single-frame images or None if it is not supported.
+
+  Supported series have uncompressed images (see NATIVE_TRANSFER_SYNTAXES) sharing the same size,
+  spacing and orientation, uniformly spaced along the slice normal. Returned dictionary has the following keys:
+
+  * ``files``: filenames sorted along the slice normal
+  * ``dimensions``: number of columns, rows and slices
+  * ``spacing``, ``origin``: in RAS
+  * ``directions``: IJK directions in RAS
+  * ``scalarType``: for integer rescale slopes and intercepts, the first of ``numpy.int16``,
+    ``numpy.uint16`` and ``numpy.int32`` holding the rescaled values, ``numpy.int16`` for CT values.
+    ``numpy.float32`` for non-integer rescale slopes or intercepts, or values not fitting in 32 bits
+  * ``scalarTypePromotion``: reason why values are stored as ``numpy.int32`` or ``numpy.float32`` or None
+  * ``scalarTypeClipping``: reason why CT values may be clipped to ``numpy.int16`` or None
+  * ``rescale``: list of (slope, intercept) for each file
+  * ``windowLevel``: (window, level) of the first file or None if it has no window width and center
+  """
+  first = next(iter(seriesHeaders.values()))
+  for values in seriesHeaders.values():
+    if values[TAGS["transferSyntaxUID"]] not in NATIVE_TRANSFER_SYNTAXES:
+      return None
+    if int(_firstFloat(values[TAGS["numberOfFrames"]], 1)) > 1:
+      return None
+    for key in ["rows", "columns", "pixelSpacing", "imageOrientationPatient"]:
+      if values[TAGS[key]] != first[TAGS[key]]:
+        return None
+    if len(_floats(values[TAGS["imagePositionPatient"]])) != 3:
+      return None
+
+  orientation = _floats(first[TAGS["imageOrientationPatient"]])
+  pixelSpacing = _floats(first[TAGS["pixelSpacing"]])
+  if len(orientation) != 6 or len(pixelSpacing) != 2:
+    return None
+  rowDirection = np.array(orientation[:3])
+  columnDirection = np.array(orientation[3:])
+  sliceDirection = np.cross(rowDirection, columnDirection)
+
+  positions = {filename: np.array(_floats(values[TAGS["imagePositionPatient"]])) for filename, values in seriesHeaders.items()}
+  files = sorted(seriesHeaders, key=lambda filename: np.dot(positions[filename], sliceDirection))
+  distances = np.array([np.dot(positions[filename], sliceDirection) for filename in files])
+
+  if len(files) > 1:
+    sliceSpacings = np.diff(distances)
+    sliceSpacing = float(np.median(sliceSpacings))
+    if sliceSpacing <= 0 or np.max(np.abs(sliceSpacings - sliceSpacing)) > spacingTolerance * sliceSpacing:
+      return None
+  else:
+    sliceSpacing = 1.0
+
+  bitsStored = int(_firstFloat(first[TAGS["bitsStored"]], 16))
+  signed = first[TAGS["pixelRepresentation"]] == "1"
+  defaultStoredRange = (-2 ** (bitsStored - 1), 2 ** (bitsStored - 1) - 1) if signed else (0, 2 ** bitsStored - 1)
+  int16Range = np.iinfo(np.int16)
+
+  rescale = []
+  scalarTypePromotion = None
+  scalarTypeClipping = None
+  minimum, maximum = 0, 0
+  for filename in files:
+    values = seriesHeaders[filename]
+    slope = _firstFloat(values[TAGS["rescaleSlope"]], 1.0)
+    intercept = _firstFloat(values[TAGS["rescaleIntercept"]], 0.0)
+    rescale.append((slope, intercept))
+    if scalarTypePromotion is not None:
+      continue
+    if not slope.is_integer() or not intercept.is_integer():
+      scalarTypePromotion = "non-integer rescale slope %g or intercept %g" % (slope, intercept)
+      continue
+    # Smallest and largest pixel values, when present, are tighter than the range of the stored bits
+    storedRange = (
+      _firstFloat(values[TAGS["smallestImagePixelValue"]], defaultStoredRange[0]),
+      _firstFloat(values[TAGS["largestImagePixelValue"]], defaultStoredRange[1]))
+    rescaledRange = sorted(slope * value + intercept for value in storedRange)
+    # Hounsfield units always fit in 16 bits, CT values outside that range are clipped
+    if values[TAGS["modality"]] == "CT":
+      if rescaledRange[0] < int16Range.min or rescaledRange[1] > int16Range.max:
+        scalarTypeClipping = scalarTypeClipping or "rescaled CT values from %g to %g are clipped to 16 bits" % tuple(rescaledRange)
+      rescaledRange = [max(rescaledRange[0], int16Range.min), min(rescaledRange[1], int16Range.max)]
+    minimum = min(minimum, rescaledRange[0])
+    maximum = max(maximum, rescaledRange[1])
+
+  if scalarTypePromotion is None:
+    # Integer values are stored using the smallest type holding them
+    for scalarType in (np.int16, np.uint16, np.int32):
+      info = np.iinfo(scalarType)
+      if info.min <= minimum and maximum <= info.max:
+        break
+    else:
+      scalarType = np.float32
+    if np.dtype(scalarType).itemsize > 2:
+      scalarTypePromotion = "rescaled values of %d-bit %s pixels from %g to %g do not fit in %d-bit integers" % (
+        bitsStored, "signed" if signed else "unsigned", minimum, maximum, 16 if scalarType == np.int32 else 32)
+  else:
+    scalarType = np.float32
+  if scalarTypePromotion is not None:
+    scalarTypeClipping = None
+
+  window = _firstFloat(first[TAGS["windowWidth"]], 0.0)
+  level = _firstFloat(first[TAGS["windowCenter"]], None)
+  windowLevel = (window, level) if window > 0 and level is not None else None
+
+  lpsToRas = np.array([-1.0, -1.0, 1.0])
+  return {
+    "files": files,
+    "dimensions": (int(first[TAGS["columns"]]), int(first[TAGS["rows"]]), len(files)),
+    "spacing": (pixelSpacing[1], pixelSpacing[0], sliceSpacing),
+    "origin": tuple(positions[files[0]] * lpsToRas),
+    "directions": [tuple(rowDirection * lpsToRas), tuple(columnDirection * lpsToRas), tuple(sliceDirection * lpsToRas)],
+    "scalarType": scalarType,
+    "scalarTypePromotion": scalarTypePromotion,
+    "scalarTypeClipping": scalarTypeClipping,
+    "rescale": rescale,
+    "windowLevel": windowLevel,
+  }
+
+
+def allocateImageData(geometry):
+  """Return image data matching ``geometry`` and a KJI numpy array sharing its memory.
+
+  Voxels are not initialized. Image data may be allocated from any thread.
+  """
+  numberOfColumns, numberOfRows, numberOfSlices = geometry["dimensions"]
+  imageData = vtk.vtkImageData()
+  imageData.SetDimensions(numberOfColumns, numberOfRows, numberOfSlices)
+  imageData.AllocateScalars(numpy_support.get_vtk_array_type(geometry["scalarType"]), 1)
+  array = numpy_support.vtk_to_numpy(imageData.GetPointData().GetScalars()).reshape(
+    numberOfSlices, numberOfRows, numberOfColumns)
+  return imageData, array
+
+
+def createVolumeNode(geometry, name, imageData, attributes=None):
+  """Return a new volume node, not added to the scene yet, showing ``imageData`` with ``geometry``.
+
+  If values of the series are promoted to a wider type or may be clipped, the reason is stored in
+  the SCALAR_TYPE_PROMOTION_ATTRIBUTE or SCALAR_TYPE_CLIPPING_ATTRIBUTE attribute.
+  """
+  volumeNode = slicer.mrmlScene.CreateNodeByClass("vtkMRMLScalarVolumeNode")
+  volumeNode.SetName(name)
+  volumeNode.SetAndObserveImageData(imageData)
+  volumeNode.SetSpacing(*geometry["spacing"])
+  volumeNode.SetOrigin(*geometry["origin"])
+  directions = vtk.vtkMatrix4x4()
+  for column, direction in enumerate(geometry["directions"]):
+    for row in range(3):
+      directions.SetElement(row, column, direction[row])
+  volumeNode.SetIJKToRASDirectionMatrix(directions)
+  if geometry.get("scalarTypePromotion"):
+    volumeNode.SetAttribute(SCALAR_TYPE_PROMOTION_ATTRIBUTE, geometry["scalarTypePromotion"])
+  if geometry.get("scalarTypeClipping"):
+    volumeNode.SetAttribute(SCALAR_TYPE_CLIPPING_ATTRIBUTE, geometry["scalarTypeClipping"])
+  for attributeName, value in (attributes or {}).items():
+    volumeNode.SetAttribute(attributeName, value)
+  return volumeNode
+
+
+def createDefaultDisplayNodes(volumeNode, geometry):
+  """Create the display node of ``volumeNode`` using the window level of ``geometry`` if any."""
+  volumeNode.CreateDefaultDisplayNodes()
+  if geometry.get("windowLevel") is not None:
+    displayNode = volumeNode.GetDisplayNode()
+    displayNode.AutoWindowLevelOff()
+    displayNode.SetWindowLevel(*geometry["windowLevel"])
+
+
+COARSE_STEP = 32
+"""Distance between the slices decoded first. See coarseToFineOrder()"""
+
+
+def coarseToFineOrder(numberOfSlices):
+  """Return slice indices starting with the middle slice, then every COARSE_STEP slice,
+  then refining by halving the step until all slices are listed.
+  """
+  order = [numberOfSlices // 2]
+  listed = set(order)
+  step = COARSE_STEP
+  while step >= 1:
+    for index in range(0, numberOfSlices, step):
+      if index not in listed:
+        order.append(index)
+        listed.add(index)
+    step //= 2
+  return order
+
+
+def readSlice(filename, slope, intercept, scalarType):
+  """Decode the pixel data of ``filename`` and return rescaled values as ``scalarType``.
+
+  Integer rescaling is computed in 32-bit integers, or 64-bit integers for 32-bit ``scalarType``, so that
+  values are not promoted to floating point, and values outside of the range of ``scalarType`` are clipped.
+  """
+  import pydicom
+  pixels = pydicom.dcmread(filename).pixel_array
+  if np.issubdtype(scalarType, np.integer):
+    info = np.iinfo(scalarType)
+    accumulatorType = np.int64 if info.bits > 16 else np.int32
+    values = pixels.astype(accumulatorType) * int(slope) + int(intercept)
+    return np.clip(values, info.min, info.max).astype(scalarType)
+  return (pixels * np.float32(slope) + np.float32(intercept)).astype(scalarType)
+
+
+class ProgressiveVolumeLoader(object):
+  """Load a series of single-frame DICOM images into a volume node, slice by slice.
+
+  The volume node is added to the scene with empty image data as soon as the loader is started.
+  Slices are decoded in background threads, starting with the middle slice followed by a coarse
+  subset of slices. Each slice of the coarse subset is also copied into the following slices not
+  decoded yet so that reformatted views show a low resolution version of the volume.
+  Decoded slices are copied into the image data from the main thread using a timer. Views are only
+  updated when slices of the coarse subset arrive and once all slices are decoded, since every
+  update renders the views and invalidates the caches derived from the voxels.
+
+  Loaders of the series of a study should share a bounded thread pool passed as ``executor``, so
+  that the number of decoding threads does not grow with the number of series. Without
+  ``executor``, the loader decodes slices using its own pool of ``maximumNumberOfWorkers`` threads.
+
+  Usage::
+
+    loader = ProgressiveVolumeLoader(geometry, name="1: Series", attributes={"DICOM.instanceUIDs": uids})
+    volumeNode = loader.start()
+  """
+
+  UPDATE_INTERVAL_IN_MS = 30
+
+  def __init__(self, geometry, name, attributes=None, showWhenReady=True, maximumNumberOfWorkers=None,
+               executor=None, firstSliceCallback=None, finishedCallback=None, failedCallback=None):
+    self.geometry = geometry
+    self.name = name
+    self.attributes = attributes or {}
+    self.showWhenReady = showWhenReady
+    self.maximumNumberOfWorkers = maximumNumberOfWorkers or os.cpu_count() or 1
+    self.firstSliceCallback = firstSliceCallback
+    self.finishedCallback = finishedCallback
+    self.failedCallback = failedCallback
+    self.volumeNode = None
+    self._array = None
+    self._exact = None
+    self._coarseSlices = set()
+    self._executor = executor
+    self._ownsExecutor = executor is None
+    self._pending = []
+    self._timer = None
+
+  def createVolumeNode(self):
+    imageData, self._array = allocateImageData(self.geometry)
+    self._array.fill(0)
+    return createVolumeNode(self.geometry, self.name, imageData, self.attributes)
+
+  def start(self):
+    """Add the volume node to the scene and start decoding slices. Return the volume node."""
+    self.volumeNode = self.createVolumeNode()
+    slicer.mrmlScene.AddNode(self.volumeNode)
+    self.volumeNode.UnRegister(slicer.mrmlScene)
+    createDefaultDisplayNodes(self.volumeNode, self.geometry)
+
+    numberOfSlices = self.geometry["dimensions"][2]
+    self._exact = np.zeros(numberOfSlices, dtype=bool)
+    order = coarseToFineOrder(numberOfSlices)
+    self._coarseSlices = {numberOfSlices // 2} | set(range(0, numberOfSlices, COARSE_STEP))
+
+    if self._ownsExecutor:
+      self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.maximumNumberOfWorkers)
+    scalarType = self.geometry["scalarType"]
+    for index in order:
+      slope, intercept = self.geometry["rescale"][index]
+      future = self._executor.submit(readSlice, self.geometry["files"][index], slope, intercept, scalarType)
+      self._pending.append((index, future))
+
+    self._timer = qt.QTimer()
+    self._timer.setInterval(self.UPDATE_INTERVAL_IN_MS)
+    self._timer.connect("timeout()", self._update)
+    self._timer.start()
+    return self.volumeNode
+
+  def cancel(self):
+    for _, future in self._pending:
+      future.cancel()
+    self._pending = []
+    self._stop()
+
+  def _stop(self):
+    if self._timer is not None:
+      self._timer.stop()
+      self._timer = None
+    if self._ownsExecutor and self._executor is not None:
+      self._executor.shutdown(wait=False)
+    self._executor = None
+
+  @property
+  def active(self):
+    """True while slices are being decoded."""
+    return self._timer is not None
+
+  def _copySlice(self, index, pixels):
+    self._array[index] = pixels
+    self._exact[index] = True
+    if index not in self._coarseSlices:
+      return
+    # Fill the following slices not decoded yet
+    for nextIndex in range(index + 1, min(index + COARSE_STEP, len(self._exact))):
+      if not self._exact[nextIndex]:
+        self._array[nextIndex] = pixels
+
+  def _update(self):
+    if self.volumeNode is None or self.volumeNode.GetScene() is None:
+      # Volume was removed from the scene while loading
+      self.cancel()
+      return
+
+    firstUpdate = not self._exact.any()
+    stillPending = []
+    modified = False
+    for index, future in self._pending:
+      if not future.done():
+        stillPending.append((index, future))
+        continue
+      try:
+        self._copySlice(index, future.result())
+      except Exception as exception:
+        self._fail(index, exception)
+        return
+      # Other slices are shown by views resliced for other reasons and once all slices are decoded
+      modified = modified or firstUpdate or index in self._coarseSlices
+    self._pending = stillPending
+
+    if modified or not self._pending:
+      slicer.util.arrayFromVolumeModified(self.volumeNode)
+      if firstUpdate:
+        if self.firstSliceCallback is not None:
+          self.firstSliceCallback(self.volumeNode)
+        if self.showWhenReady:
+          slicer.util.setSliceViewerLayers(background=self.volumeNode, fit=True)
+
+    if not self._pending:
+      self._stop()
+      logging.info("Loaded %d slices of %s" % (len(self._exact), self.name))
+      if self.finishedCallback is not None:
+        self.finishedCallback(self.volumeNode)
+
+
+  def _fail(self, index, exception):
+    """Remove the volume, whose voxels are incomplete, from the scene and call ``failedCallback``."""
+    logging.error("Failed to read %s: %s" % (self.geometry["files"][index], exception))
+    self.cancel()
+    slicer.mrmlScene.RemoveNode(self.volumeNode)
+    if self.failedCallback is not None:
+      self.failedCallback(self.volumeNode)
+
+
+def headerScanner(additionalTags=None, maximumNumberOfWorkers=None):
+  """Return a DICOMHeaderScanner reading the tags needed by seriesGeometry() and ``additionalTags``."""
+  tags = list(TAGS.values())
+  tags.extend(tag for tag in (additionalTags or []) if tag not in tags)
+  return DICOMHeaderScanner(tags=tags, maximumNumberOfWorkers=maximumNumberOfWorkers)
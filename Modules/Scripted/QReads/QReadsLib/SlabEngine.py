@@ -0,0 +1,322 @@
+import collections
+import concurrent.futures
+import logging
+
+import numpy as np
+import qt, vtk, slicer
+from vtk.util import numpy_support
+
+from .SlabProjection import slabProjectionBlocks
+
+
+class NumPySlabEngine(object):
+  """Display thick slabs of axis-aligned views from precomputed slab projections.
+
+  For each slice view whose normal is aligned with an axis of its background volume, the slab
+  projection of the whole volume along that axis is computed once for the current mode and
+  thickness and shown by a hidden "slab volume". The slab volume replaces the source volume as
+  background of the view, so scrolling only picks a precomputed slice instead of reducing all
+  the slices of the slab. The slab volume has the name and attributes of the source volume, so
+  that views show the same annotations, and display settings of both volumes are kept synchronized.
+
+  Projections are computed in blocks by a thread pool of ``numberOfThreads`` workers, so that the
+  main thread is not blocked. Until the projection of a view is ready, the view falls back to the
+  vtkImageReslice slab mode and ``projectionReadyCallback`` is called once it is ready. Views that
+  are not aligned with the volume axes are always left to the vtkImageReslice slab mode.
+
+  Slab volumes share the memory of the cached projections, at most ``maximumNumberOfProjections``
+  projections are cached.
+  """
+
+  SOURCE_VOLUME_ATTRIBUTE = "QReads.SlabSourceVolumeID"
+
+  POLL_INTERVAL_IN_MS = 30
+  """Interval between two checks for projections computed in the background"""
+
+  def __init__(self, maximumNumberOfProjections=3, numberOfThreads=1, projectionReadyCallback=None):
+    self.maximumNumberOfProjections = maximumNumberOfProjections
+    self.numberOfThreads = numberOfThreads
+    self.projectionReadyCallback = projectionReadyCallback
+    self._executor = None
+    self._executorNumberOfThreads = 0
+    self._projections = collections.OrderedDict()
+    self._pending = {}  # projection key to (projection, block futures) computed in the background
+    self._pollTimer = None
+    self._shownProjections = {}  # slab volume node ID to projection key
+    self._slabVolumeIDs = {}  # view name to slab volume node ID
+    self._displayObservations = {}  # slab volume node ID to list of (node, tag)
+    self._synchronizingDisplay = False
+
+  @staticmethod
+  def isSlabVolume(volumeNode):
+    return volumeNode is not None and volumeNode.GetAttribute(NumPySlabEngine.SOURCE_VOLUME_ATTRIBUTE) is not None
+
+  @staticmethod
+  def sourceVolume(volumeNode):
+    """Return the volume a slab volume was computed from, or ``volumeNode`` if it is not a slab volume."""
+    if not NumPySlabEngine.isSlabVolume(volumeNode):
+      return volumeNode
+    return slicer.mrmlScene.GetNodeByID(volumeNode.GetAttribute(NumPySlabEngine.SOURCE_VOLUME_ATTRIBUTE))
+
+  @staticmethod
+  def alignedAxis(sliceNode, volumeNode):
+    """Return the IJK axis of ``volumeNode`` parallel to the normal of ``sliceNode`` or None."""
+    sliceToRAS = sliceNode.GetSliceToRAS()
+    normal = np.array([sliceToRAS.GetElement(row, 2) for row in range(3)])
+    normal /= np.linalg.norm(normal)
+    directions = vtk.vtkMatrix4x4()
+    volumeNode.GetIJKToRASDirectionMatrix(directions)
+    for axis in range(3):
+      direction = np.array([directions.GetElement(row, axis) for row in range(3)])
+      if abs(np.dot(direction / np.linalg.norm(direction), normal)) > 1.0 - 1e-4:
+        return axis
+    return None
+
+  def executor(self):
+    """Return the thread pool reducing the projection blocks of all the views."""
+    numberOfThreads = max(1, self.numberOfThreads)
+    if self._executor is None or self._executorNumberOfThreads != numberOfThreads:
+      self.shutdown()
+      self._executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=numberOfThreads, thread_name_prefix="QReadsSlab")
+      self._executorNumberOfThreads = numberOfThreads
+    return self._executor
+
+  def shutdown(self):
+    self._cancelPending()
+    if self._executor is not None:
+      self._executor.shutdown(wait=False)
+      self._executor = None
+
+  @staticmethod
+  def projectionKey(volumeNode, axis, mode, numberOfSlices):
+    imageData = volumeNode.GetImageData()
+    return (volumeNode.GetID(), axis, mode, numberOfSlices, imageData.GetMTime(), imageData.GetPointData().GetScalars().GetMTime())
+
+  def _storeProjection(self, key, projection):
+    self._projections[key] = projection
+    while len(self._projections) > self.maximumNumberOfProjections:
+      self._projections.popitem(last=False)
+
+  def projection(self, volumeNode, axis, mode, numberOfSlices):
+    """Return the slab projection of ``volumeNode`` along IJK ``axis`` or None if it is not computed yet.
+
+    A projection that is not cached is computed in the background, ``projectionReadyCallback`` being
+    called once it is ready.
+    """
+    key = self.projectionKey(volumeNode, axis, mode, numberOfSlices)
+    if key in self._projections:
+      self._projections.move_to_end(key)
+      return self._projections[key]
+    if key not in self._pending:
+      array = slicer.util.arrayFromVolume(volumeNode)
+      # Numpy array axes are ordered KJI
+      projection, blocks = slabProjectionBlocks(
+        array, numberOfSlices, mode, axis=2 - axis, valueRange=volumeNode.GetImageData().GetScalarRange())
+      reason = self.scalarTypePromotion(array.dtype, projection.dtype, numberOfSlices)
+      if reason is not None:
+        logging.warning("Slab of %s is stored as %s: %s" % (volumeNode.GetName(), projection.dtype, reason))
+      executor = self.executor()
+      self._pending[key] = (projection, [executor.submit(block) for block in blocks])
+      if self._pollTimer is None:
+        self._pollTimer = qt.QTimer()
+        self._pollTimer.setInterval(self.POLL_INTERVAL_IN_MS)
+        self._pollTimer.connect("timeout()", self._onPoll)
+      self._pollTimer.start()
+    return None
+
+  def prepare(self, mode, slabs):
+    """Start computing the projections needed by ``slabs``, a list of slice logics and number of slices.
+
+    Blocks of the projections of all the views are reduced at the same time by the thread pool.
+    Projections still computed for previous slabs that are not needed anymore are cancelled.
+    """
+    keys = set()
+    for sliceLogic, numberOfSlices in slabs:
+      if numberOfSlices <= 1:
+        continue
+      compositeNode = sliceLogic.GetSliceCompositeNode()
+      sourceVolume = self.sourceVolume(slicer.mrmlScene.GetNodeByID(compositeNode.GetBackgroundVolumeID() or ""))
+      if sourceVolume is None or sourceVolume.GetImageData() is None:
+        continue
+      axis = self.alignedAxis(sliceLogic.GetSliceNode(), sourceVolume)
+      if axis is None:
+        continue
+      keys.add(self.projectionKey(sourceVolume, axis, mode, numberOfSlices))
+      self.projection(sourceVolume, axis, mode, numberOfSlices)
+    self._cancelPending([key for key in self._pending if key not in keys])
+
+  def isComputing(self):
+    """Return True while projections are computed in the background."""
+    return bool(self._pending)
+
+  def _cancelPending(self, keys=None):
+    for key in list(self._pending) if keys is None else keys:
+      _, futures = self._pending.pop(key)
+      for future in futures:
+        future.cancel()
+    if not self._pending and self._pollTimer is not None:
+      self._pollTimer.stop()
+
+  def _onPoll(self):
+    ready = False
+    for key, (projection, futures) in list(self._pending.items()):
+      if not all(future.done() for future in futures):
+        continue
+      del self._pending[key]
+      try:
+        for future in futures:
+          future.result()
+      except Exception as exception:
+        logging.error("Failed to compute slab projection: %s" % exception)
+        continue
+      self._storeProjection(key, projection)
+      ready = True
+    if not self._pending:
+      self._pollTimer.stop()
+    if ready and self.projectionReadyCallback is not None:
+      self.projectionReadyCallback()
+
+  def apply(self, sliceLogic, mode, numberOfSlices):
+    """Show the slab of the background volume of ``sliceLogic`` using a precomputed projection.
+
+    Return False if the view is not aligned with the volume axes or if its projection is still being
+    computed, in which case the source volume is shown again and the slab is expected to be computed
+    by vtkImageReslice.
+    """
+    compositeNode = sliceLogic.GetSliceCompositeNode()
+    sourceVolume = self.sourceVolume(slicer.mrmlScene.GetNodeByID(compositeNode.GetBackgroundVolumeID() or ""))
+    if sourceVolume is None or sourceVolume.GetImageData() is None or numberOfSlices <= 1:
+      self.restore(sliceLogic)
+      return False
+    axis = self.alignedAxis(sliceLogic.GetSliceNode(), sourceVolume)
+    if axis is None:
+      self.restore(sliceLogic)
+      return False
+    projection = self.projection(sourceVolume, axis, mode, numberOfSlices)
+    if projection is None:
+      self.restore(sliceLogic)
+      return False
+
+    slabVolume = self._slabVolume(sliceLogic.GetName(), sourceVolume)
+    key = self.projectionKey(sourceVolume, axis, mode, numberOfSlices)
+    if self._shownProjections.get(slabVolume.GetID()) != key:
+      self._setProjection(slabVolume, sourceVolume, projection, numberOfSlices)
+      self._shownProjections[slabVolume.GetID()] = key
+    compositeNode.SetBackgroundVolumeID(slabVolume.GetID())
+    return True
+
+  @staticmethod
+  def scalarTypePromotion(scalarType, slabScalarType, numberOfSlices):
+    """Return why slabs of ``scalarType`` values are stored as the wider ``slabScalarType`` or None."""
+    if np.dtype(slabScalarType).itemsize <= np.dtype(scalarType).itemsize:
+      return None
+    return "sum of %d slices of %s values does not fit in %s" % (numberOfSlices, np.dtype(scalarType), np.dtype(scalarType))
+
+  @staticmethod
+  def _setProjection(slabVolume, sourceVolume, projection, numberOfSlices):
+    from .ProgressiveVolumeLoader import SCALAR_TYPE_PROMOTION_ATTRIBUTE
+    sourceScalarType = numpy_support.get_numpy_array_type(sourceVolume.GetImageData().GetScalarType())
+    reason = NumPySlabEngine.scalarTypePromotion(sourceScalarType, projection.dtype, numberOfSlices)
+    # Slab volumes have the attributes of their source volume, including its own promotion
+    reason = reason or sourceVolume.GetAttribute(SCALAR_TYPE_PROMOTION_ATTRIBUTE)
+    if reason:
+      slabVolume.SetAttribute(SCALAR_TYPE_PROMOTION_ATTRIBUTE, reason)
+    else:
+      slabVolume.RemoveAttribute(SCALAR_TYPE_PROMOTION_ATTRIBUTE)
+    # Scalars reference the projection array instead of copying it, the array being kept alive by the
+    # scalars as long as the slab volume shows it
+    scalars = numpy_support.numpy_to_vtk(projection.reshape(-1), deep=False)
+    scalars.SetName("ImageScalars")
+    imageData = vtk.vtkImageData()
+    imageData.SetDimensions(sourceVolume.GetImageData().GetDimensions())
+    imageData.GetPointData().SetScalars(scalars)
+    slabVolume.SetAndObserveImageData(imageData)
+
+  def restore(self, sliceLogic):
+    """Show the source volume again if the view shows a slab volume."""
+    compositeNode = sliceLogic.GetSliceCompositeNode()
+    backgroundVolume = slicer.mrmlScene.GetNodeByID(compositeNode.GetBackgroundVolumeID() or "")
+    if self.isSlabVolume(backgroundVolume):
+      sourceVolume = self.sourceVolume(backgroundVolume)
+      compositeNode.SetBackgroundVolumeID(sourceVolume.GetID() if sourceVolume else None)
+
+  def _slabVolume(self, viewName, sourceVolume):
+    slabVolume = slicer.mrmlScene.GetNodeByID(self._slabVolumeIDs.get(viewName, ""))
+    if slabVolume is not None and slabVolume.GetAttribute(self.SOURCE_VOLUME_ATTRIBUTE) != sourceVolume.GetID():
+      self._removeSlabVolume(viewName)
+      slabVolume = None
+    if slabVolume is None:
+      slabVolume = slicer.mrmlScene.CreateNodeByClass("vtkMRMLScalarVolumeNode")
+      # Views annotate the slab with the name and DICOM attributes of the source volume
+      slabVolume.SetName(sourceVolume.GetName())
+      for attributeName in sourceVolume.GetAttributeNames():
+        slabVolume.SetAttribute(attributeName, sourceVolume.GetAttribute(attributeName))
+      slabVolume.SetHideFromEditors(True)
+      slabVolume.SetSelectable(False)
+      slabVolume.SetAttribute(self.SOURCE_VOLUME_ATTRIBUTE, sourceVolume.GetID())
+      slicer.mrmlScene.AddNode(slabVolume)
+      slabVolume.UnRegister(slicer.mrmlScene)
+      slabVolume.CreateDefaultDisplayNodes()
+      self._slabVolumeIDs[viewName] = slabVolume.GetID()
+      self._observeDisplayNodes(sourceVolume, slabVolume)
+    ijkToRAS = vtk.vtkMatrix4x4()
+    sourceVolume.GetIJKToRASMatrix(ijkToRAS)
+    slabVolume.SetIJKToRASMatrix(ijkToRAS)
+    return slabVolume
+
+  def _observeDisplayNodes(self, sourceVolume, slabVolume):
+    sourceDisplayNode = sourceVolume.GetDisplayNode()
+    slabDisplayNode = slabVolume.GetDisplayNode()
+    self._copyDisplaySettings(sourceDisplayNode, slabDisplayNode)
+    observations = []
+    for observed, other in [(sourceDisplayNode, slabDisplayNode), (slabDisplayNode, sourceDisplayNode)]:
+      tag = observed.AddObserver(
+        vtk.vtkCommand.ModifiedEvent,
+        lambda caller, event, other=other: self._copyDisplaySettings(caller, other))
+      observations.append((observed, tag))
+    self._displayObservations[slabVolume.GetID()] = observations
+
+  def _copyDisplaySettings(self, fromDisplayNode, toDisplayNode):
+    if self._synchronizingDisplay:
+      return
+    self._synchronizingDisplay = True
+    try:
+      with slicer.util.NodeModify(toDisplayNode):
+        toDisplayNode.SetAndObserveColorNodeID(fromDisplayNode.GetColorNodeID())
+        toDisplayNode.SetInterpolate(fromDisplayNode.GetInterpolate())
+        toDisplayNode.SetAutoWindowLevel(0)
+        toDisplayNode.SetWindowLevel(fromDisplayNode.GetWindow(), fromDisplayNode.GetLevel())
+    finally:
+      self._synchronizingDisplay = False
+
+  def _removeSlabVolume(self, viewName):
+    slabVolumeID = self._slabVolumeIDs.pop(viewName, None)
+    self._shownProjections.pop(slabVolumeID, None)
+    for observed, tag in self._displayObservations.pop(slabVolumeID, []):
+      observed.RemoveObserver(tag)
+    slabVolume = slicer.mrmlScene.GetNodeByID(slabVolumeID or "")
+    if slabVolume is not None:
+      slicer.mrmlScene.RemoveNode(slabVolume)
+
+  def releaseSourceVolume(self, volumeNode):
+    """Remove slab volumes and projections computed from ``volumeNode``."""
+    for viewName, slabVolumeID in list(self._slabVolumeIDs.items()):
+      slabVolume = slicer.mrmlScene.GetNodeByID(slabVolumeID)
+      if slabVolume is None or slabVolume.GetAttribute(self.SOURCE_VOLUME_ATTRIBUTE) == volumeNode.GetID():
+        self._removeSlabVolume(viewName)
+    for key in [key for key in self._projections if key[0] == volumeNode.GetID()]:
+      del self._projections[key]
+    self._cancelPending([key for key in self._pending if key[0] == volumeNode.GetID()])
+
+  def reset(self):
+    """Forget all slab volumes and projections. Called when the scene is closed."""
+    for observations in self._displayObservations.values():
+      for observed, tag in observations:
+        observed.RemoveObserver(tag)
+    self._displayObservations = {}
+    self._slabVolumeIDs = {}
+    self._shownProjections = {}
+    self._projections.clear()
+    self.shutdown()
+    logging.debug("Slab engine reset")
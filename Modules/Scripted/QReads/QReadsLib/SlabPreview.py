@@ -0,0 +1,156 @@
+import qt, vtk, slicer
+
+
+class SlabPreview(object):
+  """Compute thick slabs with fewer slices while the user interacts with the slice views.
+
+  While the geometry of slice nodes is being modified (scrolling, panning, zooming, rotating), the
+  number of slices of each slab computed by vtkImageReslice is divided by ``reductionFactor`` and
+  volumes are resliced using nearest neighbor instead of linear interpolation. Once no modification
+  happened for ``idleDelayInMs`` the number of slices set using QReadsLogic.setSlab() and the
+  interpolation are restored and the views are rendered at full quality.
+
+  Other modifications of the slice nodes, and window/level changes, do not reslice the volumes and
+  are ignored. The number of slices of sum slabs is left unchanged, since fewer slices would make
+  them darker.
+
+  Slice views created after start() is called, for example by a layout or hanging protocol
+  switch, are observed once the layout has changed.
+
+  Usage::
+
+    preview = SlabPreview()
+    preview.start()
+  """
+
+  REDUCTION_FACTOR = 4
+  IDLE_DELAY_IN_MS = 250
+
+  def __init__(self, reductionFactor=REDUCTION_FACTOR, idleDelayInMs=IDLE_DELAY_IN_MS):
+    self.reductionFactor = reductionFactor
+    self._started = False
+    self._observations = {}  # view name to observed slice node and observer tag
+    self._fullNumberOfSlices = {}  # view name to number of slices set using setSlab()
+    self._fullInterpolationModes = {}  # view name to interpolation mode restored once idle
+    self._previewNumberOfSlices = {}  # view name to number of slices shown while interacting
+    self._sliceGeometry = {}  # view name to geometry of the slice node last observed
+    self._updating = False
+    self._idleTimer = qt.QTimer()
+    self._idleTimer.setSingleShot(True)
+    self._idleTimer.setInterval(idleDelayInMs)
+    self._idleTimer.connect("timeout()", self.refine)
+
+  @property
+  def active(self):
+    """True if views are currently shown with a reduced slab."""
+    return bool(self._previewNumberOfSlices or self._fullInterpolationModes)
+
+  def start(self):
+    if self._started:
+      return
+    self._started = True
+    slicer.app.layoutManager().connect("layoutChanged(int)", self._onLayoutChanged)
+    self._observeSliceNodes()
+
+  def stop(self):
+    """Stop observing the views and restore full quality slabs."""
+    if self._started:
+      self._started = False
+      slicer.app.layoutManager().disconnect("layoutChanged(int)", self._onLayoutChanged)
+    for observed, tag in self._observations.values():
+      observed.RemoveObserver(tag)
+    self._observations = {}
+    self._sliceGeometry = {}
+    self.refine()
+
+  def _onLayoutChanged(self, layout):
+    self._observeSliceNodes()
+
+  def _observeSliceNodes(self):
+    """Observe the slice nodes of views that are not observed yet."""
+    for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
+      sliceNode = sliceLogic.GetSliceNode()
+      viewName = sliceLogic.GetName()
+      if sliceNode is None:
+        continue
+      if viewName in self._observations:
+        observed, tag = self._observations[viewName]
+        if observed is sliceNode:
+          continue
+        observed.RemoveObserver(tag)
+      self._sliceGeometry[viewName] = self.sliceGeometry(sliceNode)
+      tag = sliceNode.AddObserver(
+        vtk.vtkCommand.ModifiedEvent, lambda caller, event, sliceLogic=sliceLogic: self._onSliceNodeModified(sliceLogic))
+      self._observations[viewName] = (sliceNode, tag)
+
+  @staticmethod
+  def sliceGeometry(sliceNode):
+    """Return the position, orientation and field of view of ``sliceNode``."""
+    sliceToRAS = sliceNode.GetSliceToRAS()
+    return (
+      tuple(sliceToRAS.GetElement(row, column) for row in range(4) for column in range(4)),
+      tuple(sliceNode.GetFieldOfView()),
+      tuple(sliceNode.GetXYZOrigin()))
+
+  def _onSliceNodeModified(self, sliceLogic):
+    geometry = self.sliceGeometry(sliceLogic.GetSliceNode())
+    if geometry == self._sliceGeometry.get(sliceLogic.GetName()):
+      return
+    self._sliceGeometry[sliceLogic.GetName()] = geometry
+    self._onInteraction()
+
+  def _onInteraction(self):
+    if self._updating:
+      return
+    self._updating = True
+    try:
+      for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
+        viewName = sliceLogic.GetName()
+        reslice = sliceLogic.GetBackgroundLayer().GetReslice()
+        modified = False
+        interpolationMode = reslice.GetInterpolationMode()
+        if interpolationMode != vtk.VTK_RESLICE_NEAREST:
+          # Interpolation was set, or restored by the layer, since the interaction started
+          self._fullInterpolationModes[viewName] = interpolationMode
+          reslice.SetInterpolationModeToNearestNeighbor()
+          modified = True
+        if reslice.GetSlabMode() != vtk.VTK_IMAGE_SLAB_SUM:
+          numberOfSlices = reslice.GetSlabNumberOfSlices()
+          if numberOfSlices != self._previewNumberOfSlices.get(viewName):
+            # Slab was changed using setSlab() since the interaction started
+            self._fullNumberOfSlices[viewName] = numberOfSlices
+          previewNumberOfSlices = max(1, self._fullNumberOfSlices[viewName] // self.reductionFactor)
+          self._previewNumberOfSlices[viewName] = previewNumberOfSlices
+          if numberOfSlices != previewNumberOfSlices:
+            reslice.SetSlabNumberOfSlices(previewNumberOfSlices)
+            modified = True
+        if modified:
+          sliceLogic.GetBackgroundLayer().Modified()
+    finally:
+      self._updating = False
+    self._idleTimer.start()
+
+  def refine(self):
+    """Restore the number of slices of each slab set using setSlab() and the interpolation of each view."""
+    self._idleTimer.stop()
+    if not self.active:
+      return
+    self._updating = True
+    try:
+      for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
+        viewName = sliceLogic.GetName()
+        reslice = sliceLogic.GetBackgroundLayer().GetReslice()
+        modified = False
+        if viewName in self._fullInterpolationModes and reslice.GetInterpolationMode() == vtk.VTK_RESLICE_NEAREST:
+          reslice.SetInterpolationMode(self._fullInterpolationModes[viewName])
+          modified = True
+        if viewName in self._fullNumberOfSlices and reslice.GetSlabNumberOfSlices() == self._previewNumberOfSlices.get(viewName):
+          reslice.SetSlabNumberOfSlices(self._fullNumberOfSlices[viewName])
+          modified = True
+        if modified:
+          sliceLogic.GetBackgroundLayer().Modified()
+    finally:
+      self._updating = False
+    self._fullNumberOfSlices = {}
+    self._previewNumberOfSlices = {}
+    self._fullInterpolationModes = {}
@@ -0,0 +1,127 @@
+# Only depends on NumPy so that slab projections may be tested outside of the application
+import functools
+
+import numpy as np
+
+# Values of vtk.VTK_IMAGE_SLAB_MIN, VTK_IMAGE_SLAB_MAX, VTK_IMAGE_SLAB_MEAN and VTK_IMAGE_SLAB_SUM,
+# so that slab modes of vtkImageReslice are used as is
+SLAB_MIN = 0
+SLAB_MAX = 1
+SLAB_MEAN = 2
+SLAB_SUM = 3
+
+
+def _slidingWindowReduce(padded, numberOfSlices, ufunc, length):
+  """Return ``result[k] = ufunc.reduce(padded[k:k + numberOfSlices])`` for ``k`` in ``range(length)``.
+
+  Reductions over windows of increasing power of two widths are combined, so the cost grows with
+  the logarithm of the window size instead of linearly.
+  """
+  result = None
+  power = padded  # power[i] is the reduction of padded[i:i + width]
+  width = 1
+  offset = 0
+  remaining = numberOfSlices
+  while remaining:
+    if remaining & 1:
+      window = power[offset:offset + length]
+      result = window.copy() if result is None else ufunc(result, window, out=result)
+      offset += width
+    remaining >>= 1
+    if remaining:
+      power = ufunc(power[:-width], power[width:])
+      width *= 2
+  return result
+
+
+def slabOutputScalarType(scalarType, mode, numberOfSlices=None, valueRange=None):
+  """Return the scalar type of slabs computed from ``scalarType`` values using ``mode``.
+
+  Slabs are written using the most compact type holding their values: max, min and mean slabs of
+  integer values keep the input type, and sum slabs of integer values keep it too if the sum of
+  ``numberOfSlices`` values within ``valueRange`` fits, using 32-bit integers otherwise. Mean and sum
+  slabs of floating point values are written as 32-bit floats.
+  """
+  scalarType = np.dtype(scalarType)
+  if mode in (SLAB_MAX, SLAB_MIN):
+    return scalarType
+  if not np.issubdtype(scalarType, np.integer):
+    return np.dtype(np.float32)
+  if mode == SLAB_MEAN:
+    return scalarType
+  if numberOfSlices is not None:
+    info = np.iinfo(scalarType)
+    minimum, maximum = valueRange if valueRange is not None else (info.min, info.max)
+    if info.min <= numberOfSlices * min(minimum, 0) and numberOfSlices * max(maximum, 0) <= info.max:
+      return scalarType
+  return np.dtype(np.int32)
+
+
+def slabProjectionBlocks(array, numberOfSlices, mode, axis=0, blockSize=32, valueRange=None):
+  """Return the C-contiguous output array of slabProjection() and the list of functions computing it.
+
+  The output is complete once every function has been called, in any order and from any thread.
+  """
+  outputScalarType = slabOutputScalarType(array.dtype, mode, numberOfSlices, valueRange)
+  projection = np.empty(array.shape, dtype=outputScalarType)
+  source = np.moveaxis(array, axis, 0)
+  output = np.moveaxis(projection, axis, 0)
+  length = source.shape[0]
+  before = (numberOfSlices - 1) // 2
+  after = numberOfSlices - 1 - before
+
+  if mode not in (SLAB_MAX, SLAB_MIN, SLAB_MEAN, SLAB_SUM):
+    raise ValueError("Unsupported slab mode %s" % mode)
+
+  def _reduceBlock(start):
+    block = source[:, start:start + blockSize]
+    if mode in (SLAB_MAX, SLAB_MIN):
+      ufunc = np.maximum if mode == SLAB_MAX else np.minimum
+      # Replicating border slices is equivalent to clipping the window for max and min
+      padded = np.concatenate([block[:1].repeat(before, axis=0), block, block[-1:].repeat(after, axis=0)])
+      output[:, start:start + blockSize] = _slidingWindowReduce(padded, numberOfSlices, ufunc, length)
+    else:
+      accumulatorType = np.int64 if np.issubdtype(array.dtype, np.integer) else np.float64
+      cumulativeSum = np.zeros((length + 1,) + block.shape[1:], dtype=accumulatorType)
+      np.cumsum(block, axis=0, dtype=accumulatorType, out=cumulativeSum[1:])
+      indices = np.arange(length)
+      lower = np.clip(indices - before, 0, length)
+      upper = np.clip(indices + after + 1, 0, length)
+      sums = cumulativeSum[upper] - cumulativeSum[lower]
+      if mode == SLAB_MEAN:
+        counts = (upper - lower).reshape((length,) + (1,) * (block.ndim - 1))
+        values = sums / counts
+        if np.issubdtype(outputScalarType, np.integer):
+          values = np.rint(values)
+      else:
+        values = sums
+      info = np.iinfo(outputScalarType) if np.issubdtype(outputScalarType, np.integer) else None
+      if info is not None:
+        values = np.clip(values, info.min, info.max)
+      output[:, start:start + blockSize] = values
+
+  return projection, [functools.partial(_reduceBlock, start) for start in range(0, source.shape[1], blockSize)]
+
+
+def slabProjection(array, numberOfSlices, mode, axis=0, blockSize=32, executor=None, valueRange=None):
+  """Return the slab projection of ``array`` along ``axis`` for every position along that axis.
+
+  Each output slice is the reduction of the ``numberOfSlices`` input slices centered on it, windows
+  being clipped at the borders of the array. ``mode`` is one of ``SLAB_MAX``,
+  ``SLAB_MIN``, ``SLAB_MEAN`` or ``SLAB_SUM``.
+
+  Mean and sum are computed from cumulative sums accumulated in 64-bit and written using the type
+  returned by slabOutputScalarType(), ``valueRange`` being the minimum and maximum values of
+  ``array`` if they are known. The array is processed in blocks of ``blockSize`` along the first
+  axis orthogonal to ``axis`` to bound memory usage. If an ``executor`` is given, blocks are
+  processed concurrently by its workers. NumPy releases the GIL while reducing arrays so that
+  blocks are processed in parallel.
+  """
+  projection, blocks = slabProjectionBlocks(array, numberOfSlices, mode, axis, blockSize, valueRange)
+  if executor is None:
+    for block in blocks:
+      block()
+  else:
+    # Consume the results to raise exceptions of the workers
+    list(executor.map(lambda block: block(), blocks))
+  return projection
@@ -0,0 +1,181 @@
+import concurrent.futures
+import logging
+import os
+import threading
+
+import numpy as np
+
+from .ProgressiveVolumeLoader import TAGS, allocateImageData, headerScanner, readSlice, seriesFilesByUID, seriesGeometry
+
+
+class PrefetchedStudy(object):
+  """Series of a study directory decoded in memory by a StudyPrefetcher.
+
+  ``series`` is a list of dictionaries with the ``geometry``, ``imageData``, ``name``,
+  ``instanceUIDs`` and ``headers`` (values of the first file) of each supported series.
+  ``unsupportedHeaders`` maps files of series that have to be loaded using DICOM plugins to their
+  header values.
+  """
+
+  PENDING = "pending"
+  RUNNING = "running"
+  DONE = "done"
+  CANCELLED = "cancelled"
+  FAILED = "failed"
+
+  def __init__(self, directory):
+    self.directory = directory
+    self.state = self.PENDING
+    self.series = []
+    self.unsupportedHeaders = {}
+    self.sizeInBytes = 0
+    self.future = None
+    self.cancelEvent = threading.Event()
+
+
+class StudyPrefetcher(object):
+  """Read and decode the series of study directories in background threads.
+
+  Studies are prefetched one after the other in the order they are requested. The voxels of all
+  the prefetched studies are kept within ``memoryBudgetInBytes``: a study that does not fit is
+  abandoned and will be loaded normally. Prefetching never blocks the caller, and a study that is
+  not fully prefetched when it is taken is cancelled.
+
+  Usage::
+
+    prefetcher = StudyPrefetcher(additionalTags=QReadsLogic.DICOM_TAGS)
+    prefetcher.prefetch(["/path/to/study2", "/path/to/study3"])
+    study = prefetcher.take("/path/to/study2")  # None if not ready
+  """
+
+  def __init__(self, additionalTags=None, memoryBudgetInBytes=2 * 1024 * 1024 * 1024, maximumNumberOfWorkers=None):
+    self.additionalTags = list(additionalTags or [])
+    self.memoryBudgetInBytes = memoryBudgetInBytes
+    self.maximumNumberOfWorkers = maximumNumberOfWorkers or os.cpu_count() or 1
+    self._studies = {}  # directory to PrefetchedStudy, accessed while holding _lock
+    self._lock = threading.Lock()
+    self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="QReadsPrefetch")
+
+  @property
+  def sizeInBytes(self):
+    """Memory used by the voxels of the prefetched studies."""
+    with self._lock:
+      return sum(study.sizeInBytes for study in self._studies.values())
+
+  def state(self, directory):
+    with self._lock:
+      study = self._studies.get(os.path.abspath(directory))
+    return study.state if study is not None else None
+
+  def prefetch(self, directories):
+    """Prefetch ``directories`` in order and cancel the prefetch of any other directory."""
+    directories = [os.path.abspath(directory) for directory in directories]
+    with self._lock:
+      cancelledDirectories = [directory for directory in self._studies if directory not in directories]
+    for directory in cancelledDirectories:
+      self.cancel(directory)
+    for directory in directories:
+      with self._lock:
+        if directory in self._studies:
+          continue
+        study = PrefetchedStudy(directory)
+        self._studies[directory] = study
+      study.future = self._executor.submit(self._prefetchStudy, study)
+
+  def take(self, directory):
+    """Return the prefetched study of ``directory`` and forget about it.
+
+    Return None if the study was not requested or is not completely prefetched yet, in which case its
+    prefetch is cancelled.
+    """
+    with self._lock:
+      study = self._studies.get(os.path.abspath(directory))
+      if study is not None and study.state == PrefetchedStudy.DONE:
+        del self._studies[study.directory]
+        return study
+    if study is not None:
+      self.cancel(directory)
+    return None
+
+  def cancel(self, directory=None):
+    """Cancel the prefetch of ``directory``, or of all directories if None, and release its memory."""
+    with self._lock:
+      directories = list(self._studies) if directory is None else [os.path.abspath(directory)]
+      studies = [self._studies.pop(directory) for directory in directories if directory in self._studies]
+      for study in studies:
+        study.cancelEvent.set()
+        study.series = []
+        study.sizeInBytes = 0
+    for study in studies:
+      # Future is set right after the study is added, outside of the lock
+      if study.future is not None:
+        study.future.cancel()
+
+  def shutdown(self):
+    self.cancel()
+    self._executor.shutdown(wait=False)
+
+  def _reserve(self, study, sizeInBytes):
+    """Account ``sizeInBytes`` to ``study`` and return True if it fits in the memory budget."""
+    with self._lock:
+      total = sum(other.sizeInBytes for other in self._studies.values())
+      if total + sizeInBytes > self.memoryBudgetInBytes:
+        return False
+      study.sizeInBytes += sizeInBytes
+      return True
+
+  def _prefetchStudy(self, study):
+    if study.cancelEvent.is_set():
+      return
+    study.state = PrefetchedStudy.RUNNING
+    try:
+      scanner = headerScanner(additionalTags=self.additionalTags, maximumNumberOfWorkers=self.maximumNumberOfWorkers)
+      headers = scanner.scanDirectory(study.directory)
+      with concurrent.futures.ThreadPoolExecutor(max_workers=self.maximumNumberOfWorkers) as decoder:
+        for seriesHeaders in seriesFilesByUID(headers).values():
+          if study.cancelEvent.is_set():
+            break
+          geometry = seriesGeometry(seriesHeaders)
+          if geometry is None:
+            study.unsupportedHeaders.update(seriesHeaders)
+            continue
+          if not self._reserve(study, int(np.prod(geometry["dimensions"])) * np.dtype(geometry["scalarType"]).itemsize):
+            logging.info("Prefetch of %s abandoned: memory budget of %d bytes exceeded" % (study.directory, self.memoryBudgetInBytes))
+            study.cancelEvent.set()
+            break
+          study.series.append(self._decodeSeries(study, geometry, seriesHeaders, decoder))
+    except Exception as exception:
+      logging.error("Failed to prefetch %s: %s" % (study.directory, exception))
+      study.state = PrefetchedStudy.FAILED
+      return
+    if study.cancelEvent.is_set():
+      study.state = PrefetchedStudy.CANCELLED
+      with self._lock:
+        study.series = []
+        study.sizeInBytes = 0
+      return
+    study.state = PrefetchedStudy.DONE
+    logging.info("Prefetched %d series of %s" % (len(study.series), study.directory))
+
+  @staticmethod
+  def _decodeSeries(study, geometry, seriesHeaders, decoder):
+    imageData, array = allocateImageData(geometry)
+    scalarType = geometry["scalarType"]
+
+    def _decodeSlice(index):
+      if study.cancelEvent.is_set():
+        return
+      slope, intercept = geometry["rescale"][index]
+      array[index] = readSlice(geometry["files"][index], slope, intercept, scalarType)
+
+    # Consume the results to raise exceptions of the workers
+    list(decoder.map(_decodeSlice, range(len(geometry["files"]))))
+
+    firstHeader = seriesHeaders[geometry["files"][0]]
+    return {
+      "geometry": geometry,
+      "imageData": imageData,
+      "name": "%s: %s" % (firstHeader[TAGS["seriesNumber"]], firstHeader[TAGS["seriesDescription"]]),
+      "instanceUIDs": [seriesHeaders[filename][TAGS["sopInstanceUID"]] for filename in geometry["files"]],
+      "headers": firstHeader,
+    }
@@ -0,0 +1,79 @@
+import qt, vtk, slicer
+
+
+class ThreeDViewRenderThrottle(qt.QObject):
+  """Render 3D views at a low rate unless the user is looking at them.
+
+  Renders requested while a 3D view is neither hovered by the mouse nor maximized are coalesced and
+  performed at most ``idleUpdateRate`` times per second, so that changing the window/level, the slab
+  or scrolling the slice views does not render the 3D view for each event. Hovering or maximizing
+  the view restores its full update rate and renders it immediately.
+
+  Usage::
+
+    throttle = ThreeDViewRenderThrottle()
+    throttle.attach(slicer.app.layoutManager().threeDWidget(0))
+  """
+
+  ACTIVE_UPDATE_RATE = 60.0
+  IDLE_UPDATE_RATE = 1.0
+
+  def __init__(self, idleUpdateRate=IDLE_UPDATE_RATE):
+    qt.QObject.__init__(self)
+    self.idleUpdateRate = idleUpdateRate
+    self._threeDWidgets = []
+    self._hoveredThreeDViews = []
+    self._layoutNodeObservation = None
+
+  def attach(self, threeDWidget):
+    if threeDWidget in self._threeDWidgets:
+      return
+    self._threeDWidgets.append(threeDWidget)
+    threeDWidget.threeDView().installEventFilter(self)
+    if self._layoutNodeObservation is None:
+      # Maximizing a view modifies the layout node
+      layoutNode = slicer.app.layoutManager().layoutLogic().GetLayoutNode()
+      tag = layoutNode.AddObserver(vtk.vtkCommand.ModifiedEvent, lambda caller, event: self.updateRates())
+      self._layoutNodeObservation = (layoutNode, tag)
+    self.updateRates()
+
+  def detach(self):
+    """Stop throttling and restore the full update rate of all the views."""
+    for threeDWidget in self._threeDWidgets:
+      threeDView = threeDWidget.threeDView()
+      threeDView.removeEventFilter(self)
+      threeDView.maximumUpdateRate = self.ACTIVE_UPDATE_RATE
+    self._threeDWidgets = []
+    self._hoveredThreeDViews = []
+    if self._layoutNodeObservation is not None:
+      layoutNode, tag = self._layoutNodeObservation
+      layoutNode.RemoveObserver(tag)
+      self._layoutNodeObservation = None
+
+  def eventFilter(self, object, event):
+    if event.type() == qt.QEvent.Enter:
+      if object not in self._hoveredThreeDViews:
+        self._hoveredThreeDViews.append(object)
+      self.updateRates()
+    elif event.type() == qt.QEvent.Leave:
+      if object in self._hoveredThreeDViews:
+        self._hoveredThreeDViews.remove(object)
+      self.updateRates()
+    return False
+
+  def isActive(self, threeDWidget):
+    """Return True if the view is hovered or maximized."""
+    if threeDWidget.threeDView() in self._hoveredThreeDViews:
+      return True
+    layoutNode = slicer.app.layoutManager().layoutLogic().GetLayoutNode()
+    return layoutNode.GetMaximizedViewNode() is threeDWidget.mrmlViewNode()
+
+  def updateRates(self):
+    for threeDWidget in self._threeDWidgets:
+      threeDView = threeDWidget.threeDView()
+      active = self.isActive(threeDWidget)
+      wasActive = threeDView.maximumUpdateRate == self.ACTIVE_UPDATE_RATE
+      threeDView.maximumUpdateRate = self.ACTIVE_UPDATE_RATE if active else self.idleUpdateRate
+      if active and not wasActive:
+        # Show changes that were waiting for the next throttled render
+        threeDView.scheduleRender()
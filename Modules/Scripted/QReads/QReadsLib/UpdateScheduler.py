@@ -0,0 +1,50 @@
+import collections
+
+import qt
+
+
+class UpdateScheduler(object):
+  """Coalesce update requests so that each kind of update is applied at most once per frame.
+
+  Requests are identified by a key. When the same key is scheduled several times before the timer
+  expires, only the last callback is called. Callbacks are called in the order their key was
+  first scheduled.
+
+  Usage::
+
+    scheduler = UpdateScheduler()
+    scheduler.schedule("Slab", lambda: QReadsLogic.setSlab(mode, numberOfSlices))
+  """
+
+  FRAME_INTERVAL_IN_MS = 16
+
+  def __init__(self, intervalInMs=FRAME_INTERVAL_IN_MS):
+    self._callbacks = collections.OrderedDict()
+    self._timer = qt.QTimer()
+    self._timer.setSingleShot(True)
+    self._timer.setInterval(intervalInMs)
+    self._timer.connect("timeout()", self.flush)
+
+  def schedule(self, key, callback):
+    self._callbacks[key] = callback
+    if not self._timer.isActive():
+      self._timer.start()
+
+  def isScheduled(self, key):
+    return key in self._callbacks
+
+  def cancel(self, key=None):
+    """Cancel the update associated with ``key`` or all pending updates if no key is given."""
+    if key is None:
+      self._callbacks.clear()
+    else:
+      self._callbacks.pop(key, None)
+    if not self._callbacks:
+      self._timer.stop()
+
+  def flush(self):
+    """Call pending callbacks now."""
+    self._timer.stop()
+    callbacks, self._callbacks = self._callbacks, collections.OrderedDict()
+    for callback in callbacks.values():
+      callback()
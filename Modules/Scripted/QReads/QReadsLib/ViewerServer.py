@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+
+import qt
+
+
+class ViewerServer(qt.QObject):
+  """Accept commands sent by other processes over a local socket (named pipe on Windows).
+
+  Each message is a JSON object written on a single line, with a ``command`` name and optional
+  ``arguments``. The function registered for the command is called with the arguments as keyword
+  arguments, and a JSON line is written back: ``{"status": "ok", "result": ...}`` or
+  ``{"status": "error", "message": ...}``.
+
+  The socket is only accessible to the user running the application.
+
+  Usage::
+
+    server = ViewerServer(ViewerServer.defaultServerName(), {"load": lambda directory: load(directory)})
+    server.start()
+
+    # From another process
+    reply = ViewerServer.send(ViewerServer.defaultServerName(), "load", directory="/path/to/study")
+  """
+
+  def __init__(self, serverName, commands=None):
+    qt.QObject.__init__(self)
+    self.serverName = serverName
+    self.commands = dict(commands or {})
+    self._server = None
+    self._buffers = {}  # socket to bytes received and not processed yet
+
+  @staticmethod
+  def defaultServerName():
+    """Return a server name specific to the user so that each user gets their own server."""
+    user = os.environ.get("USERNAME") or os.environ.get("USER") or ""
+    return "SlicerQReads-%s" % user if user else "SlicerQReads"
+
+  @property
+  def listening(self):
+    return self._server is not None and self._server.isListening()
+
+  def start(self):
+    """Listen for connections. Return False if another process already serves ``serverName``."""
+    if self.listening:
+      return True
+    probe = qt.QLocalSocket()
+    probe.connectToServer(self.serverName)
+    if probe.waitForConnected(200):
+      probe.disconnectFromServer()
+      logging.warning("Viewer server %s is already running in another process" % self.serverName)
+      return False
+    # Remove the socket file left by a process that did not exit cleanly
+    qt.QLocalServer.removeServer(self.serverName)
+    self._server = qt.QLocalServer()
+    self._server.setSocketOptions(qt.QLocalServer.UserAccessOption)
+    self._server.connect("newConnection()", self._onNewConnection)
+    if not self._server.listen(self.serverName):
+      logging.error("Failed to start viewer server %s: %s" % (self.serverName, self._server.errorString()))
+      self._server = None
+      return False
+    logging.info("Viewer server listening on %s" % self._server.fullServerName())
+    return True
+
+  def stop(self):
+    for socket in list(self._buffers):
+      socket.disconnectFromServer()
+    self._buffers = {}
+    if self._server is not None:
+      self._server.close()
+      self._server = None
+
+  def _onNewConnection(self):
+    while self._server.hasPendingConnections():
+      socket = self._server.nextPendingConnection()
+      self._buffers[socket] = b""
+      socket.connect("readyRead()", lambda socket=socket: self._onReadyRead(socket))
+      socket.connect("disconnected()", lambda socket=socket: self._buffers.pop(socket, None))
+
+  def _onReadyRead(self, socket):
+    data = self._buffers.get(socket, b"") + bytes(socket.readAll().data())
+    lines = data.split(b"\n")
+    self._buffers[socket] = lines.pop()
+    for line in lines:
+      if not line.strip():
+        continue
+      reply = self.handleMessage(line.decode("utf-8", errors="replace"))
+      socket.write((json.dumps(reply) + "\n").encode("utf-8"))
+      socket.flush()
+
+  def handleMessage(self, message):
+    """Run the command described by the JSON ``message`` and return the reply."""
+    try:
+      request = json.loads(message)
+      command = request["command"]
+      arguments = dict(request.get("arguments") or {})
+    except (ValueError, KeyError, TypeError) as exception:
+      return {"status": "error", "message": "Invalid message: %s" % exception}
+    if command not in self.commands:
+      return {"status": "error", "message": "Unknown command %s" % command}
+    try:
+      result = self.commands[command](**arguments)
+    except Exception as exception:
+      logging.error("Viewer server command %s failed: %s" % (command, exception))
+      return {"status": "error", "message": str(exception)}
+    return {"status": "ok", "result": result}
+
+  @staticmethod
+  def send(serverName, command, timeoutInMs=30000, **arguments):
+    """Send ``command`` to the server and return its reply, or None if no server is running."""
+    socket = qt.QLocalSocket()
+    socket.connectToServer(serverName)
+    if not socket.waitForConnected(timeoutInMs):
+      return None
+    socket.write((json.dumps({"command": command, "arguments": arguments}) + "\n").encode("utf-8"))
+    socket.waitForBytesWritten(timeoutInMs)
+    data = b""
+    while b"\n" not in data and socket.waitForReadyRead(timeoutInMs):
+      data += bytes(socket.readAll().data())
+    socket.disconnectFromServer()
+    if b"\n" not in data:
+      return None
+    return json.loads(data.split(b"\n")[0].decode("utf-8"))
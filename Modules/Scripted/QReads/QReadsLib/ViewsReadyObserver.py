@@ -0,0 +1,85 @@
+import time
+
+import qt, vtk, slicer
+
+
+class ViewsReadyObserver(object):
+  """Notify when every visible slice view has rendered a volume as background.
+
+  The render windows of the slice views are observed and a view is considered ready the first time
+  it finishes rendering while showing the volume. Once all views are ready, or if the timeout expires
+  first, the callback is invoked from the event loop with the elapsed time in seconds and a
+  boolean indicating if the timeout expired.
+
+  Usage::
+
+    observer = ViewsReadyObserver(volumeNode, lambda elapsedTime, timedOut: print(elapsedTime))
+    observer.start()
+  """
+
+  def __init__(self, volumeNode, callback, timeoutInMs=2000):
+    self.volumeNode = volumeNode
+    self.callback = callback
+    self.timeoutInMs = timeoutInMs
+    self.startTime = None
+    self._observations = []
+    self._pendingViewNames = set()
+    self._timer = None
+
+  def start(self):
+    self.startTime = time.perf_counter()
+    layoutManager = slicer.app.layoutManager()
+    for viewName in layoutManager.sliceViewNames():
+      sliceWidget = layoutManager.sliceWidget(viewName)
+      if not sliceWidget.isVisible():
+        continue
+      renderWindow = sliceWidget.sliceView().renderWindow()
+      sliceLogic = sliceWidget.sliceLogic()
+      tag = renderWindow.AddObserver(
+        vtk.vtkCommand.EndEvent,
+        lambda caller, event, viewName=viewName, sliceLogic=sliceLogic: self._onRendered(viewName, sliceLogic))
+      self._observations.append((renderWindow, tag))
+      self._pendingViewNames.add(viewName)
+
+    self._timer = qt.QTimer()
+    self._timer.setSingleShot(True)
+    self._timer.connect("timeout()", lambda: self._finish(timedOut=True))
+    self._timer.start(self.timeoutInMs)
+
+    if not self._pendingViewNames:
+      self._finish(timedOut=False)
+
+  def isShown(self):
+    """Return True if the volume is the background of at least one slice view."""
+    for sliceLogic in slicer.app.applicationLogic().GetSliceLogics():
+      if self._isBackground(sliceLogic):
+        return True
+    return False
+
+  def _isBackground(self, sliceLogic):
+    """Return True if the volume, or a slab volume computed from it, is the background of the view."""
+    backgroundVolumeID = sliceLogic.GetSliceCompositeNode().GetBackgroundVolumeID()
+    if backgroundVolumeID == self.volumeNode.GetID():
+      return True
+    from .SlabEngine import NumPySlabEngine
+    backgroundVolume = slicer.mrmlScene.GetNodeByID(backgroundVolumeID or "")
+    return NumPySlabEngine.sourceVolume(backgroundVolume) is self.volumeNode
+
+  def _onRendered(self, viewName, sliceLogic):
+    if not self._isBackground(sliceLogic):
+      return
+    self._pendingViewNames.discard(viewName)
+    if not self._pendingViewNames:
+      self._finish(timedOut=False)
+
+  def _finish(self, timedOut):
+    if self._timer is None:
+      return
+    elapsedTime = time.perf_counter() - self.startTime
+    self._timer.stop()
+    self._timer = None
+    for renderWindow, tag in self._observations:
+      renderWindow.RemoveObserver(tag)
+    self._observations = []
+    # Do not call back while a view is being rendered
+    qt.QTimer.singleShot(0, lambda: self.callback(elapsedTime, timedOut))
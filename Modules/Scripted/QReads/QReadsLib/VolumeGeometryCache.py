@@ -0,0 +1,69 @@
+import collections
+
+import vtk
+
+VolumeGeometry = collections.namedtuple("VolumeGeometry", ["spacing", "rasDimensions", "rasCenter", "ijkDirections"])
+"""Geometry of a volume.
+
+``rasDimensions`` and ``rasCenter`` describe the RAS bounding box of the volume. ``ijkDirections``
+is the tuple of the RAS unit vectors of the I, J and K axes.
+"""
+
+
+class VolumeGeometryCache(object):
+  """Map of volume node ID to VolumeGeometry.
+
+  Geometry is computed the first time it is requested and computed again only if the volume node
+  or its image data were modified since, so that it can be requested for each view and each
+  update without walking the volume bounds again.
+
+  Usage::
+
+    cache = VolumeGeometryCache()
+    spacing = cache.get(volumeNode).spacing
+  """
+
+  def __init__(self):
+    self._entries = {}  # volume node ID to (modified time, geometry)
+    self.hits = 0
+    self.misses = 0
+
+  def __len__(self):
+    return len(self._entries)
+
+  @staticmethod
+  def modifiedTime(volumeNode):
+    imageData = volumeNode.GetImageData()
+    return (volumeNode.GetMTime(), imageData.GetMTime() if imageData is not None else 0)
+
+  @staticmethod
+  def computeGeometry(volumeNode):
+    bounds = [0.0] * 6
+    volumeNode.GetRASBounds(bounds)
+    directions = vtk.vtkMatrix4x4()
+    volumeNode.GetIJKToRASDirectionMatrix(directions)
+    return VolumeGeometry(
+      spacing=tuple(volumeNode.GetSpacing()),
+      rasDimensions=tuple(bounds[2 * axis + 1] - bounds[2 * axis] for axis in range(3)),
+      rasCenter=tuple(0.5 * (bounds[2 * axis + 1] + bounds[2 * axis]) for axis in range(3)),
+      ijkDirections=tuple(tuple(directions.GetElement(row, axis) for row in range(3)) for axis in range(3)))
+
+  def get(self, volumeNode):
+    """Return the geometry of ``volumeNode``, or None if no volume is given."""
+    if volumeNode is None:
+      return None
+    modifiedTime = self.modifiedTime(volumeNode)
+    entry = self._entries.get(volumeNode.GetID())
+    if entry is not None and entry[0] == modifiedTime:
+      self.hits += 1
+      return entry[1]
+    self.misses += 1
+    geometry = self.computeGeometry(volumeNode)
+    self._entries[volumeNode.GetID()] = (modifiedTime, geometry)
+    return geometry
+
+  def pop(self, volumeNodeID):
+    self._entries.pop(volumeNodeID, None)
+
+  def clear(self):
+    self._entries.clear()
@@ -0,0 +1,13 @@
+# Modules depending on numpy (BatchRenderer, MappedVolumeStore, ProgressiveVolumeLoader, SlabEngine
+# and StudyPrefetcher) are not imported here, they are imported where they are used.
+from .DICOMIndex import DICOMIndex
+from .DICOMHeaderScanner import DICOMHeaderScanner
+from .DICOMTagCache import DICOMTagCache
+from .HangingProtocol import HangingProtocol
+from .LoadMetrics import LoadMetrics
+from .SlabPreview import SlabPreview
+from .ViewsReadyObserver import ViewsReadyObserver
+from .ThreeDViewRenderThrottle import ThreeDViewRenderThrottle
+from .UpdateScheduler import UpdateScheduler
+from .ViewerServer import ViewerServer
+from .VolumeGeometryCache import VolumeGeometry, VolumeGeometryCache
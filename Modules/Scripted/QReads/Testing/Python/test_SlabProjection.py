@@ -0,0 +1,98 @@
+import concurrent.futures
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Import the module directly, importing the QReadsLib package requires the application
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "QReadsLib"))
+
+from SlabProjection import SLAB_MAX, SLAB_MEAN, SLAB_MIN, SLAB_SUM, slabOutputScalarType, slabProjection
+
+MODES = [SLAB_MAX, SLAB_MIN, SLAB_MEAN, SLAB_SUM]
+SHAPE = (12, 7, 9)
+
+
+def bruteForceSlabProjection(array, numberOfSlices, mode, axis, outputScalarType):
+  """Reduce the clipped window of each output slice one at a time."""
+  source = np.moveaxis(array, axis, 0)
+  length = source.shape[0]
+  before = (numberOfSlices - 1) // 2
+  after = numberOfSlices - 1 - before
+  output = np.empty(source.shape, dtype=outputScalarType)
+  for index in range(length):
+    window = source[max(index - before, 0):min(index + after + 1, length)].astype(np.float64)
+    if mode == SLAB_MAX:
+      values = window.max(axis=0)
+    elif mode == SLAB_MIN:
+      values = window.min(axis=0)
+    elif mode == SLAB_MEAN:
+      values = window.mean(axis=0)
+      if np.issubdtype(outputScalarType, np.integer):
+        values = np.rint(values)
+    else:
+      values = window.sum(axis=0)
+    if np.issubdtype(outputScalarType, np.integer):
+      info = np.iinfo(outputScalarType)
+      values = np.clip(values, info.min, info.max)
+    output[index] = values
+  return np.moveaxis(output, 0, axis)
+
+
+def randomArray(dtype):
+  generator = np.random.default_rng(0)
+  if np.issubdtype(dtype, np.integer):
+    return generator.integers(-1024, 3072, size=SHAPE).astype(dtype)
+  return generator.normal(size=SHAPE).astype(dtype)
+
+
+@pytest.mark.parametrize("dtype", [np.int16, np.float32])
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("axis", [0, 1, 2])
+@pytest.mark.parametrize("numberOfSlices", [1, 2, 3, 5, 8, 13, 40])
+def test_slabProjection(numberOfSlices, axis, mode, dtype):
+  array = randomArray(dtype)
+  projection = slabProjection(array, numberOfSlices, mode, axis=axis, blockSize=4)
+  expected = bruteForceSlabProjection(array, numberOfSlices, mode, axis, projection.dtype)
+  assert projection.shape == array.shape
+  assert projection.flags.c_contiguous
+  if np.issubdtype(dtype, np.integer):
+    np.testing.assert_array_equal(projection, expected)
+  else:
+    np.testing.assert_allclose(projection, expected, rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_slabProjectionWithExecutor(mode):
+  array = randomArray(np.int16)
+  with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+    projection = slabProjection(array, 5, mode, axis=1, blockSize=2, executor=executor)
+  np.testing.assert_array_equal(projection, slabProjection(array, 5, mode, axis=1))
+
+
+def test_slabProjectionSumWidensInt16():
+  array = np.full(SHAPE, 30000, dtype=np.int16)
+  projection = slabProjection(array, 3, SLAB_SUM)
+  assert projection.dtype == np.int32
+  # Windows are clipped at the borders
+  assert projection[0, 0, 0] == 60000
+  assert projection[1, 0, 0] == 90000
+  assert projection[-1, 0, 0] == 60000
+
+
+def test_slabProjectionUnsupportedMode():
+  with pytest.raises(ValueError):
+    slabProjection(randomArray(np.int16), 3, 42)
+
+
+def test_slabOutputScalarType():
+  assert slabOutputScalarType(np.int16, SLAB_MAX) == np.int16
+  assert slabOutputScalarType(np.int16, SLAB_MEAN) == np.int16
+  assert slabOutputScalarType(np.float64, SLAB_MAX) == np.float64
+  assert slabOutputScalarType(np.float64, SLAB_MEAN) == np.float32
+  assert slabOutputScalarType(np.int16, SLAB_SUM) == np.int32
+  assert slabOutputScalarType(np.int16, SLAB_SUM, 8, (-1024, 3071)) == np.int16
+  assert slabOutputScalarType(np.int16, SLAB_SUM, 16, (-1024, 3071)) == np.int32
+  assert slabOutputScalarType(np.uint8, SLAB_SUM, 2, (0, 100)) == np.uint8
+
@@ -0,0 +1,143 @@
+"""Compare time-to-first-image of the serial DICOM import and the parallel header scan.
+
+A synthetic CT series is generated in a temporary directory and loaded using
+QReadsLogic.loadDICOMDataDirectory() with the parallel header scan disabled, then enabled.
+Along with the time to first image, the duration of the header scan and of the database import
+recorded by the load metrics (see QReadsLogic.loadMetrics()) are reported: with the parallel header
+scan, files are inserted without precaching their tags, the scanned values being cached instead.
+
+Usage::
+
+  SlicerQReads --no-splash --python-script Utilities/Benchmarks/BenchmarkDICOMHeaderScan.py \
+    [--number-of-files 2000] [--size 128] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import qt
+import slicer
+
+SETTINGS = ["QReads/ParallelHeaderScanEnabled", "QReads/LoadMetricsFile"]
+
+
+def createSyntheticSeries(directory, numberOfFiles, size):
+  import pydicom
+  from pydicom.dataset import Dataset, FileDataset, FileMetaDataset
+  from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+  ctImageStorage = "1.2.840.10008.5.1.4.1.1.2"
+  studyInstanceUID = generate_uid()
+  seriesInstanceUID = generate_uid()
+  frameOfReferenceUID = generate_uid()
+  pixels = (np.random.default_rng(0).integers(0, 2000, (size, size))).astype(np.int16)
+
+  for index in range(numberOfFiles):
+    sopInstanceUID = generate_uid()
+    fileMeta = FileMetaDataset()
+    fileMeta.MediaStorageSOPClassUID = ctImageStorage
+    fileMeta.MediaStorageSOPInstanceUID = sopInstanceUID
+    fileMeta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    filename = os.path.join(directory, "IM%05d.dcm" % index)
+    dataset = FileDataset(filename, {}, file_meta=fileMeta, preamble=b"\0" * 128)
+    dataset.SOPClassUID = ctImageStorage
+    dataset.SOPInstanceUID = sopInstanceUID
+    dataset.Modality = "CT"
+    dataset.PatientName = "QReads^Benchmark"
+    dataset.PatientID = "QREADS-BENCHMARK"
+    dataset.StudyInstanceUID = studyInstanceUID
+    dataset.StudyDescription = "Header scan benchmark"
+    dataset.SeriesInstanceUID = seriesInstanceUID
+    dataset.SeriesDescription = "Synthetic CT"
+    dataset.SeriesNumber = 1
+    dataset.InstanceNumber = index + 1
+    dataset.FrameOfReferenceUID = frameOfReferenceUID
+    dataset.ImagePositionPatient = [0.0, 0.0, 0.5 * index]
+    dataset.ImageOrientationPatient = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+    dataset.PixelSpacing = [0.7, 0.7]
+    dataset.SliceThickness = 0.5
+    dataset.Rows = size
+    dataset.Columns = size
+    dataset.SamplesPerPixel = 1
+    dataset.PhotometricInterpretation = "MONOCHROME2"
+    dataset.BitsAllocated = 16
+    dataset.BitsStored = 16
+    dataset.HighBit = 15
+    dataset.PixelRepresentation = 1
+    dataset.RescaleIntercept = -1024
+    dataset.RescaleSlope = 1
+    dataset.PixelData = pixels.tobytes()
+    dataset.is_little_endian = True
+    dataset.is_implicit_VR = False
+    dataset.save_as(filename)
+
+
+STAGES = ["headerScan", "import"]
+
+
+def timeToFirstImage(dicomDataDir, parallelHeaderScan, metricsFilePath):
+  """Return the time to first image and the duration of each of the STAGES."""
+  from QReads import QReadsLogic
+
+  settings = qt.QSettings()
+  settings.setValue("QReads/ParallelHeaderScanEnabled", "true" if parallelHeaderScan else "false")
+  if os.path.exists(metricsFilePath):
+    os.remove(metricsFilePath)
+
+  slicer.mrmlScene.Clear(0)
+  startTime = time.perf_counter()
+  QReadsLogic.loadDICOMDataDirectory(dicomDataDir)
+  slicer.app.processEvents()
+  slicer.app.layoutManager().sliceWidget("Red").sliceView().forceRender()
+  timings = {"firstImage": time.perf_counter() - startTime}
+
+  with open(metricsFilePath) as metricsFile:
+    for line in metricsFile:
+      record = json.loads(line)
+      if record["stage"] in STAGES:
+        timings[record["stage"]] = timings.get(record["stage"], 0.0) + record["duration"]
+  return timings
+
+
+def main(argv):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--number-of-files", type=int, default=2000)
+  parser.add_argument("--size", type=int, default=128, help="number of rows and columns of each image")
+  parser.add_argument("--repeat", type=int, default=3)
+  args = parser.parse_args(argv)
+
+  settings = qt.QSettings()
+  originalValues = {key: settings.value(key) for key in SETTINGS}
+  dicomDataDir = tempfile.mkdtemp(prefix="QReadsBenchmark")
+  metricsFilePath = os.path.join(tempfile.mkdtemp(prefix="QReadsBenchmarkMetrics"), "metrics.jsonl")
+  try:
+    print("Generating %d files of %dx%d pixels in %s" % (args.number_of_files, args.size, args.size, dicomDataDir))
+    createSyntheticSeries(dicomDataDir, args.number_of_files, args.size)
+    settings.setValue("QReads/LoadMetricsFile", metricsFilePath)
+
+    print("%-22s %24s %12s %12s" % ("", "first image (min/mean)", "headerScan", "import"))
+    for label, parallelHeaderScan in [("serial import", False), ("parallel header scan", True)]:
+      runs = [timeToFirstImage(dicomDataDir, parallelHeaderScan, metricsFilePath) for _ in range(args.repeat)]
+      firstImage = [run["firstImage"] for run in runs]
+      print("%-22s %11.3fs %11.3fs %s" % (label, min(firstImage), sum(firstImage) / len(firstImage), " ".join(
+        "%11.3fs" % (sum(run.get(stage, 0.0) for run in runs) / len(runs)) for stage in STAGES)))
+  finally:
+    for key, value in originalValues.items():
+      if value is None:
+        settings.remove(key)
+      else:
+        settings.setValue(key, value)
+    shutil.rmtree(dicomDataDir, ignore_errors=True)
+    shutil.rmtree(os.path.dirname(metricsFilePath), ignore_errors=True)
+
+
+if __name__ == "__main__":
+  import sys
+  main(sys.argv[1:])
+  slicer.util.exit()
@@ -0,0 +1,116 @@
+"""Compare slab rendering times of the single and multi-threaded VTK reslice and of the NumPy slab engine.
+
+A synthetic CT volume is shown in the Red, Yellow and Green views. For each slab thickness,
+QReadsLogic.setSlab() is called and all views are rendered once the slabs are computed, then the
+views are scrolled. Each configuration of the ``QReads/NumPySlabEngineEnabled`` and
+``QReads/MultiThreadedSlabEnabled`` settings is timed.
+
+Usage::
+
+  SlicerQReads --no-splash --python-script Utilities/Benchmarks/BenchmarkSlab.py \
+    [--size 512] [--number-of-slices 400] [--thicknesses 1 5 10 20 40] [--scroll-steps 20] [--number-of-threads 0]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import qt
+import vtk
+import slicer
+
+SETTINGS = ["QReads/NumPySlabEngineEnabled", "QReads/MultiThreadedSlabEnabled", "QReads/SlabNumberOfThreads"]
+
+CONFIGURATIONS = [
+  ("VTK", False, False),
+  ("VTK multi-threaded", False, True),
+  ("NumPy", True, False),
+]
+
+VIEW_NAMES = ["Red", "Yellow", "Green"]
+
+
+def createSyntheticVolume(size, numberOfSlices, spacing):
+  array = np.random.default_rng(0).integers(-1024, 2000, (numberOfSlices, size, size)).astype(np.int16)
+  volumeNode = slicer.util.addVolumeFromArray(array, name="SlabBenchmark")
+  volumeNode.SetSpacing(spacing)
+  return volumeNode
+
+
+def renderViews():
+  layoutManager = slicer.app.layoutManager()
+  for viewName in VIEW_NAMES:
+    layoutManager.sliceWidget(viewName).sliceView().forceRender()
+
+
+def scrollViews(steps):
+  layoutManager = slicer.app.layoutManager()
+  for step in range(steps):
+    for viewName in VIEW_NAMES:
+      sliceLogic = layoutManager.sliceWidget(viewName).sliceLogic()
+      sliceLogic.SetSliceOffset(sliceLogic.GetSliceOffset() + (1.0 if step % 2 else -1.0))
+    renderViews()
+
+
+def timeSlab(thicknessInMm, scrollSteps):
+  from QReads import QReadsLogic
+
+  numberOfSlices = QReadsLogic.slabNumberOfSlicesPerView(thicknessInMm)
+  startTime = time.perf_counter()
+  QReadsLogic.setSlab(vtk.VTK_IMAGE_SLAB_MAX, numberOfSlices)
+  # Projections of the NumPy slab engine are computed in the background and shown once ready
+  while QReadsLogic.SLAB_ENGINE is not None and QReadsLogic.SLAB_ENGINE.isComputing():
+    slicer.app.processEvents()
+    time.sleep(0.001)
+  renderViews()
+  applyTime = time.perf_counter() - startTime
+
+  startTime = time.perf_counter()
+  scrollViews(scrollSteps)
+  scrollTime = (time.perf_counter() - startTime) / max(1, scrollSteps)
+  return applyTime, scrollTime
+
+
+def main(argv):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--size", type=int, default=512, help="number of rows and columns of each slice")
+  parser.add_argument("--number-of-slices", type=int, default=400)
+  parser.add_argument("--thicknesses", type=float, nargs="+", default=[1.0, 5.0, 10.0, 20.0, 40.0], help="slab thicknesses in mm")
+  parser.add_argument("--scroll-steps", type=int, default=20)
+  parser.add_argument("--number-of-threads", type=int, default=0, help="0 means number of CPUs")
+  args = parser.parse_args(argv)
+
+  from QReads import QReadsLogic
+
+  settings = qt.QSettings()
+  originalValues = {key: settings.value(key) for key in SETTINGS}
+  try:
+    slicer.mrmlScene.Clear(0)
+    volumeNode = createSyntheticVolume(args.size, args.number_of_slices, (0.7, 0.7, 0.5))
+    slicer.util.setSliceViewerLayers(background=volumeNode, fit=True)
+    settings.setValue("QReads/SlabNumberOfThreads", args.number_of_threads)
+
+    print("%-22s %10s %14s %14s" % ("configuration", "thickness", "setSlab+render", "scroll/frame"))
+    for label, numPySlabEngine, multiThreaded in CONFIGURATIONS:
+      settings.setValue("QReads/NumPySlabEngineEnabled", "true" if numPySlabEngine else "false")
+      settings.setValue("QReads/MultiThreadedSlabEnabled", "true" if multiThreaded else "false")
+      for thicknessInMm in args.thicknesses:
+        applyTime, scrollTime = timeSlab(thicknessInMm, args.scroll_steps)
+        print("%-22s %8.1fmm %13.3fs %13.4fs" % (label, thicknessInMm, applyTime, scrollTime))
+      # Show the volume again and discard cached projections before switching configuration
+      QReadsLogic.setSlab(vtk.VTK_IMAGE_SLAB_MAX, 1)
+      if QReadsLogic.SLAB_ENGINE is not None:
+        QReadsLogic.SLAB_ENGINE.releaseSourceVolume(volumeNode)
+  finally:
+    for key, value in originalValues.items():
+      if value is None:
+        settings.remove(key)
+      else:
+        settings.setValue(key, value)
+    slicer.mrmlScene.Clear(0)
+
+
+if __name__ == "__main__":
+  import sys
+  main(sys.argv[1:])
+  slicer.util.exit()
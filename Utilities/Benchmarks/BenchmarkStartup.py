@@ -0,0 +1,115 @@
+"""Time the startup of the application with and without deferred startup, broken down by phase.
+
+The application is launched several times in a row with the ``QReads/DeferredStartupEnabled``
+setting disabled, then enabled. With deferred startup, the 3D views are set up after the slice views
+are first shown and the DICOM and Markups modules are not loaded (see
+QReadsLogic.configureDeferredStartup()), which shortens the ``application`` phase. Each launch records
+the duration of the QReads setup phases using the load metrics (see QReadsLogic.loadMetrics()) and
+exits as soon as the red slice view is rendered. The following phases are reported:
+
+* ``application``: from launch to the setup of the QReads module (modules discovery and loading)
+* ``setupUI``, ``setupLayout``: setup of the QReads module
+* ``deferredSetup``: setup of the 3D views, when startup is deferred
+* ``firstRender``: until the red slice view is rendered
+* ``total``: from launch to the first render
+
+Usage::
+
+  SlicerQReads --no-splash --python-script Utilities/Benchmarks/BenchmarkStartup.py [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import qt
+import slicer
+
+SETTINGS = ["QReads/DeferredStartupEnabled", "QReads/LoadMetricsFile", "QReads/ViewerServerEnabled", "Modules/IgnoreModules"]
+
+PHASES = ["application", "setupUI", "setupLayout", "deferredSetup", "firstRender", "total"]
+
+READY_CODE = """
+import json, time
+slicer.app.processEvents()
+slicer.app.layoutManager().sliceWidget("Red").sliceView().forceRender()
+with open({readyFilePath!r}, "w") as readyFile:
+  json.dump({{"time": time.time()}}, readyFile)
+slicer.util.exit()
+"""
+
+
+def launch(launchArguments, metricsFilePath, readyFilePath):
+  """Launch the application once and return the duration of each phase."""
+  for path in [metricsFilePath, readyFilePath]:
+    if os.path.exists(path):
+      os.remove(path)
+  launchTime = time.time()
+  subprocess.run(launchArguments + ["--python-code", READY_CODE.format(readyFilePath=readyFilePath)], check=True)
+  with open(readyFilePath) as readyFile:
+    readyTime = json.load(readyFile)["time"]
+
+  records = []
+  with open(metricsFilePath) as metricsFile:
+    for line in metricsFile:
+      records.append(json.loads(line))
+  startupLoadId = next(record["loadId"] for record in records if record["stage"] == "start" and record.get("startup"))
+  records = [record for record in records if record["loadId"] == startupLoadId]
+
+  setupTime = next(record["time"] for record in records if record["stage"] == "start")
+  durations = {"application": setupTime - launchTime, "total": readyTime - launchTime}
+  lastTime = setupTime
+  for record in records:
+    if record["stage"] in PHASES:
+      durations[record["stage"]] = record["duration"]
+      lastTime = max(lastTime, record["time"])
+  durations["firstRender"] = readyTime - lastTime
+  return durations
+
+
+def main(argv):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--repeat", type=int, default=5)
+  args = parser.parse_args(argv)
+
+  from QReads import QReadsLogic
+
+  launchArguments = [slicer.app.launcherExecutableFilePath or sys.executable, "--no-splash"]
+  temporaryDirectory = tempfile.mkdtemp(prefix="QReadsBenchmark")
+  metricsFilePath = os.path.join(temporaryDirectory, "metrics.jsonl")
+  readyFilePath = os.path.join(temporaryDirectory, "ready.json")
+
+  settings = qt.QSettings()
+  originalValues = {key: settings.value(key) for key in SETTINGS}
+  try:
+    settings.setValue("QReads/LoadMetricsFile", metricsFilePath)
+    # Each launch must start the application instead of forwarding its arguments to this one
+    settings.setValue("QReads/ViewerServerEnabled", "false")
+    print("%-20s %s" % ("", " ".join("%13s" % phase for phase in PHASES)))
+    for deferred in [False, True]:
+      settings.setValue("QReads/DeferredStartupEnabled", "true" if deferred else "false")
+      # Modules ignored at startup are configured for the following launches
+      QReadsLogic.configureDeferredStartup()
+      settings.sync()
+      runs = [launch(launchArguments, metricsFilePath, readyFilePath) for _ in range(args.repeat)]
+      label = "deferred startup" if deferred else "eager startup"
+      print("%-20s %s" % (label, " ".join(
+        "%12.3fs" % (sum(run.get(phase, 0.0) for run in runs) / len(runs)) for phase in PHASES)))
+  finally:
+    for key, value in originalValues.items():
+      if value is None:
+        settings.remove(key)
+      else:
+        settings.setValue(key, value)
+    settings.sync()
+    shutil.rmtree(temporaryDirectory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
+  slicer.util.exit()
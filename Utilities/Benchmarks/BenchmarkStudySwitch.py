@@ -0,0 +1,95 @@
+"""Compare the time and memory of switching studies by closing the scene and by replacing the study.
+
+Synthetic CT studies are generated in a temporary directory and loaded one after the other, first
+closing the scene before each load, then using QReadsLogic.replaceStudy(). The duration of each switch
+and the resident memory after it are printed so that memory growth over time can be spotted.
+
+Usage::
+
+  SlicerQReads --no-splash --python-script Utilities/Benchmarks/BenchmarkStudySwitch.py \
+    [--number-of-studies 20] [--number-of-files 200] [--size 256]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import slicer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from BenchmarkDICOMHeaderScan import createSyntheticSeries
+
+
+def residentMemoryInMB():
+  """Return the resident memory of the process in MB or None if it is not available."""
+  try:
+    import psutil
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+  except ImportError:
+    pass
+  try:
+    with open("/proc/self/status") as status:
+      for line in status:
+        if line.startswith("VmRSS:"):
+          return int(line.split()[1]) / 1024
+  except OSError:
+    pass
+  return None
+
+
+def closeSceneAndLoad(dicomDataDir):
+  from QReads import QReadsLogic
+  slicer.mrmlScene.Clear(0)
+  QReadsLogic.loadDICOMDataDirectory(dicomDataDir)
+
+
+def replaceStudy(dicomDataDir):
+  from QReads import QReadsLogic
+  QReadsLogic.replaceStudy(dicomDataDir)
+
+
+def switchStudies(label, switch, studyDirectories):
+  timings = []
+  print("%s:" % label)
+  for index, dicomDataDir in enumerate(studyDirectories):
+    startTime = time.perf_counter()
+    switch(dicomDataDir)
+    slicer.app.processEvents()
+    slicer.app.layoutManager().sliceWidget("Red").sliceView().forceRender()
+    timings.append(time.perf_counter() - startTime)
+    memory = residentMemoryInMB()
+    print("  switch %2d  %.3fs  %s" % (index + 1, timings[-1], "%.0f MB" % memory if memory is not None else "n/a"))
+  print("  min %.3fs  mean %.3fs  max %.3fs" % (min(timings), sum(timings) / len(timings), max(timings)))
+
+
+def main(argv):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--number-of-studies", type=int, default=20)
+  parser.add_argument("--number-of-files", type=int, default=200, help="number of files of each study")
+  parser.add_argument("--size", type=int, default=256, help="number of rows and columns of each image")
+  args = parser.parse_args(argv)
+
+  rootDirectory = tempfile.mkdtemp(prefix="QReadsBenchmark")
+  try:
+    print("Generating %d studies of %d files of %dx%d pixels in %s" % (
+      args.number_of_studies, args.number_of_files, args.size, args.size, rootDirectory))
+    studyDirectories = []
+    for index in range(args.number_of_studies):
+      dicomDataDir = os.path.join(rootDirectory, "study%02d" % index)
+      os.makedirs(dicomDataDir)
+      createSyntheticSeries(dicomDataDir, args.number_of_files, args.size)
+      studyDirectories.append(dicomDataDir)
+
+    switchStudies("close scene", closeSceneAndLoad, studyDirectories)
+    switchStudies("replace study", replaceStudy, studyDirectories)
+  finally:
+    slicer.mrmlScene.Clear(0)
+    shutil.rmtree(rootDirectory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
+  slicer.util.exit()
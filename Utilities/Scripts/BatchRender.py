@@ -0,0 +1,131 @@
+"""Render MPR and slab images of DICOM studies without display.
+
+Each study is loaded and rendered by its own application process, ``--workers`` processes running at
+a time and each using ``--threads`` threads. Images of each series are written into
+``<output>/<study>/<series>/``: one PNG image per slice in a directory per view, or one NRRD stack per
+view with ``--format nrrd``. Images are computed from the volumes without rendering views, so that the
+script runs on servers without display or GPU. The Qt ``offscreen`` platform has to be selected for
+this script as shown below, workers always use it.
+
+Usage::
+
+  QT_QPA_PLATFORM=offscreen SlicerQReads --no-splash --no-main-window --python-script Utilities/Scripts/BatchRender.py \\
+    --output /path/to/output --views Red Green --slab-mode Max --slab-thickness 10 --preset CT-Lung \\
+    --step 2 --workers 4 /path/to/study1 /path/to/study2
+"""
+
+import argparse
+import os
+import sys
+
+import vtk
+import slicer
+
+from QReadsLib.BatchRenderer import BatchRenderer, RenderSpec
+
+WORKER_MEMORY_IN_BYTES = 4 * 1024 * 1024 * 1024
+"""Memory needed by a worker loading and rendering a study, used to choose the default number of workers"""
+
+MAXIMUM_DEFAULT_NUMBER_OF_WORKERS = 4
+
+
+def parseArguments(argv):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("studies", nargs="+", help="DICOM directories of the studies")
+  parser.add_argument("--output", required=True, help="directory where images are written")
+  parser.add_argument("--views", nargs="+", default=["Red"], help="slice views giving the orientation of the stacks")
+  parser.add_argument("--slab-mode", choices=["Max", "Mean", "Min", "Sum"], help="compute slabs of --slab-thickness")
+  parser.add_argument("--slab-thickness", type=float, default=0.0, help="slab thickness in mm")
+  parser.add_argument("--preset", help="window level preset, the volume window level by default")
+  parser.add_argument("--inverse-gray", action="store_true")
+  parser.add_argument("--range", type=int, nargs=2, metavar=("FIRST", "LAST"), help="indices of the first and last slices")
+  parser.add_argument("--step", type=int, default=1, help="write one slice every STEP slices")
+  parser.add_argument("--format", choices=["png", "nrrd"], default="png")
+  parser.add_argument("--workers", type=int, default=0, help="number of studies rendered at a time, see defaultNumberOfWorkers()")
+  parser.add_argument("--threads", type=int, default=0, help="number of threads of each worker, the number of CPUs divided by the number of workers by default")
+  parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+  return parser.parse_args(argv)
+
+
+def defaultNumberOfWorkers():
+  """Return the number of workers fitting in the physical memory, at most MAXIMUM_DEFAULT_NUMBER_OF_WORKERS."""
+  numberOfWorkers = min(MAXIMUM_DEFAULT_NUMBER_OF_WORKERS, os.cpu_count() or 1)
+  try:
+    memoryInBytes = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+  except (AttributeError, ValueError, OSError):
+    # Physical memory is not available through sysconf on Windows
+    return numberOfWorkers
+  return max(1, min(numberOfWorkers, memoryInBytes // WORKER_MEMORY_IN_BYTES))
+
+
+def workerArguments(args, studyDirectory):
+  """Return the arguments of the worker rendering ``studyDirectory`` with the options of ``args``."""
+  arguments = [studyDirectory, "--worker", "--output", args.output, "--views"] + args.views
+  if args.slab_mode:
+    arguments += ["--slab-mode", args.slab_mode]
+  arguments += ["--slab-thickness", str(args.slab_thickness)]
+  if args.preset is not None:
+    arguments += ["--preset", args.preset]
+  if args.inverse_gray:
+    arguments.append("--inverse-gray")
+  if args.range is not None:
+    arguments += ["--range", str(args.range[0]), str(args.range[1])]
+  arguments += ["--step", str(args.step), "--format", args.format, "--threads", str(args.threads)]
+  return arguments
+
+
+def studyOutputDirectory(outputDirectory, studyDirectory):
+  return os.path.join(outputDirectory, os.path.basename(os.path.normpath(studyDirectory)))
+
+
+def renderStudy(args):
+  """Render the single study of ``args`` in this process and return the exit code."""
+  from QReads import QReadsLogic
+
+  if args.preset is not None and args.preset not in QReadsLogic.WINDOW_LEVEL_PRESETS:
+    print("Unknown window level preset %s" % args.preset)
+    return 1
+  if args.threads:
+    # Workers share the CPUs, neither the decoders nor VTK filters use all of them
+    QReadsLogic.HEADER_SCAN_NUMBER_OF_THREADS = args.threads
+    vtk.vtkMultiThreader.SetGlobalMaximumNumberOfThreads(args.threads)
+  spec = RenderSpec(
+    views=args.views,
+    slabMode=QReadsLogic.slabModeFromString(args.slab_mode) if args.slab_mode else None,
+    slabThicknessInMm=args.slab_thickness,
+    windowLevelPreset=args.preset,
+    inverseGray=args.inverse_gray,
+    sliceRange=args.range,
+    step=args.step,
+    format=args.format)
+  studyDirectory = args.studies[0]
+  filenames = QReadsLogic.renderStudy(studyDirectory, studyOutputDirectory(args.output, studyDirectory), spec)
+  print("Wrote %d files" % len(filenames))
+  return 0 if filenames else 1
+
+
+def main(argv):
+  args = parseArguments(argv)
+  if args.worker:
+    return renderStudy(args)
+
+  args.workers = args.workers or defaultNumberOfWorkers()
+  args.threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+  launcher = slicer.app.launcherExecutableFilePath or sys.executable
+  environment = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+
+  def commandForStudy(studyDirectory):
+    return [launcher, "--no-splash", "--no-main-window", "--python-script", os.path.abspath(__file__)] + \
+      workerArguments(args, studyDirectory)
+
+  renderer = BatchRenderer(commandForStudy, maximumNumberOfWorkers=args.workers, environment=environment)
+  results = renderer.render(args.studies)
+
+  print("%-60s %8s %10s" % ("study", "status", "duration"))
+  for studyDirectory, (returnCode, duration) in results.items():
+    print("%-60s %8s %9.1fs" % (studyDirectory, "ok" if returnCode == 0 else "failed", duration))
+  return 0 if all(returnCode == 0 for returnCode, _ in results.values()) else 1
+
+
+if __name__ == "__main__":
+  slicer.util.exit(main(sys.argv[1:]))